@@ -0,0 +1,240 @@
+"""Offline benchmark of the recipe generation pipeline
+
+Swaps litellm for fake_llm.FakeLiteLLM, so no network or API key is needed,
+and measures everything around the LLM call: prompt building, JSON
+extraction, validation, text formatting, the debug save and (when a display
+is available) Tk rendering. It also measures end-to-end throughput for
+sequential, streamed and concurrent generation against a fake backend with
+simulated latency, plus memory use.
+
+    python benchmarks/pipeline.py --json results.json
+    python benchmarks/pipeline.py --compare results.json   # against an earlier run
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from debug_utils import save_recipe_data
+from fake_llm import FakeLiteLLM, synthetic_recipe
+from recipe_generator import RecipeGenerator, use_backend
+from recipe_render import format_recipe_text
+
+# Recipe sizes as (ingredients, instructions)
+SIZES = {
+    "small": (5, 4),
+    "medium": (12, 10),
+    "large": (40, 30)
+}
+
+SAMPLE_FORM = ("Thai", "Chicken", 500, 4, 30, "No peanuts, please.")
+
+def time_calls(func: Callable[[], Any], iterations: int) -> Dict[str, float]:
+    """Call func repeatedly and return per-call timings in microseconds"""
+    func()  # warm up
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1e6)
+    samples.sort()
+    return {
+        "mean_us": statistics.fmean(samples),
+        "p50_us": samples[len(samples) // 2],
+        "p95_us": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "iterations": iterations
+    }
+
+def make_generator(backend: FakeLiteLLM, **config: Any) -> RecipeGenerator:
+    use_backend(backend)
+    return RecipeGenerator(dict({"cache": {"enabled": False}, "history": {"enabled": False},
+                                 "resilience": {"max_retries": 0}}, **config))
+
+def tk_renderer() -> Optional[Callable[[str], None]]:
+    """Return a function that renders text into a ScrolledText, or None without a display"""
+    try:
+        import tkinter as tk
+        from tkinter import scrolledtext
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    widget = scrolledtext.ScrolledText(root, width=80, height=25, wrap=tk.WORD)
+    widget.pack()
+
+    def render(text: str) -> None:
+        widget.config(state=tk.NORMAL)
+        widget.delete("1.0", tk.END)
+        widget.insert(tk.END, text)
+        widget.config(state=tk.DISABLED)
+        root.update_idletasks()
+    return render
+
+def bench_stages(iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Time each local pipeline stage for every recipe size"""
+    generator = make_generator(FakeLiteLLM())
+    prompt = generator._build_prompt(*SAMPLE_FORM)
+    render = tk_renderer()
+    results: Dict[str, Dict[str, Any]] = {}
+    workdir = tempfile.mkdtemp(prefix="recipegenie-bench-")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for size, (ingredients, steps) in SIZES.items():
+            recipe = synthetic_recipe(prompt, ingredients, steps)
+            response_text = "Here is your recipe:\n" + json.dumps(recipe, indent=2) + "\nEnjoy!"
+            text = format_recipe_text(recipe)
+            stages = {
+                "build_prompt": time_calls(lambda: generator._build_prompt(*SAMPLE_FORM), iterations),
+                "extract_json": time_calls(lambda: generator._extract_recipe_json(response_text), iterations),
+                "validate": time_calls(lambda: generator._validate_recipe_data(recipe), iterations),
+                "format_text": time_calls(lambda: format_recipe_text(recipe), iterations),
+                "save_debug": time_calls(lambda: save_recipe_data(recipe), max(1, iterations // 10))
+            }
+            if render is not None:
+                stages["tk_render"] = time_calls(lambda: render(text), max(1, iterations // 10))
+            stages["response_bytes"] = len(response_text)
+            results[size] = stages
+    finally:
+        os.chdir(previous_dir)
+    return results
+
+def bench_throughput(count: int, latency: float, concurrency: int) -> Dict[str, Dict[str, float]]:
+    """Measure end-to-end recipes per second against the fake backend"""
+    results = {}
+    specs = [dict(zip(("cuisine", "centerpiece", "calories", "servings", "prep_time", "additional_info"),
+                      SAMPLE_FORM)) for _ in range(count)]
+
+    generator = make_generator(FakeLiteLLM(latency=latency), stream=False)
+    started = time.perf_counter()
+    for spec in specs:
+        generator.generate_recipe(**spec)
+    elapsed = time.perf_counter() - started
+    results["sequential"] = {"recipes": count, "seconds": elapsed, "recipes_per_second": count / elapsed}
+
+    backend = FakeLiteLLM(latency=latency, chunk_delay=0.0005)
+    generator = make_generator(backend)
+    first_event = []
+    started = time.perf_counter()
+    for spec in specs:
+        call_started = time.perf_counter()
+        seen = []
+        generator.generate_recipe(**spec, on_event=lambda *event: seen.append(time.perf_counter()))
+        first_event.append(seen[0] - call_started)
+    elapsed = time.perf_counter() - started
+    results["streaming"] = {
+        "recipes": count, "seconds": elapsed, "recipes_per_second": count / elapsed,
+        "time_to_first_field_seconds": statistics.fmean(first_event),
+        "time_to_complete_seconds": elapsed / count
+    }
+
+    generator = make_generator(FakeLiteLLM(latency=latency))
+    started = time.perf_counter()
+    failures = sum(1 for result in generator.generate_many(specs, concurrency=concurrency) if result.error)
+    elapsed = time.perf_counter() - started
+    results["concurrent"] = {
+        "recipes": count, "concurrency": concurrency, "failures": failures,
+        "seconds": elapsed, "recipes_per_second": count / elapsed
+    }
+
+    # Three recipes per call, sharing one prompt and one round trip
+    generator = make_generator(FakeLiteLLM(latency=latency))
+    started = time.perf_counter()
+    generated = 0
+    while generated < count:
+        generated += len(generator.generate_variants(*SAMPLE_FORM, count=min(3, count - generated)))
+    elapsed = time.perf_counter() - started
+    results["variants"] = {"recipes": generated, "seconds": elapsed, "recipes_per_second": generated / elapsed}
+    return results
+
+def bench_memory(count: int, concurrency: int) -> Dict[str, float]:
+    """Measure Python heap growth while generating a concurrent batch"""
+    generator = make_generator(FakeLiteLLM(latency=0.01))
+    specs = [dict(zip(("cuisine", "centerpiece", "calories", "servings", "prep_time", "additional_info"),
+                      SAMPLE_FORM)) for _ in range(count)]
+    tracemalloc.start()
+    recipes = [result.recipe for result in generator.generate_many(specs, concurrency=concurrency)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    memory = {"recipes": len(recipes), "retained_kib": current / 1024, "peak_kib": peak / 1024}
+    try:
+        import resource
+        memory["max_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        pass
+    return memory
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def ratio(new: float, old: Optional[float]) -> str:
+        return f"  ({new / old:.2f}x of baseline)" if old else ""
+
+    print(f"Pipeline benchmark @ {results['meta']['commit'] or 'unknown commit'}")
+    for size, stages in results["stages"].items():
+        print(f"\n[{size}] response {stages['response_bytes']} bytes")
+        for name, timing in stages.items():
+            if not isinstance(timing, dict):
+                continue
+            old = (baseline or {}).get("stages", {}).get(size, {}).get(name, {}).get("p50_us")
+            print(f"  {name:<14} p50 {timing['p50_us']:10.1f} us   p95 {timing['p95_us']:10.1f} us"
+                  f"{ratio(timing['p50_us'], old)}")
+
+    print("\nThroughput (fake backend):")
+    for mode, numbers in results["throughput"].items():
+        old = (baseline or {}).get("throughput", {}).get(mode, {}).get("recipes_per_second")
+        line = f"  {mode:<11} {numbers['recipes_per_second']:8.2f} recipes/s{ratio(numbers['recipes_per_second'], old)}"
+        if "time_to_first_field_seconds" in numbers:
+            line += (f"   first field after {numbers['time_to_first_field_seconds'] * 1000:.0f} ms,"
+                     f" complete after {numbers['time_to_complete_seconds'] * 1000:.0f} ms")
+        print(line)
+
+    memory = results["memory"]
+    print(f"\nMemory: peak {memory['peak_kib']:.0f} KiB traced, {memory['retained_kib']:.0f} KiB retained"
+          f" for {memory['recipes']} recipes")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the recipe pipeline offline.")
+    parser.add_argument("--iterations", type=int, default=200, help="timed calls per stage (default 200)")
+    parser.add_argument("--recipes", type=int, default=20, help="recipes per throughput run (default 20)")
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated LLM latency in seconds (default 0.05)")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrency for batch runs (default 8)")
+    parser.add_argument("--json", metavar="FILE", help="write machine-readable results to FILE")
+    parser.add_argument("--compare", metavar="FILE", help="show ratios against results from an earlier run")
+    args = parser.parse_args(argv)
+
+    results = {
+        "meta": {"commit": git_commit(), "python": sys.version.split()[0], "timestamp": time.time(),
+                 "latency": args.latency, "concurrency": args.concurrency},
+        "stages": bench_stages(args.iterations),
+        "throughput": bench_throughput(args.recipes, args.latency, args.concurrency),
+        "memory": bench_memory(args.recipes * 5, args.concurrency)
+    }
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
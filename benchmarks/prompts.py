@@ -0,0 +1,136 @@
+"""Compare the prompt variants: prompt tokens, output tokens, latency and cost
+
+Offline (the default) it counts prompt tokens with LiteLLM's tokenizer for the
+model and prices them with LiteLLM's cost table; nothing is sent anywhere.
+With --live it also generates recipes with each variant through the real API
+(this costs money) and reports output tokens, latency, failures and total cost.
+
+    python benchmarks/prompts.py --model gpt-4o-mini
+    python benchmarks/prompts.py --live --recipes 5 --json prompts.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import metrics
+from recipe_generator import RecipeGenerator
+from recipe_prompts import PROMPT_VARIANTS
+from recipegenie import load_config
+
+SAMPLE_SPECS = [
+    {"cuisine": "Thai", "centerpiece": "Chicken", "calories": 500, "servings": 4, "prep_time": 30,
+     "additional_info": ""},
+    {"cuisine": "Italian (Southern)", "centerpiece": "Eggplant", "calories": 650, "servings": 2, "prep_time": 45,
+     "additional_info": "Vegetarian, no nuts."},
+    {"cuisine": "Mexican (Oaxacan)", "centerpiece": "Pork shoulder", "calories": 800, "servings": 8, "prep_time": 90,
+     "additional_info": "Make it suitable for a party buffet."},
+    {"cuisine": "Japanese", "centerpiece": "Salmon", "calories": 400, "servings": 1, "prep_time": 15,
+     "additional_info": ""}
+]
+
+def token_cost(generator: RecipeGenerator, prompt_tokens: float, completion_tokens: float = 0) -> Optional[float]:
+    """Price tokens with LiteLLM's cost table, or None if the model is not in it"""
+    try:
+        prompt_cost, completion_cost = generator.llm.cost_per_token(
+            model=generator.model, prompt_tokens=int(prompt_tokens), completion_tokens=int(completion_tokens))
+        return prompt_cost + completion_cost
+    except Exception:
+        return None
+
+def measure_variant(config: Dict[str, Any], variant: str, live: bool, recipes: int) -> Dict[str, Any]:
+    """Measure one prompt variant over the sample specs"""
+    generator = RecipeGenerator(dict(config, prompt_variant=variant, cache={"enabled": False},
+                                     history={"enabled": False}))
+    prompts = [generator._build_prompt(**spec) for spec in SAMPLE_SPECS]
+    prompt_tokens = [generator.count_tokens(prompt) for prompt in prompts]
+    result: Dict[str, Any] = {
+        "model": generator.model,
+        "prompt_tokens": statistics.fmean(prompt_tokens),
+        "max_tokens": statistics.fmean(generator.estimate_max_tokens(spec["servings"], spec["prep_time"])
+                                       for spec in SAMPLE_SPECS),
+        "input_cost_per_1000": None
+    }
+    cost = token_cost(generator, result["prompt_tokens"])
+    if cost is not None:
+        result["input_cost_per_1000"] = cost * 1000
+    if not live:
+        return result
+
+    metrics.registry.reset()
+    latencies: List[float] = []
+    failures = 0
+    for i in range(recipes):
+        spec = SAMPLE_SPECS[i % len(SAMPLE_SPECS)]
+        started = time.perf_counter()
+        try:
+            generator.generate_recipe(**spec)
+            latencies.append(time.perf_counter() - started)
+        except ValueError as e:
+            failures += 1
+            print(f"{variant}: generation failed: {str(e)}", file=sys.stderr)
+
+    tokens = {"prompt": 0.0, "completion": 0.0}
+    for counter in metrics.registry.to_dict()["counters"].get("recipegenie_tokens_total", []):
+        tokens[counter["labels"]["type"]] += counter["value"]
+    attempts = max(1, recipes)
+    total_cost = token_cost(generator, tokens["prompt"], tokens["completion"])
+    result.update({
+        "recipes": recipes,
+        "failures": failures,
+        "output_tokens": tokens["completion"] / attempts,
+        "latency_p50_seconds": statistics.median(latencies) if latencies else None,
+        "cost_per_1000": total_cost / attempts * 1000 if total_cost is not None else None
+    })
+    return result
+
+def print_report(results: Dict[str, Dict[str, Any]]) -> None:
+    def money(value: Optional[float]) -> str:
+        return f"${value:8.4f}" if value is not None else "      n/a"
+
+    baseline = results.get("full", {})
+    print(f"Prompt variants for {next(iter(results.values()))['model']} (averaged over {len(SAMPLE_SPECS)} requests)\n")
+    print(f"{'variant':<9} {'prompt tok':>10} {'max_tokens':>10} {'input $/1000':>13}")
+    for variant, numbers in results.items():
+        saved = ""
+        if variant != "full" and baseline.get("prompt_tokens"):
+            saved = f"   {1 - numbers['prompt_tokens'] / baseline['prompt_tokens']:.0%} fewer prompt tokens"
+        print(f"{variant:<9} {numbers['prompt_tokens']:>10.0f} {numbers['max_tokens']:>10.0f} "
+              f"{money(numbers['input_cost_per_1000']):>13}{saved}")
+
+    if any("recipes" in numbers for numbers in results.values()):
+        print(f"\n{'variant':<9} {'output tok':>10} {'p50 latency':>12} {'failures':>9} {'total $/1000':>13}")
+        for variant, numbers in results.items():
+            latency = numbers["latency_p50_seconds"]
+            print(f"{variant:<9} {numbers['output_tokens']:>10.0f} "
+                  f"{(f'{latency:.2f}s' if latency is not None else 'n/a'):>12} "
+                  f"{numbers['failures']:>4}/{numbers['recipes']:<4} {money(numbers['cost_per_1000']):>13}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare the prompt variants' token use, latency and cost.")
+    parser.add_argument("--config", default=os.path.join(ROOT, 'config.json'), help="path to config.json")
+    parser.add_argument("--model", help="model to measure (default: the one in config.json)")
+    parser.add_argument("--live", action="store_true", help="also generate recipes through the real API (costs money)")
+    parser.add_argument("--recipes", type=int, default=4, help="recipes per variant with --live (default 4)")
+    parser.add_argument("--json", metavar="FILE", help="write machine-readable results to FILE")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.model:
+        config["model"] = args.model
+    results = {variant: measure_variant(config, variant, args.live, args.recipes) for variant in PROMPT_VARIANTS}
+    print_report(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
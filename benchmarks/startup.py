@@ -0,0 +1,112 @@
+"""Startup-time benchmark for Recipe Genie
+
+Measures how long it takes for the main window to become interactive and
+which imports dominate startup, using ``python -X importtime``. Without a
+display the window cannot be created, so only import times are measured.
+
+    python benchmarks/startup.py --runs 5 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parse -X importtime output into (module, self_us, cumulative_us) tuples"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        try:
+            imports.append((fields[2].strip(), int(fields[0]), int(fields[1])))
+        except ValueError:
+            continue
+    return imports
+
+def run_once(args: List[str], ready_marker: Optional[str]) -> Dict[str, Any]:
+    """Run a Python command with -X importtime and time it until it prints the ready marker or exits"""
+    env = dict(os.environ, RECIPEGENIE_EXIT_WHEN_READY="1", PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, "-X", "importtime"] + args, cwd=ROOT, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    ready_time = None
+    if ready_marker:
+        for line in proc.stdout:
+            if line.startswith(ready_marker):
+                ready_time = time.perf_counter() - started
+                break
+    stdout, stderr = proc.communicate()
+    total_time = time.perf_counter() - started
+    return {
+        "returncode": proc.returncode,
+        "ready_seconds": ready_time,
+        "total_seconds": total_time,
+        "imports": parse_importtime(stderr)
+    }
+
+def summarize(runs: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    """Combine several runs into medians and a list of the slowest imports"""
+    cumulative: Dict[str, List[int]] = {}
+    for run in runs:
+        for name, _, cumulative_us in run["imports"]:
+            cumulative.setdefault(name, []).append(cumulative_us)
+    slowest = sorted(((statistics.median(values), name) for name, values in cumulative.items()), reverse=True)
+    ready = [run["ready_seconds"] for run in runs if run["ready_seconds"] is not None]
+    return {
+        "runs": len(runs),
+        "ready_seconds_median": statistics.median(ready) if ready else None,
+        "total_seconds_median": statistics.median(run["total_seconds"] for run in runs),
+        "litellm_imported": any(name.strip() == "litellm" for name in cumulative),
+        "slowest_imports_us": [{"module": name, "cumulative_us": int(us)} for us, name in slowest[:top]]
+    }
+
+def measure(label: str, args: List[str], ready_marker: Optional[str], runs: int, top: int) -> Dict[str, Any]:
+    results = [run_once(args, ready_marker) for _ in range(runs)]
+    summary = summarize(results, top)
+    summary["target"] = label
+    return summary
+
+def print_report(summary: Dict[str, Any]) -> None:
+    print(f"\n== {summary['target']} ({summary['runs']} run(s)) ==")
+    if summary["ready_seconds_median"] is not None:
+        print(f"Window interactive after: {summary['ready_seconds_median'] * 1000:.0f} ms (median)")
+    print(f"Process wall time:        {summary['total_seconds_median'] * 1000:.0f} ms (median)")
+    print(f"litellm imported at startup: {'yes' if summary['litellm_imported'] else 'no'}")
+    print("Slowest imports (cumulative):")
+    for entry in summary["slowest_imports_us"]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f} ms  {entry['module']}")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Measure Recipe Genie startup time.")
+    parser.add_argument("--runs", type=int, default=3, help="number of runs per target (default 3)")
+    parser.add_argument("--top", type=int, default=15, help="number of slowest imports to list (default 15)")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON to FILE")
+    args = parser.parse_args(argv)
+
+    summaries = []
+    gui = measure("gui: time to interactive window", ["main.py"], "READY", args.runs, args.top)
+    if gui["ready_seconds_median"] is None:
+        print("Main window did not start (no display?); measuring imports only.", file=sys.stderr)
+        gui = measure("gui: import main", ["-c", "import main"], None, args.runs, args.top)
+    summaries.append(gui)
+    summaries.append(measure("cli: import recipegenie", ["-c", "import recipegenie"], None, args.runs, args.top))
+
+    for summary in summaries:
+        print_report(summary)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({"python": sys.version.split()[0], "results": summaries}, f, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,56 +1,205 @@
+import atexit
+import datetime
 import json
 import os
-import datetime
-from typing import Any, Dict
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+class DebugLogWriter:
+    """Append debug records as JSON lines from a background thread
+
+    Callers only serialize the record and put it on a bounded queue, so no
+    disk I/O happens on the calling thread. When the queue is full, records
+    are dropped (and counted) instead of blocking. The log is rotated by size
+    and, optionally, by age, keeping `backup_count` old files
+    (recipegenie.jsonl.1 is the newest).
+    """
+
+    def __init__(self, directory: str = "debug_logs", filename: str = "recipegenie.jsonl",
+                 max_bytes: int = 5 * 1024 * 1024, backup_count: int = 5,
+                 rotate_seconds: Optional[float] = None, queue_size: int = 1000):
+        self.directory = os.path.abspath(directory)
+        self.path = os.path.join(self.directory, filename)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_seconds = rotate_seconds
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._opened_at = 0.0
+        self._thread = threading.Thread(target=self._run, name="debug-log-writer", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]) -> bool:
+        """Queue a record for writing; returns False if it had to be dropped"""
+        line = json.dumps(record, separators=(',', ':'), default=repr) + "\n"
+        try:
+            self._queue.put_nowait(line)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait (up to timeout seconds) until everything queued so far is on disk"""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Flush and stop the writer thread"""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _open(self) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._opened_at = time.time()
+
+    def _should_rotate(self) -> bool:
+        if self._file.tell() >= self.max_bytes:
+            return True
+        return bool(self.rotate_seconds) and time.time() - self._opened_at >= self.rotate_seconds
+
+    def _rotate(self) -> None:
+        self._file.close()
+        self._file = None
+        for i in range(self.backup_count - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.unlink(self.path)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                # Write everything that is already waiting before flushing once
+                batch = [item]
+                while True:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = self._write_batch(batch)
+            except Exception as e:
+                print(f"Debug log writer error: {str(e)}")
+                stop = False
+            if stop:
+                return
+
+    def _write_batch(self, batch: list) -> bool:
+        stop = False
+        for item in batch:
+            if item is None:
+                stop = True
+            elif isinstance(item, threading.Event):
+                if self._file is not None:
+                    self._file.flush()
+                item.set()
+            else:
+                # A failed write loses only its own record; flushes queued behind it still complete
+                try:
+                    if self._file is None:
+                        self._open()
+                    self._file.write(item)
+                    if self._should_rotate():
+                        self._rotate()
+                except OSError as e:
+                    self.dropped += 1
+                    print(f"Debug log writer error: {str(e)}")
+        if self._file is not None:
+            self._file.flush()
+            if stop:
+                self._file.close()
+                self._file = None
+        return stop
+
+
+_writer: Optional[DebugLogWriter] = None
+_writer_lock = threading.Lock()
+_settings: Dict[str, Any] = {}
+_recipe_sample_rate = 1.0
+
+def configure(config: Dict[str, Any]) -> None:
+    """Apply the "debug_log" section of config.json
+
+    Keys: directory, max_size_mb, backup_count, rotate_hours, queue_size,
+    and recipe_sample_rate (fraction of successful recipes that are logged).
+    """
+    global _writer, _settings, _recipe_sample_rate
+    with _writer_lock:
+        if _writer is not None:
+            _writer.close()
+            _writer = None
+        rotate_hours = config.get('rotate_hours')
+        _settings = {
+            'directory': config.get('directory', "debug_logs"),
+            'max_bytes': int(config.get('max_size_mb', 5) * 1024 * 1024),
+            'backup_count': config.get('backup_count', 5),
+            'rotate_seconds': rotate_hours * 3600 if rotate_hours else None,
+            'queue_size': config.get('queue_size', 1000)
+        }
+        _recipe_sample_rate = config.get('recipe_sample_rate', 1.0)
+
+def get_writer() -> DebugLogWriter:
+    """Return the shared writer, starting it on first use"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = DebugLogWriter(**_settings)
+    return _writer
+
+def flush() -> None:
+    """Write out everything logged so far; registered to run at exit"""
+    if _writer is not None:
+        _writer.close()
+
+atexit.register(flush)
+
+def _timestamp() -> str:
+    return datetime.datetime.now().isoformat(timespec='microseconds')
 
 def log_error(error_message: str, data: Any = None) -> None:
     """
-    Log error information to a debug file
-    
+    Log error information to the debug log
+
     Args:
         error_message: The error message to log
         data: Optional data to include in the log
     """
-    debug_dir = "debug_logs"
-    os.makedirs(debug_dir, exist_ok=True)
-    
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{debug_dir}/error_{timestamp}.log"
-    
-    with open(filename, 'w') as f:
-        f.write(f"ERROR: {error_message}\n\n")
-        if data is not None:
-            f.write("DATA:\n")
-            try:
-                if isinstance(data, dict) or isinstance(data, list):
-                    f.write(json.dumps(data, indent=2))
-                else:
-                    f.write(str(data))
-            except Exception as e:
-                f.write(f"Could not serialize data: {str(e)}\n")
-                f.write(f"Data type: {type(data)}\n")
-                f.write(f"Data representation: {repr(data)}\n")
+    record = {"time": _timestamp(), "type": "error", "message": error_message}
+    if data is not None:
+        record["data"] = data if isinstance(data, (dict, list)) else str(data)
+    get_writer().write(record)
 
 def save_recipe_data(recipe_data: Any) -> None:
     """
     Save recipe data for debugging purposes
-    
+
+    Only a sample of recipes is kept when recipe_sample_rate is below 1.
+
     Args:
         recipe_data: The recipe data to save
     """
-    debug_dir = "debug_logs"
-    os.makedirs(debug_dir, exist_ok=True)
-    
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{debug_dir}/recipe_data_{timestamp}.json"
-    
-    with open(filename, 'w') as f:
-        try:
-            if isinstance(recipe_data, dict):
-                json.dump(recipe_data, f, indent=2)
-            else:
-                f.write(f"Non-dict data: {repr(recipe_data)}")
-        except Exception as e:
-            f.write(f"Error saving recipe data: {str(e)}\n")
-            f.write(f"Data type: {type(recipe_data)}\n")
-            f.write(f"Data representation: {repr(recipe_data)}\n")
+    if _recipe_sample_rate < 1.0 and random.random() >= _recipe_sample_rate:
+        return
+    record = {"time": _timestamp(), "type": "recipe"}
+    if isinstance(recipe_data, dict):
+        record["data"] = recipe_data
+    else:
+        record["message"] = f"Non-dict data: {repr(recipe_data)}"
+    get_writer().write(record)
@@ -0,0 +1,169 @@
+"""Deterministic stand-in for litellm, for offline runs, the server and benchmarks
+
+Install it with ``recipe_generator.use_backend(FakeLiteLLM(...))``. It answers
+completion()/acompletion() calls with synthetic recipes built from the
+parameters in the prompt (or with recorded responses), after a simulated
+latency, and returns objects shaped like LiteLLM's ModelResponse.
+"""
+import asyncio
+import itertools
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+class _Obj:
+    """Minimal attribute bag used to mimic LiteLLM response objects"""
+
+    def __init__(self, **kwargs: Any):
+        self.__dict__.update(kwargs)
+
+def _prompt_param(prompt: str, label: str, default: str) -> str:
+    # "- Label: **value**" in the full prompt, "Label: value ..." in the compact one
+    match = re.search(rf"{re.escape(label)}[^*\n]*\*\*(.*?)\*\*", prompt)
+    if match is None:
+        match = re.search(rf"^{re.escape(label)}: ([^\n]+)", prompt, re.IGNORECASE | re.MULTILINE)
+    return match.group(1) if match else default
+
+def _prompt_int(prompt: str, label: str, default: int) -> int:
+    match = re.match(r"\d+", _prompt_param(prompt, label, ""))
+    return int(match.group(0)) if match else default
+
+# The line RecipeGenerator.generate_variants() adds to ask for several recipes in one response
+_VARIANTS_REQUEST = re.compile(r"create (\d+) clearly different recipes")
+
+def synthetic_recipe(prompt: str, ingredients: int = 10, steps: int = 8, seed: int = 0) -> Dict[str, Any]:
+    """Build a plausible recipe for the parameters found in a _build_prompt() prompt"""
+    rng = random.Random(f"{prompt}|{seed}")
+    cuisine = _prompt_param(prompt, "Cuisine", "Fusion")
+    centerpiece = _prompt_param(prompt, "Main Ingredient", "Chicken")
+    servings = _prompt_int(prompt, "Number of Servings", 4)
+    calories = _prompt_int(prompt, "Calories per Serving", 500)
+    units = ["cup", "cups", "tbsp", "tsp", "g", "oz", "lb", "cloves", "whole"]
+    pantry = ["onion", "garlic", "olive oil", "salt", "black pepper", "tomato", "rice", "butter",
+              "lemon juice", "cilantro", "ginger", "soy sauce", "chili flakes", "cumin", "paprika",
+              "chicken stock", "carrot", "bell pepper", "potato", "cream", "parsley", "honey"]
+    items = [{"name": centerpiece, "amount": f"{servings * 150} g"}]
+    for i in range(max(0, ingredients - 1)):
+        items.append({
+            "name": pantry[(i + rng.randrange(len(pantry))) % len(pantry)],
+            "amount": f"{rng.choice(['1/2', '1', '2', '3', '1 1/2'])} {rng.choice(units)}"
+        })
+    protein = round(calories * 0.3 / 4)
+    fat = round(calories * 0.3 / 9)
+    carbs = round(calories * 0.4 / 4)
+    return {
+        "title": f"{cuisine} {centerpiece} #{rng.randrange(1000)}",
+        "description": f"A simple {cuisine.lower()} dish built around {centerpiece.lower()}.",
+        "cuisine": cuisine,
+        "servings": servings,
+        "calories_per_serving": calories,
+        "prep_time_minutes": rng.choice([10, 15, 20, 25]),
+        "cook_time_minutes": rng.choice([15, 20, 30, 45]),
+        "ingredients": items,
+        "instructions": [f"Step {i + 1}: Prepare and cook the {items[i % len(items)]['name']} carefully."
+                         for i in range(steps)],
+        "nutrition": {"calories": calories, "protein_g": protein, "fat_g": fat, "carbohydrates_g": carbs}
+    }
+
+
+class FakeLiteLLM:
+    """Offline replacement for the parts of the litellm module RecipeGenerator uses
+
+    Args:
+        latency: Simulated seconds before the first token
+        jitter: Extra random latency, up to this many seconds
+        ingredients: Number of ingredients in synthetic recipes
+        steps: Number of instructions in synthetic recipes
+        responses: Recorded response texts to serve in rotation instead of synthetic recipes
+        chunk_size: Characters per chunk when streaming
+        chunk_delay: Seconds between streamed chunks
+        preamble: Commentary placed before the JSON, as chatty models do
+        max_output_tokens: What get_max_tokens() reports, or None for a model LiteLLM does not know
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, ingredients: int = 10, steps: int = 8,
+                 responses: Optional[List[str]] = None, chunk_size: int = 16, chunk_delay: float = 0.0,
+                 preamble: str = "Here is your recipe:\n", max_output_tokens: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.ingredients = ingredients
+        self.steps = steps
+        self.responses = responses
+        self.chunk_size = chunk_size
+        self.chunk_delay = chunk_delay
+        self.preamble = preamble
+        self.max_output_tokens = max_output_tokens
+        self.calls = 0
+        self.last_request: Dict[str, Any] = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs: Any) -> "FakeLiteLLM":
+        """Serve recorded responses from a JSONL file of recipe objects or raw response strings"""
+        responses = []
+        with open(path, 'r') as f:
+            for line in f:
+                if line.strip():
+                    value = json.loads(line)
+                    responses.append(value if isinstance(value, str) else json.dumps(value))
+        return cls(responses=responses, **kwargs)
+
+    def _next_text(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+            number = next(self._counter)
+        if self.responses:
+            return self.responses[number % len(self.responses)]
+        variants = _VARIANTS_REQUEST.search(prompt)
+        if variants is not None:
+            count = int(variants.group(1))
+            recipes = [synthetic_recipe(prompt, self.ingredients, self.steps, number * count + i) for i in range(count)]
+            return self.preamble + json.dumps({"recipes": recipes}, indent=2)
+        recipe = synthetic_recipe(prompt, self.ingredients, self.steps, number)
+        return self.preamble + json.dumps(recipe, indent=2)
+
+    def _delay(self) -> float:
+        with self._lock:
+            return self.latency + (self._rng.random() * self.jitter if self.jitter else 0.0)
+
+    def _response(self, model: str, prompt: str, texts: List[str]) -> _Obj:
+        completion_tokens = sum(len(text) // 4 for text in texts)
+        usage = _Obj(prompt_tokens=len(prompt) // 4, completion_tokens=completion_tokens,
+                     total_tokens=len(prompt) // 4 + completion_tokens)
+        choices = [_Obj(index=i, message=_Obj(role="assistant", content=text), finish_reason="stop")
+                   for i, text in enumerate(texts)]
+        return _Obj(model=model, choices=choices, usage=usage)
+
+    def _chunks(self, model: str, text: str) -> Iterator[_Obj]:
+        for start in range(0, len(text), self.chunk_size):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            delta = _Obj(role="assistant", content=text[start:start + self.chunk_size])
+            yield _Obj(model=model, choices=[_Obj(index=0, delta=delta, finish_reason=None)])
+
+    def get_max_tokens(self, model: str) -> int:
+        if self.max_output_tokens is None:
+            raise Exception(f"Model {model} isn't mapped yet")
+        return self.max_output_tokens
+
+    def completion(self, model: str, messages: List[Dict[str, str]], stream: bool = False, n: int = 1,
+                   **kwargs: Any) -> Any:
+        self.last_request = dict(kwargs, model=model, messages=messages, stream=stream, n=n)
+        prompt = messages[-1]["content"]
+        texts = [self._next_text(prompt) for _ in range(n or 1)]
+        time.sleep(self._delay())
+        if stream:
+            return self._chunks(model, texts[0])
+        return self._response(model, prompt, texts)
+
+    async def acompletion(self, model: str, messages: List[Dict[str, str]], n: int = 1, **kwargs: Any) -> Any:
+        self.last_request = dict(kwargs, model=model, messages=messages, n=n)
+        prompt = messages[-1]["content"]
+        texts = [self._next_text(prompt) for _ in range(n or 1)]
+        await asyncio.sleep(self._delay())
+        return self._response(model, prompt, texts)
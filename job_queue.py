@@ -0,0 +1,116 @@
+import itertools
+import queue
+import threading
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Event kinds delivered by RecipeJobQueue.poll()
+JOB_PROGRESS = "progress"
+JOB_DONE = "done"
+JOB_ERROR = "error"
+JOB_CANCELLED = "cancelled"
+
+
+class RecipeJob:
+    """A single unit of work submitted to the job queue"""
+
+    def __init__(self, job_id: int, description: str, func: Callable[["RecipeJob"], Any], events: queue.Queue):
+        self.job_id = job_id
+        self.description = description
+        self.func = func
+        self.cancel_event = threading.Event()
+        self.started = False
+        self.future: Optional[Future] = None
+        self._events = events
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def report(self, payload: Any) -> None:
+        """Send an intermediate result back to the polling thread"""
+        if not self.cancelled:
+            self._events.put((self, JOB_PROGRESS, payload))
+
+
+class RecipeJobQueue:
+    """Run recipe jobs on a worker pool and hand the results back through a queue
+
+    Jobs run on background threads; the owner (normally the Tk main loop)
+    calls poll() periodically to collect finished results, so nothing here
+    ever touches widgets directly.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recipe-worker")
+        self._events: queue.Queue = queue.Queue()
+        self._jobs: Dict[int, RecipeJob] = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def submit(self, func: Callable[[RecipeJob], Any], description: str = "") -> RecipeJob:
+        """Queue func(job) to run on a worker thread and return its job handle"""
+        job = RecipeJob(next(self._ids), description, func, self._events)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job
+
+    def _run(self, job: RecipeJob) -> None:
+        if job.cancelled:
+            return
+        job.started = True
+        try:
+            result = job.func(job)
+        except Exception as e:
+            if not job.cancelled:
+                self._events.put((job, JOB_ERROR, (e, traceback.format_exc())))
+            return
+        if not job.cancelled:
+            self._events.put((job, JOB_DONE, result))
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancel a queued or running job
+
+        A job that is already talking to the LLM cannot be interrupted, but its
+        result is discarded when it arrives.
+        """
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is None:
+            return False
+        job.cancel_event.set()
+        if job.future is not None:
+            job.future.cancel()  # drops it from the pool's queue if it has not started
+        self._events.put((job, JOB_CANCELLED, None))
+        return True
+
+    def cancel_all(self) -> None:
+        """Cancel every outstanding job"""
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+
+    def pending(self) -> List[RecipeJob]:
+        """Return the jobs that have not finished yet, oldest first"""
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.job_id)
+
+    def poll(self) -> List[Tuple[RecipeJob, str, Any]]:
+        """Drain all events that are ready without blocking"""
+        events = []
+        while True:
+            try:
+                job, kind, payload = self._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind in (JOB_DONE, JOB_ERROR):
+                with self._lock:
+                    self._jobs.pop(job.job_id, None)
+            events.append((job, kind, payload))
+        return events
+
+    def shutdown(self) -> None:
+        """Cancel outstanding jobs and stop the worker threads"""
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
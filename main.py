@@ -3,23 +3,74 @@ from tkinter import ttk, scrolledtext, filedialog, messagebox
 import json
 import os
 import sys
-import traceback
-import pyperclip  # For clipboard functionality
+import threading
+import time
+import metrics
 from recipe_generator import RecipeGenerator
-from recipe_printer import print_recipe
+from recipe_history import SimilarRecipe
+from recipe_render import RENDERERS, export_recipes, file_name, format_recipe_text, render, renderer_for_path
+from recipe_schema import validate
+from results_viewer import ResultsViewer
+import debug_utils
 from debug_utils import log_error, save_recipe_data
+from prefetch import RecipePrefetcher
+from job_queue import RecipeJobQueue, JOB_PROGRESS, JOB_DONE, JOB_ERROR, JOB_CANCELLED
+from pantry import pantry_request, parse_pantry
+
+# How often (ms) the Tk loop checks for finished background jobs
+POLL_INTERVAL_MS = 100
 
 class RecipeApp:
     def __init__(self, root):
         self.root = root
         self.root.title("Recipe Genie")
-        self.root.geometry("600x400")
-        self.root.minsize(600, 400)  
+        self.root.geometry("600x520")
+        self.root.minsize(600, 520)  
         
         self.config = self.load_config()
-        self.recipe_generator = RecipeGenerator(self.config)
+        debug_utils.configure(self.config.get('debug_log', {}))
+        self.recipe_generator = None  # built on the job queue; see on_generator_ready()
+        self.job_queue = RecipeJobQueue(max_workers=self.config.get('max_workers', 2))
+        self.results_viewer = ResultsViewer.from_config(self, self.config.get('results_viewer', {}))
+        self.plan_views = {}  # job_id -> widgets of a meal-plan window
+        self.generation_forms = {}  # job_id -> form values of a single-recipe job
+        self.variant_forms = {}  # job_id -> form values of a job generating several variants at once
+        self.prefetcher = None
+        self.print_queue = None  # created on first print
+        self.print_status = ""
         
         self.create_main_window()
+        
+        # Opening the history database and the cache happens off the UI thread;
+        # the buttons that need the generator stay disabled until it is ready
+        self.set_generator_ready(False)
+        self.setup_job = self.job_queue.submit(lambda job: RecipeGenerator(self.config), "Starting up")
+        
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(POLL_INTERVAL_MS, self.poll_jobs)
+    
+    def on_generator_ready(self, kind, payload):
+        """Finish startup once the setup job has built the recipe generator"""
+        if kind == JOB_DONE:
+            self.recipe_generator = payload
+            self.prefetcher = RecipePrefetcher.from_config(self.recipe_generator, self.config.get('prefetch', {}))
+            self.set_generator_ready(True)
+            # Load LiteLLM in the background too, so the first request does not pay for the import
+            self.start_warm_up()
+        elif kind == JOB_ERROR:
+            error, trace = payload
+            print(trace)
+            log_error(f"Failed to start: {str(error)}", trace)
+            messagebox.showerror("Error", f"Failed to start Recipe Genie: {str(error)}")
+    
+    def set_generator_ready(self, ready):
+        """Enable the buttons that need the recipe generator, or disable them while it is being built"""
+        for button in self.generator_buttons:
+            button.state(['!disabled' if ready else 'disabled'])
+    
+    def start_warm_up(self):
+        """Import the LLM library on a background thread"""
+        threading.Thread(target=self.recipe_generator.warm_up, name="litellm-warm-up", daemon=True).start()
     
     def load_config(self):
         """Load configuration from config.json file"""
@@ -40,14 +91,10 @@ class RecipeApp:
         form_frame = ttk.Frame(self.root, padding="20")
         form_frame.pack(fill=tk.BOTH, expand=True)
         
-        # Store references to input widgets for enabling/disabling
-        self.input_widgets = []
-        
         # Cuisine selection
         ttk.Label(form_frame, text="Cuisine:").grid(column=0, row=0, sticky=tk.W, pady=5)
         self.cuisine_var = tk.StringVar()
         self.cuisine_combo = ttk.Combobox(form_frame, textvariable=self.cuisine_var, width=30)
-        self.input_widgets.append(self.cuisine_combo)
         self.cuisine_combo['values'] = [
             "American", "American (Cajun)", "American (California Style)", "American (Creole)", 
             "American (Hawaiian)", "American (Midwestern)",  "American (New England)", "American (Pacific Northwest)", 
@@ -71,272 +118,749 @@ class RecipeApp:
         self.centerpiece_var = tk.StringVar()
         centerpiece_entry = ttk.Entry(form_frame, textvariable=self.centerpiece_var, width=30)
         centerpiece_entry.grid(column=1, row=1, sticky=(tk.W, tk.E), pady=5)
-        self.input_widgets.append(centerpiece_entry)
         
         # Calories
         ttk.Label(form_frame, text="Calories per Serving:").grid(column=0, row=2, sticky=tk.W, pady=5)
         self.calories_var = tk.StringVar(value="500")
         calories_entry = ttk.Entry(form_frame, textvariable=self.calories_var, width=30)
         calories_entry.grid(column=1, row=2, sticky=(tk.W, tk.E), pady=5)
-        self.input_widgets.append(calories_entry)
         
         # Servings
         ttk.Label(form_frame, text="Number of Servings:").grid(column=0, row=3, sticky=tk.W, pady=5)
         self.servings_var = tk.StringVar(value="4")
         servings_entry = ttk.Entry(form_frame, textvariable=self.servings_var, width=30)
         servings_entry.grid(column=1, row=3, sticky=(tk.W, tk.E), pady=5)
-        self.input_widgets.append(servings_entry)
         
         # Maximum Prep Time
         ttk.Label(form_frame, text="Maximum Prep Time (minutes):").grid(column=0, row=4, sticky=tk.W, pady=5)
         self.prep_time_var = tk.StringVar(value="30")
         prep_time_entry = ttk.Entry(form_frame, textvariable=self.prep_time_var, width=30)
         prep_time_entry.grid(column=1, row=4, sticky=(tk.W, tk.E), pady=5)
-        self.input_widgets.append(prep_time_entry)
         
         # Additional information
         ttk.Label(form_frame, text="Additional Information:").grid(column=0, row=5, sticky=tk.W, pady=5)
         self.additional_info_text = scrolledtext.ScrolledText(form_frame, width=40, height=6, wrap=tk.WORD)  # Reduced height
         self.additional_info_text.grid(column=0, row=6, columnspan=2, sticky=(tk.W, tk.E), pady=5)
-        self.input_widgets.append(self.additional_info_text)
         
-        # Generate button
-        self.generate_button = ttk.Button(form_frame, text="Generate Recipe", command=self.generate_recipe)
-        self.generate_button.grid(column=0, row=7, columnspan=2, pady=10)  # Reduced padding
-        self.input_widgets.append(self.generate_button)
+        # Generate buttons
+        generate_frame = ttk.Frame(form_frame)
+        generate_frame.grid(column=0, row=7, sticky=tk.W, pady=10)  # Reduced padding
+        self.generate_button = ttk.Button(generate_frame, text="Generate Recipe", command=self.generate_recipe)
+        self.generate_button.pack(side=tk.LEFT)
+        variants_button = ttk.Button(generate_frame, text="Variants", command=self.generate_variants)
+        variants_button.pack(side=tk.LEFT, padx=(5, 0))
+        plan_button = ttk.Button(generate_frame, text="Plan a Week...", command=self.open_plan_window)
+        plan_button.pack(side=tk.LEFT, padx=5)
+        history_button = ttk.Button(generate_frame, text="History...", command=self.open_history_window)
+        history_button.pack(side=tk.LEFT)
+        pantry_button = ttk.Button(generate_frame, text="Pantry...", command=self.open_pantry_window)
+        pantry_button.pack(side=tk.LEFT, padx=(5, 0))
+        self.generator_buttons = [self.generate_button, variants_button, plan_button, history_button, pantry_button]
+        
+        # Skip the response cache and history to get a different recipe for the same request
+        self.fresh_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(form_frame, text="Always generate a new recipe", 
+                        variable=self.fresh_var).grid(column=1, row=7, sticky=tk.W, pady=10)
+        
+        # Recipes in progress
+        self.status_var = tk.StringVar(value="Ready")
+        ttk.Label(form_frame, textvariable=self.status_var).grid(column=0, row=8, columnspan=2, sticky=tk.W)
+        self.jobs_listbox = tk.Listbox(form_frame, height=4)
+        self.jobs_listbox.grid(column=0, row=9, columnspan=2, sticky=(tk.W, tk.E), pady=5)
+        self.cancel_button = ttk.Button(form_frame, text="Cancel Selected", command=self.cancel_selected_job)
+        self.cancel_button.grid(column=0, row=10, columnspan=2, pady=5)
+        self.cancel_button.state(['disabled'])
         
         # Configure grid weights
         form_frame.columnconfigure(1, weight=1)
         
-    def create_results_window(self, recipe_data):
-        """Create the results window to display the generated recipe"""
-        results_window = tk.Toplevel(self.root)
-        results_window.title(recipe_data["title"])
-        results_window.geometry("700x700")
-        results_window.minsize(700, 700)
-        
-        # Create a frame for the content
-        content_frame = ttk.Frame(results_window, padding="20")
-        content_frame.pack(fill=tk.BOTH, expand=True)
-        
-        # Recipe title
-        title_label = ttk.Label(content_frame, text=recipe_data["title"], font=("Arial", 16, "bold"))
-        title_label.pack(anchor=tk.W, pady=(0, 10))
-        
-        # Recipe description
-        desc_label = ttk.Label(content_frame, text=recipe_data["description"], wraplength=650)
-        desc_label.pack(anchor=tk.W, pady=(0, 15))
-        
-        # Recipe details
-        time_info = ""
-        if "prep_time_minutes" in recipe_data:
-            time_info = f" | Prep: {recipe_data['prep_time_minutes']} min"
-        if "cook_time_minutes" in recipe_data:
-            time_info += f" | Cook: {recipe_data['cook_time_minutes']} min"
-            
-        details_text = f"Cuisine: {recipe_data['cuisine']} | Servings: {recipe_data['servings']} | Calories: {recipe_data['calories_per_serving']} per serving{time_info}"
-        details_label = ttk.Label(content_frame, text=details_text)
-        details_label.pack(anchor=tk.W, pady=(0, 15))
-        
-        # Recipe content
-        recipe_text = scrolledtext.ScrolledText(content_frame, width=80, height=25, wrap=tk.WORD)
-        recipe_text.pack(fill=tk.BOTH, expand=True, pady=(0, 15))
-        
-        # Format the recipe text
-        formatted_recipe = self.format_recipe_text(recipe_data)
-        recipe_text.insert(tk.END, formatted_recipe)
-        recipe_text.config(state=tk.DISABLED)  # Make it read-only
-        
-        # Buttons frame
-        buttons_frame = ttk.Frame(content_frame)
-        buttons_frame.pack(fill=tk.X, pady=(0, 10))
-        
-        # New Recipe button
-        new_recipe_btn = ttk.Button(buttons_frame, text="New Recipe", 
-                                   command=results_window.destroy)
-        new_recipe_btn.pack(side=tk.LEFT, padx=5)
-        
-        # Print button
-        print_btn = ttk.Button(buttons_frame, text="Print", 
-                              command=lambda: print_recipe(recipe_data, formatted_recipe))
-        print_btn.pack(side=tk.LEFT, padx=5)
-        
-        # Copy to Clipboard button
-        copy_btn = ttk.Button(buttons_frame, text="Copy to Clipboard", 
-                             command=lambda: self.copy_to_clipboard(recipe_data, formatted_recipe))
-        copy_btn.pack(side=tk.LEFT, padx=5)
+        # Prefetched recipes are only valid for the form they were generated for
+        for var in (self.cuisine_var, self.centerpiece_var, self.calories_var, self.servings_var, self.prep_time_var):
+            var.trace_add("write", lambda *args: self.on_form_changed())
+        self.additional_info_text.bind("<<Modified>>", lambda event: self.on_form_changed())
+    
+    def on_form_changed(self):
+        """Stop prefetching alternatives for the previous form values"""
+        self.additional_info_text.edit_modified(False)
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()
         
-        # Export button
-        export_btn = ttk.Button(buttons_frame, text="Export...", 
-                               command=lambda: self.export_recipe(recipe_data, formatted_recipe))
-        export_btn.pack(side=tk.LEFT, padx=5)
+    def create_results_window(self, recipe_data, similar_match=None, form=None, job_id=None):
+        """Show a recipe in the results viewer
         
-        # Store recipe data for later use
-        self.current_recipe = recipe_data
-        self.formatted_recipe = formatted_recipe
+        Args:
+            recipe_data (dict): The validated recipe
+            similar_match (SimilarRecipe): Set when the recipe comes from the history for a similar request
+            form (dict): The request the similar recipe is offered for, used by "Generate Fresh Anyway"
+            job_id (int): The job that streamed the recipe, whose entry it completes
+        """
+        self.results_viewer.show(recipe_data, similar_match=similar_match, form=form, job_id=job_id)
     
-    def generate_recipe(self):
-        """Generate a recipe using the LLM based on user inputs"""
+    def read_form(self):
+        """Read and validate the form, returning generate_recipe keyword arguments or None"""
         # Get values from form
         cuisine = self.cuisine_var.get().strip()
         centerpiece = self.centerpiece_var.get().strip()
-        calories = self.calories_var.get().strip()
-        servings = self.servings_var.get().strip()
-        prep_time = self.prep_time_var.get().strip()
-        additional_info = self.additional_info_text.get("1.0", tk.END).strip()
         
         # Validate inputs
-        if not cuisine or not centerpiece or not calories or not servings or not prep_time:
+        if (not cuisine or not centerpiece or not self.calories_var.get().strip()
+                or not self.servings_var.get().strip() or not self.prep_time_var.get().strip()):
             messagebox.showerror("Error", "Please fill in all required fields.")
-            return
+            return None
         
+        numbers = self.read_form_numbers()
+        if numbers is None:
+            return None
+        return dict(numbers, cuisine=cuisine, centerpiece=centerpiece)
+    
+    def read_form_numbers(self):
+        """Read the numeric fields and additional information shared by every recipe in a meal plan"""
         try:
-            calories = int(calories)
-            servings = int(servings)
-            prep_time = int(prep_time)
+            calories = int(self.calories_var.get().strip())
+            servings = int(self.servings_var.get().strip())
+            prep_time = int(self.prep_time_var.get().strip())
         except ValueError:
             messagebox.showerror("Error", "Calories, servings, and prep time must be numbers.")
+            return None
+        
+        return {
+            "calories": calories,
+            "servings": servings,
+            "prep_time": prep_time,
+            "additional_info": self.additional_info_text.get("1.0", tk.END).strip()
+        }
+    
+    def generate_recipe(self):
+        """Generate a recipe using the LLM based on user inputs"""
+        form = self.read_form()
+        if form is None:
             return
         
-        # Show loading indicator and disable controls
+        # Another recipe for the same form may already have been generated in the background
+        if self.prefetcher is not None:
+            recipe_data = self.prefetcher.take(form)
+            if recipe_data is not None:
+                self.create_results_window(recipe_data)
+                self.prefetcher.start(form)
+                return
+        
+        # Unless a new recipe is asked for, the worker first looks for one generated for a near-identical request
+        refresh = self.fresh_var.get()
+        self.start_generation(form, refresh, reuse_similar=not refresh)
+    
+    def start_generation(self, form, refresh=False, reuse_similar=False):
+        """Generate a recipe for the form values on a background worker"""
+        description = f"{form['cuisine']} {form['centerpiece']} ({form['servings']} servings)"
+        job = self.job_queue.submit(lambda job: self._run_generation(form, refresh, job, reuse_similar),
+                                    description)
+        self.generation_forms[job.job_id] = form
+        self.set_busy_state(True)
+    
+    def generate_variants(self):
+        """Generate several different recipes for the form in one request and list them in the results window"""
+        form = self.read_form()
+        if form is None:
+            return
+        count = self.config.get('variants', {}).get('count', 3)
+        description = f"{count} x {form['cuisine']} {form['centerpiece']} ({form['servings']} servings)"
+        job = self.job_queue.submit(lambda job: self.recipe_generator.generate_variants(**form, count=count),
+                                    description)
+        self.variant_forms[job.job_id] = form
         self.set_busy_state(True)
+    
+    def _run_generation(self, form, refresh=False, job=None, reuse_similar=False):
+        """Generate and check a recipe; runs on a worker thread, so no widget access here
         
-        try:
-            # Generate recipe
-            recipe_data = self.recipe_generator.generate_recipe(
-                cuisine, centerpiece, calories, servings, prep_time, additional_info
-            )
-            
-            # Save recipe data for debugging
+        Streamed fields are passed back to the main loop through job.report().
+        """
+        recipe_data = self.recipe_generator.generate_recipe(
+            **form, refresh=refresh, reuse_similar=reuse_similar,
+            on_event=(lambda kind, key, value: job.report((kind, key, value))) if job else None,
+            cancel_event=job.cancel_event if job else None
+        )
+        
+        # Save recipe data for debugging
+        with metrics.span("debug_save"):
             save_recipe_data(recipe_data)
-            
-            # Validate recipe data before displaying
-            if not isinstance(recipe_data, dict):
-                error_msg = f"Invalid recipe data format: {type(recipe_data)}"
-                log_error(error_msg, recipe_data)
-                raise ValueError(error_msg)
-            
-            required_keys = ["title", "description", "cuisine", "servings", 
-                            "calories_per_serving", "ingredients", "instructions", "nutrition"]
-            missing_keys = [key for key in required_keys if key not in recipe_data]
-            if missing_keys:
-                error_msg = f"Recipe data missing required keys: {', '.join(missing_keys)}"
-                log_error(error_msg, recipe_data)
-                raise ValueError(error_msg)
-            
-            # Display results
-            self.create_results_window(recipe_data)
+        
+        # Validate recipe data before displaying
+        if not isinstance(recipe_data, dict):
+            error_msg = f"Invalid recipe data format: {type(recipe_data)}"
+            log_error(error_msg, recipe_data)
+            raise ValueError(error_msg)
+        
+        required_keys = ["title", "description", "cuisine", "servings", 
+                        "calories_per_serving", "ingredients", "instructions", "nutrition"]
+        missing_keys = [key for key in required_keys if key not in recipe_data]
+        if missing_keys:
+            error_msg = f"Recipe data missing required keys: {', '.join(missing_keys)}"
+            log_error(error_msg, recipe_data)
+            raise ValueError(error_msg)
+        
+        return recipe_data
+    
+    def open_plan_window(self):
+        """Open the meal-plan window for generating several recipes at once"""
+        plan_window = tk.Toplevel(self.root)
+        plan_window.title("Plan a Week")
+        plan_window.geometry("600x550")
+        plan_window.minsize(600, 550)
+        
+        content_frame = ttk.Frame(plan_window, padding="20")
+        content_frame.pack(fill=tk.BOTH, expand=True)
+        
+        ttk.Label(content_frame, wraplength=550, text=(
+            "Enter one dinner per line as 'Cuisine, Main ingredient'. Calories, servings, "
+            "prep time and additional information are taken from the main form."
+        )).pack(anchor=tk.W, pady=(0, 10))
+        
+        lines_text = scrolledtext.ScrolledText(content_frame, width=60, height=8, wrap=tk.WORD)
+        lines_text.pack(fill=tk.X, pady=(0, 10))
+        cuisine = self.cuisine_var.get().strip()
+        centerpiece = self.centerpiece_var.get().strip()
+        if cuisine and centerpiece:
+            lines_text.insert(tk.END, f"{cuisine}, {centerpiece}\n")
+        
+        buttons_frame = ttk.Frame(content_frame)
+        buttons_frame.pack(fill=tk.X, pady=(0, 10))
+        
+        view = {
+            "window": plan_window,
+            "status_var": tk.StringVar(value="Ready"),
+            "recipes": []
+        }
+        start_btn = ttk.Button(buttons_frame, text="Generate Plan",
+                               command=lambda: self.start_meal_plan(view, lines_text.get("1.0", tk.END)))
+        start_btn.pack(side=tk.LEFT, padx=5)
+        view["start_button"] = start_btn
+        ttk.Button(buttons_frame, text="Print All", command=lambda: self.print_plan(view)).pack(side=tk.LEFT, padx=5)
+        
+        view["progress"] = ttk.Progressbar(content_frame, mode="determinate")
+        view["progress"].pack(fill=tk.X, pady=(0, 5))
+        ttk.Label(content_frame, textvariable=view["status_var"]).pack(anchor=tk.W, pady=(0, 10))
+        
+        # Finished recipes; double-click to open one
+        results_listbox = tk.Listbox(content_frame, height=10)
+        results_listbox.pack(fill=tk.BOTH, expand=True)
+        results_listbox.bind("<Double-Button-1>", lambda event: self.open_plan_recipe(view))
+        view["listbox"] = results_listbox
+        
+        plan_window.protocol("WM_DELETE_WINDOW", lambda: self.close_plan_window(view))
+    
+    def start_meal_plan(self, view, lines):
+        """Generate every recipe listed in the meal-plan window concurrently"""
+        form = self.read_form_numbers()
+        if form is None:
+            return
+        
+        specs = []
+        for line in lines.splitlines():
+            if not line.strip():
+                continue
+            cuisine, _, centerpiece = line.partition(",")
+            if not cuisine.strip() or not centerpiece.strip():
+                messagebox.showerror("Error", f"Expected 'Cuisine, Main ingredient' but got: {line.strip()}", parent=view["window"])
+                return
+            specs.append(dict(form, cuisine=cuisine.strip(), centerpiece=centerpiece.strip()))
+        if not specs:
+            messagebox.showerror("Error", "Please enter at least one dinner.", parent=view["window"])
+            return
+        
+        view["start_button"].state(['disabled'])
+        view["recipes"] = []
+        view["listbox"].delete(0, tk.END)
+        view["progress"].config(maximum=len(specs), value=0)
+        view["total"] = len(specs)
+        view["failed"] = 0
+        view["status_var"].set(f"Generating {len(specs)} recipes...")
+        
+        job = self.job_queue.submit(lambda job: self._run_meal_plan(specs, job), f"Meal plan ({len(specs)} recipes)")
+        view["job_id"] = job.job_id
+        self.plan_views[job.job_id] = view
+        self.set_busy_state(True)
+    
+    def _run_meal_plan(self, specs, job):
+        """Generate a meal plan; runs on a worker thread and reports each finished recipe"""
+        generated = 0
+        for result in self.recipe_generator.generate_many(specs, cancel_event=job.cancel_event):
+            if result.recipe is not None:
+                with metrics.span("debug_save"):
+                    save_recipe_data(result.recipe)
+                generated += 1
+            else:
+                log_error(f"Failed to generate meal plan recipe: {str(result.error)}", result.spec)
+            job.report(result)
+        return generated
+    
+    def update_plan_window(self, view, result):
+        """Record one finished meal-plan recipe"""
+        if not view["window"].winfo_exists():
+            return
+        view["progress"].step(1)
+        spec = result.spec
+        if result.recipe is not None:
+            view["recipes"].append(result.recipe)
+            view["listbox"].insert(tk.END, f"{result.recipe['title']} ({spec['cuisine']})")
+        else:
+            view["failed"] += 1
+            view["recipes"].append(None)
+            view["listbox"].insert(tk.END, f"FAILED: {spec['cuisine']}, {spec['centerpiece']} - {str(result.error)}")
+        done = len(view["recipes"])
+        view["status_var"].set(f"{done} of {view['total']} finished ({view['failed']} failed)")
+    
+    def finish_plan_window(self, view, message):
+        """Show the final status of a meal plan and allow another run"""
+        if view["window"].winfo_exists():
+            view["status_var"].set(message)
+            view["start_button"].state(['!disabled'])
+    
+    def open_plan_recipe(self, view):
+        """Open the meal-plan recipe selected in the list"""
+        selection = view["listbox"].curselection()
+        if selection and view["recipes"][selection[0]] is not None:
+            self.create_results_window(view["recipes"][selection[0]])
+    
+    def print_plan(self, view):
+        """Print every finished meal-plan recipe as a single job"""
+        recipes = [recipe_data for recipe_data in view["recipes"] if recipe_data is not None]
+        if not recipes:
+            messagebox.showinfo("Print", "There are no finished recipes to print yet.", parent=view["window"])
+            return
+        self.print_recipes(recipes, title=f"Meal plan ({len(recipes)} recipes)")
+    
+    def close_plan_window(self, view):
+        """Cancel any running meal plan and close its window"""
+        if "job_id" in view:
+            self.cancel_job(view["job_id"])
+        view["window"].destroy()
+    
+    def open_history_window(self):
+        """Open the window for searching previously generated recipes"""
+        history = self.recipe_generator.history
+        if history is None:
+            messagebox.showinfo("History", "The recipe history is disabled in config.json.")
+            return
+        
+        history_window = tk.Toplevel(self.root)
+        history_window.title("Recipe History")
+        history_window.geometry("750x550")
+        history_window.minsize(600, 400)
+        
+        content_frame = ttk.Frame(history_window, padding="20")
+        content_frame.pack(fill=tk.BOTH, expand=True)
+        
+        # Search text and filters; the list updates as you type
+        filters_frame = ttk.Frame(content_frame)
+        filters_frame.pack(fill=tk.X, pady=(0, 10))
+        view = {
+            "window": history_window,
+            "text_var": tk.StringVar(),
+            "cuisine_var": tk.StringVar(),
+            "calories_var": tk.StringVar(),
+            "prep_time_var": tk.StringVar(),
+            "status_var": tk.StringVar(),
+            "pending": None
+        }
+        fields = [
+            ("Search:", "text_var", 30),
+            ("Cuisine:", "cuisine_var", 15),
+            ("Max calories:", "calories_var", 6),
+            ("Max prep (min):", "prep_time_var", 6)
+        ]
+        for column, (label, name, width) in enumerate(fields):
+            ttk.Label(filters_frame, text=label).grid(column=column * 2, row=0, sticky=tk.W, padx=(0, 5))
+            ttk.Entry(filters_frame, textvariable=view[name], width=width).grid(column=column * 2 + 1, row=0,
+                                                                                 sticky=tk.W, padx=(0, 10))
+            view[name].trace_add("write", lambda *args: self.schedule_history_search(view))
+        
+        columns = ("title", "cuisine", "calories", "prep_time", "created")
+        tree = ttk.Treeview(content_frame, columns=columns, show="headings", height=15)
+        headings = [("title", "Title", 280), ("cuisine", "Cuisine", 120), ("calories", "Calories", 70),
+                    ("prep_time", "Prep (min)", 70), ("created", "Created", 110)]
+        for name, heading, width in headings:
+            tree.heading(name, text=heading)
+            tree.column(name, width=width, stretch=(name == "title"))
+        tree.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        tree.bind("<Double-Button-1>", lambda event: self.open_history_recipe(view))
+        view["tree"] = tree
+        
+        status_frame = ttk.Frame(content_frame)
+        status_frame.pack(fill=tk.X)
+        ttk.Label(status_frame, textvariable=view["status_var"]).pack(side=tk.LEFT)
+        ttk.Button(status_frame, text="Export...", command=lambda: self.export_history(view)).pack(side=tk.RIGHT)
+        self.search_history(view)
+    
+    def schedule_history_search(self, view):
+        """Search shortly after the user stops typing rather than on every keystroke"""
+        if view["pending"] is not None:
+            view["window"].after_cancel(view["pending"])
+        view["pending"] = view["window"].after(150, lambda: self.search_history(view))
+    
+    def search_history(self, view):
+        """Fill the history window with recipes matching its search fields"""
+        view["pending"] = None
+        if not view["window"].winfo_exists():
+            return
+        limits = {}
+        for name in ("calories_var", "prep_time_var"):
+            value = view[name].get().strip()
+            if value:
+                try:
+                    limits[name] = int(value)
+                except ValueError:
+                    view["status_var"].set("Calories and prep time must be numbers.")
+                    return
+        
+        started = time.perf_counter()
+        rows = self.recipe_generator.history.search(
+            view["text_var"].get(),
+            cuisine=view["cuisine_var"].get().strip() or None,
+            max_calories=limits.get("calories_var"),
+            max_prep_time=limits.get("prep_time_var"),
+            limit=200
+        )
+        elapsed = time.perf_counter() - started
+        
+        tree = view["tree"]
+        tree.delete(*tree.get_children())
+        for row in rows:
+            created = time.strftime("%Y-%m-%d %H:%M", time.localtime(row["created"]))
+            tree.insert("", tk.END, iid=str(row["id"]), values=(
+                row["title"], row["cuisine"] or "", row["calories"] or "", row["prep_time_minutes"] or "", created
+            ))
+        view["status_var"].set(f"{len(rows)} recipe(s) found in {elapsed * 1000:.0f} ms")
+    
+    def export_history(self, view):
+        """Export the selected history recipes (or all listed ones) to one file or a zip archive"""
+        tree = view["tree"]
+        recipe_ids = tree.selection() or tree.get_children()
+        if not recipe_ids:
+            return
+        filename = filedialog.asksaveasfilename(
+            parent=view["window"],
+            defaultextension=".txt",
+            filetypes=[(renderer.description, f"*{renderer.extension}") for renderer in RENDERERS.values()
+                       if renderer.name != "print"] + [("Zip archive, one file per recipe", "*.zip")],
+            initialfile="recipes.txt"
+        )
+        if not filename:
+            return
+        # A zip holds one file per recipe in the format picked by the name before ".zip", e.g. recipes.md.zip
+        renderer = renderer_for_path(filename[:-4] if filename.lower().endswith(".zip") else filename)
+        history = self.recipe_generator.history
+        skipped = []
+        
+        def complete_recipes():
+            for recipe_id in recipe_ids:
+                recipe_data = history.get(int(recipe_id))
+                if recipe_data is None or validate(recipe_data):
+                    skipped.append(recipe_id)  # e.g. incomplete recipes imported from old debug logs
+                    continue
+                yield recipe_data
+        
+        try:
+            exported = export_recipes(complete_recipes(), filename, renderer.name, title="Recipe history")
         except Exception as e:
-            error_message = f"Failed to generate recipe: {str(e)}"
-            print(f"Error: {error_message}")
-            print(traceback.format_exc())
-            log_error(error_message, traceback.format_exc())
-            messagebox.showerror("Error", error_message)
-        finally:
-            # Reset cursor and re-enable controls
-            self.set_busy_state(False)
+            messagebox.showerror("Error", f"Failed to export recipes: {str(e)}", parent=view["window"])
+            return
+        message = f"Exported {exported} recipe(s)."
+        if skipped:
+            message += f" Skipped {len(skipped)} incomplete recipe(s)."
+        messagebox.showinfo("Export", message, parent=view["window"])
+    
+    def open_history_recipe(self, view):
+        """Open the history recipe selected in the list"""
+        selection = view["tree"].selection()
+        if selection:
+            recipe_data = self.recipe_generator.history.get(int(selection[0]))
+            if recipe_data is None:
+                return
+            try:
+                self.create_results_window(recipe_data)
+            except (KeyError, TypeError) as e:
+                # Recipes imported from old debug logs may be incomplete
+                messagebox.showerror("Error", f"This recipe is incomplete: missing {str(e)}", parent=view["window"])
+    
+    def open_pantry_window(self):
+        """Open the window for finding stored recipes that use what is in the pantry"""
+        if self.recipe_generator.history is None:
+            messagebox.showinfo("Pantry", "The recipe history is disabled in config.json.")
+            return
+        # Index the history while the user types the pantry
+        threading.Thread(target=self.recipe_generator.pantry_index, name="pantry-index", daemon=True).start()
+        
+        pantry_window = tk.Toplevel(self.root)
+        pantry_window.title("Cook from the Pantry")
+        pantry_window.geometry("700x550")
+        pantry_window.minsize(500, 400)
+        
+        content_frame = ttk.Frame(pantry_window, padding="20")
+        content_frame.pack(fill=tk.BOTH, expand=True)
+        ttk.Label(content_frame, text="What is in your pantry? (one per line or comma-separated)").pack(anchor=tk.W)
+        pantry_text = scrolledtext.ScrolledText(content_frame, width=60, height=5, wrap=tk.WORD)
+        pantry_text.pack(fill=tk.X, pady=(5, 10))
+        view = {"window": pantry_window, "text": pantry_text, "status_var": tk.StringVar()}
+        
+        buttons_frame = ttk.Frame(content_frame)
+        buttons_frame.pack(fill=tk.X, pady=(0, 10))
+        ttk.Button(buttons_frame, text="Find Recipes",
+                   command=lambda: self.search_pantry(view)).pack(side=tk.LEFT)
+        ttk.Button(buttons_frame, text="Generate New",
+                   command=lambda: self.generate_from_pantry(view)).pack(side=tk.LEFT, padx=5)
+        
+        columns = ("title", "coverage", "missing")
+        tree = ttk.Treeview(content_frame, columns=columns, show="headings", height=12)
+        for name, heading, width in [("title", "Title", 250), ("coverage", "In Pantry", 70),
+                                     ("missing", "Missing", 250)]:
+            tree.heading(name, text=heading)
+            tree.column(name, width=width, stretch=(name != "coverage"))
+        tree.pack(fill=tk.BOTH, expand=True, pady=(0, 10))
+        tree.bind("<Double-Button-1>", lambda event: self.open_history_recipe(view))
+        view["tree"] = tree
+        ttk.Label(content_frame, textvariable=view["status_var"]).pack(anchor=tk.W)
+    
+    def search_pantry(self, view):
+        """List the stored recipes the pantry covers best, or generate one when none cover it well enough"""
+        pantry = parse_pantry(view["text"].get("1.0", tk.END))
+        if not pantry:
+            view["status_var"].set("List a few ingredients first.")
+            return
+        limit = self.config.get('pantry', {}).get('limit', 20)
+        started = time.perf_counter()
+        matches = self.recipe_generator.find_pantry_recipes(pantry, limit)
+        elapsed = time.perf_counter() - started
+        
+        tree = view["tree"]
+        tree.delete(*tree.get_children())
+        history = self.recipe_generator.history
+        for match in matches:
+            recipe_data = history.get(match.recipe_id)
+            if recipe_data is None:
+                continue
+            tree.insert("", tk.END, iid=str(match.recipe_id), values=(
+                recipe_data.get("title", ""), f"{match.coverage:.0%}", ", ".join(match.missing)
+            ))
+        if matches:
+            view["status_var"].set(f"{len(matches)} recipe(s) found in {elapsed * 1000:.0f} ms")
+        else:
+            view["status_var"].set("No stored recipe uses mostly these ingredients; generating a new one...")
+            self.generate_from_pantry(view, pantry)
+    
+    def generate_from_pantry(self, view, pantry=None):
+        """Generate a recipe from the pantry, using the main form for everything but the ingredients"""
+        pantry = pantry or parse_pantry(view["text"].get("1.0", tk.END))
+        if not pantry:
+            view["status_var"].set("List a few ingredients first.")
+            return
+        numbers = self.read_form_numbers()
+        if numbers is None:
+            return
+        self.start_generation(dict(numbers, cuisine=self.cuisine_var.get().strip() or "Any", centerpiece=pantry[0],
+                                   additional_info=pantry_request(pantry, numbers["additional_info"])))
+    
+    def poll_jobs(self):
+        """Collect finished background jobs and show their results"""
+        for job, kind, payload in self.job_queue.poll():
+            if job is self.setup_job:
+                self.on_generator_ready(kind, payload)
+            elif job.job_id in self.plan_views:
+                self.handle_plan_event(job, kind, payload)
+            elif kind == JOB_PROGRESS:
+                self.results_viewer.stream_event(job, payload)
+            elif kind == JOB_DONE and job.job_id in self.variant_forms:
+                self.variant_forms.pop(job.job_id)
+                self.results_viewer.show_many(payload)
+            elif kind == JOB_DONE:
+                form = self.generation_forms.pop(job.job_id, None)
+                reused = payload.get("from_history")
+                if reused is not None:
+                    # Offered with a "Generate Fresh Anyway" button
+                    self.create_results_window(payload, similar_match=SimilarRecipe(recipe=payload, **reused),
+                                               form=form, job_id=job.job_id)
+                else:
+                    self.create_results_window(payload, job_id=job.job_id)
+                # Start on alternatives while the user reads this one
+                if form is not None and self.prefetcher is not None:
+                    self.prefetcher.start(form)
+            elif kind == JOB_ERROR:
+                self.generation_forms.pop(job.job_id, None)
+                self.variant_forms.pop(job.job_id, None)
+                self.results_viewer.discard(job.job_id)
+                error, trace = payload
+                error_message = f"Failed to generate recipe: {str(error)}"
+                print(f"Error: {error_message}")
+                print(trace)
+                log_error(error_message, trace)
+                messagebox.showerror("Error", error_message)
+            elif kind == JOB_CANCELLED:
+                self.generation_forms.pop(job.job_id, None)
+                self.variant_forms.pop(job.job_id, None)
+                self.results_viewer.discard(job.job_id)
+                print(f"Cancelled: {job.description}")
+        
+        if self.print_queue is not None:
+            self.poll_print_jobs()
+        self.set_busy_state(bool(self.pending_jobs()))
+        self.root.after(POLL_INTERVAL_MS, self.poll_jobs)
+    
+    def handle_plan_event(self, job, kind, payload):
+        """Route a background event from a meal-plan job to its window"""
+        view = self.plan_views[job.job_id]
+        if kind == JOB_PROGRESS:
+            self.update_plan_window(view, payload)
+            return
+        
+        del self.plan_views[job.job_id]
+        if kind == JOB_DONE:
+            self.finish_plan_window(view, f"Finished: {payload} of {view['total']} recipes generated")
+        elif kind == JOB_ERROR:
+            error, trace = payload
+            log_error(f"Meal plan failed: {str(error)}", trace)
+            self.finish_plan_window(view, f"Meal plan failed: {str(error)}")
+        elif kind == JOB_CANCELLED:
+            self.finish_plan_window(view, "Cancelled")
+    
+    def cancel_selected_job(self):
+        """Cancel the job selected in the in-progress list"""
+        selection = self.jobs_listbox.curselection()
+        pending = self.pending_jobs()
+        if not selection or selection[0] >= len(pending):
+            return
+        self.cancel_job(pending[selection[0]].job_id)
+    
+    def cancel_job(self, job_id):
+        """Cancel a queued or running recipe"""
+        self.job_queue.cancel(job_id)
+        self.set_busy_state(bool(self.pending_jobs()))
+    
+    def pending_jobs(self):
+        """Recipe jobs queued or running, oldest first, leaving out the startup job"""
+        return [job for job in self.job_queue.pending() if job is not self.setup_job]
+    
+    def on_close(self):
+        """Stop background work and close the application"""
+        self.job_queue.shutdown()
+        if self.prefetcher is not None:
+            self.prefetcher.shutdown()
+        if self.print_queue is not None:
+            # Let a job being piped to the printer finish rather than cutting it off
+            self.print_queue.shutdown(timeout=10)
+        export_path = self.config.get('metrics', {}).get('export_path')
+        if export_path:
+            try:
+                metrics.registry.dump(export_path)
+            except OSError as e:
+                print(f"Could not write metrics: {str(e)}")
+        self.root.destroy()
     
     def format_recipe_text(self, recipe_data):
         """Format the recipe data as readable text"""
-        text = "TIME REQUIRED:\n"
-        text += "=" * 50 + "\n"
-        text += f"Preparation: {recipe_data['prep_time_minutes']} minutes\n"
-        text += f"Cooking: {recipe_data['cook_time_minutes']} minutes\n"
-        text += f"Total: {recipe_data['prep_time_minutes'] + recipe_data['cook_time_minutes']} minutes\n\n"
-        
-        text += "INGREDIENTS:\n"
-        text += "=" * 50 + "\n"
-        for ingredient in recipe_data["ingredients"]:
-            text += f"• {ingredient['amount']} {ingredient['name']}\n"
-        
-        text += "\n\nINSTRUCTIONS:\n"
-        text += "=" * 50 + "\n"
-        for i, step in enumerate(recipe_data["instructions"], 1):
-            text += f"{i}. {step}\n\n"
-        
-        text += "NUTRITION INFORMATION:\n"
-        text += "=" * 50 + "\n"
-        nutrition = recipe_data["nutrition"]
-        text += f"Calories: {nutrition['calories']} per serving\n"
-        text += f"Protein: {nutrition['protein_g']}g\n"
-        text += f"Fat: {nutrition['fat_g']}g\n"
-        text += f"Carbohydrates: {nutrition['carbohydrates_g']}g\n"
-        
-        return text
-    
-    def copy_to_clipboard(self, recipe_data, formatted_text):
+        return format_recipe_text(recipe_data)
+    
+    def print_recipe(self, recipe_data, formatted_text=None):
+        """Print the recipe in the background"""
+        self.print_recipes([recipe_data])
+    
+    def print_recipes(self, recipes, title=None):
+        """Print recipes as one job, each on a new page, loading the printing module on first use"""
+        if self.print_queue is None:
+            from recipe_printer import PrintQueue
+            self.print_queue = PrintQueue.from_config(self.config.get('printing', {}))
+        self.print_queue.submit(recipes, title)
+    
+    def poll_print_jobs(self):
+        """Show the status of print jobs in the status bar, and report failures"""
+        from recipe_printer import PRINT_DONE, PRINT_FAILED, PRINT_PRINTING, PRINT_QUEUED
+        for job, status in self.print_queue.poll():
+            if status == PRINT_QUEUED:
+                self.print_status = f"Print job queued: {job.title}"
+            elif status == PRINT_PRINTING:
+                self.print_status = f"Printing: {job.title}"
+            elif status == PRINT_DONE:
+                self.print_status = f"Sent to printer: {job.title} ({len(job.recipes)} recipe(s))"
+            elif status == PRINT_FAILED:
+                self.print_status = f"Printing failed: {job.title}"
+                log_error(f"Printing failed: {job.error}")
+                messagebox.showerror("Error", f"Failed to print '{job.title}': {job.error}")
+    
+    def copy_to_clipboard(self, recipe_data, formatted_text=None):
         """Copy the recipe to the clipboard"""
-        clipboard_text = f"{recipe_data['title']}\n\n"
-        clipboard_text += f"{recipe_data['description']}\n\n"
-        clipboard_text += formatted_text
+        clipboard_text = render(recipe_data, "text")
         
         try:
+            import pyperclip  # For clipboard functionality; loaded on first use
             pyperclip.copy(clipboard_text)
             messagebox.showinfo("Success", "Recipe copied to clipboard!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to copy to clipboard: {str(e)}")
     
     def set_busy_state(self, is_busy):
-        """Set the busy state of the application
+        """Update the in-progress list and status line
         
         Args:
-            is_busy (bool): True to show busy cursor and disable controls, False to restore normal state
+            is_busy (bool): True while any recipe is queued or generating
         """
+        pending = self.pending_jobs()
+        labels = [("Generating: " if job.started else "Queued: ") + job.description for job in pending]
+        if list(self.jobs_listbox.get(0, tk.END)) != labels:
+            selection = self.jobs_listbox.curselection()
+            self.jobs_listbox.delete(0, tk.END)
+            for label in labels:
+                self.jobs_listbox.insert(tk.END, label)
+            if selection and selection[0] < len(labels):
+                self.jobs_listbox.selection_set(selection[0])
+        
         if is_busy:
-            # Set busy cursor for all widgets
-            self.root.config(cursor="watch")
-            for widget in self.root.winfo_children():
-                widget.config(cursor="watch")
-            
-            # Disable all input widgets
-            for widget in self.input_widgets:
-                if isinstance(widget, ttk.Button):
-                    widget.state(['disabled'])
-                elif isinstance(widget, scrolledtext.ScrolledText):
-                    widget.config(state=tk.DISABLED)
-                    # Apply a disabled-looking background color to make it visually appear disabled
-                    widget.config(background="#F0F0F0")  # Light gray background
-                else:
-                    widget.config(state="disabled")
+            status = f"{len(pending)} recipe(s) in progress..."
+            self.cancel_button.state(['!disabled'])
         else:
-            # Reset cursor for all widgets
-            self.root.config(cursor="")
-            for widget in self.root.winfo_children():
-                widget.config(cursor="")
-            
-            # Re-enable all input widgets
-            for widget in self.input_widgets:
-                if isinstance(widget, ttk.Button):
-                    widget.state(['!disabled'])
-                elif isinstance(widget, scrolledtext.ScrolledText):
-                    widget.config(state=tk.NORMAL)
-                    # Restore the normal background color
-                    widget.config(background="white")
-                else:
-                    widget.config(state="normal")
+            status = "Ready" if self.recipe_generator is not None else "Starting up..."
+            self.cancel_button.state(['disabled'])
+        if self.recipe_generator is None:
+            self.status_var.set(status)
+            return
         
-        # Force update to show changes immediately
-        self.root.update()
+        limiter = self.recipe_generator.rate_limiter
+        waiting = limiter.queue_depth()
+        if waiting:
+            status += f"  |  {waiting} waiting for the rate limit ({limiter.longest_wait():.0f}s)"
+        elif limiter.last_wait >= 1:
+            status += f"  |  last rate limit wait {limiter.last_wait:.0f}s"
+        if limiter.daily_budget_usd is not None:
+            status += f"  |  ${limiter.spent_today():.2f} of ${limiter.daily_budget_usd:.2f} spent today"
+        if self.print_status:
+            status += f"  |  {self.print_status}"
+        self.status_var.set(status)
     
-    def export_recipe(self, recipe_data, formatted_text):
-        """Export the recipe to a text file"""
+    def export_recipe(self, recipe_data, formatted_text=None):
+        """Export the recipe as text, Markdown, HTML or JSON, chosen by the file extension"""
         filename = filedialog.asksaveasfilename(
             defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("All files", "*.*")],
-            initialfile=f"{recipe_data['title'].replace(' ', '_')}.txt"
+            filetypes=[(renderer.description, f"*{renderer.extension}") for renderer in RENDERERS.values()
+                       if renderer.name != "print"] + [("All files", "*.*")],
+            initialfile=file_name(recipe_data)
         )
         
         if filename:
             try:
-                with open(filename, 'w') as f:
-                    f.write(f"{recipe_data['title']}\n\n")
-                    f.write(f"{recipe_data['description']}\n\n")
-                    f.write(formatted_text)
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(render(recipe_data, renderer_for_path(filename).name))
                 messagebox.showinfo("Success", "Recipe exported successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to export recipe: {str(e)}")
 
+def report_when_ready(root, started):
+    """Print the time until the window is interactive, then exit (used by benchmarks/startup.py)"""
+    def ready():
+        print(f"READY {time.perf_counter() - started:.4f}", flush=True)
+        root.destroy()
+    root.update_idletasks()
+    root.after_idle(ready)
+
 if __name__ == "__main__":
+    started = time.perf_counter()
     root = tk.Tk()
     app = RecipeApp(root)
+    if os.environ.get("RECIPEGENIE_EXIT_WHEN_READY"):
+        report_when_ready(root, started)
     root.mainloop()
@@ -0,0 +1,244 @@
+"""In-process latency and usage metrics for the generation pipeline
+
+Stages are timed with ``metrics.span(name, **labels)``; each span is folded
+into a histogram (``recipegenie_stage_seconds``) and handed to any registered
+exporters. Aggregates can be dumped as JSON or Prometheus text.
+
+    with metrics.span("llm_call", model=model) as span:
+        response = ...
+        span.set(prompt_tokens=..., completion_tokens=...)
+"""
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+STAGE_METRIC = "recipegenie_stage_seconds"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Estimate a quantile as the upper bound of the bucket that contains it"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "buckets": {str(bound): count for bound, count in zip(self.buckets, self.counts)}
+        }
+
+
+class Span:
+    """A timed pipeline stage; extra attributes are passed to exporters"""
+
+    def __init__(self, name: str, labels: Dict[str, Any]):
+        self.name = name
+        self.labels = labels
+        self.attributes: Dict[str, Any] = {}
+        self.start_time = time.time()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+
+class MetricsRegistry:
+    """Thread-safe store of histograms and counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._exporters: List[Callable[[Span], None]] = []
+        self.enabled = True
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Add a value to the histogram `name` for these labels"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """Add to the counter `name` for these labels"""
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def add_exporter(self, exporter: Callable[[Span], None]) -> None:
+        """Call exporter(span) for every finished span"""
+        self._exporters.append(exporter)
+
+    @contextmanager
+    def span(self, name: str, **labels: Any) -> Iterator[Span]:
+        """Time a pipeline stage and record it under recipegenie_stage_seconds{stage=name}"""
+        span = Span(name, labels)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.duration = time.perf_counter() - span.started
+            if self.enabled:
+                self.observe(STAGE_METRIC, span.duration, stage=name, **labels)
+                if span.error:
+                    self.increment("recipegenie_stage_errors_total", stage=name, error=span.error, **labels)
+                for exporter in self._exporters:
+                    try:
+                        exporter(span)
+                    except Exception as e:
+                        print(f"Metrics exporter failed: {str(e)}")
+
+    def record_usage(self, model: str, response: Any) -> Dict[str, int]:
+        """Count the prompt/completion tokens reported in a LiteLLM response"""
+        usage = getattr(response, "usage", None)
+        tokens = {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            value = getattr(usage, kind, None) if usage is not None else None
+            if value:
+                tokens[kind] = value
+                self.increment("recipegenie_tokens_total", value, model=model, type=kind.split("_")[0])
+        return tokens
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return all metrics as plain data"""
+        with self._lock:
+            return {
+                "histograms": {
+                    name: [dict(labels=dict(key), **histogram.to_dict()) for key, histogram in series.items()]
+                    for name, series in self._histograms.items()
+                },
+                "counters": {
+                    name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                    for name, series in self._counters.items()
+                }
+            }
+
+    def to_prometheus(self) -> str:
+        """Return all metrics in the Prometheus text exposition format"""
+        def labels_text(key: LabelKey, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+            pairs = key + extra
+            if not pairs:
+                return ""
+            escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+            return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in series.items():
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{labels_text(key, (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{labels_text(key, (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{labels_text(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{labels_text(key)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in series.items():
+                    lines.append(f"{name}{labels_text(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        """Write metrics to path; Prometheus text for .prom/.txt files, JSON otherwise"""
+        with open(path, 'w') as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, indent=2)
+
+
+def opentelemetry_exporter(service_name: str = "recipegenie") -> Optional[Callable[[Span], None]]:
+    """Build an exporter that forwards spans to OpenTelemetry, if it is installed
+
+    The tracer provider (and its exporter, e.g. OTLP to a local collector)
+    is whatever the application has configured; without one, spans are dropped
+    by OpenTelemetry's no-op provider.
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        print("OpenTelemetry is not installed; run 'pip install opentelemetry-sdk' to export spans")
+        return None
+
+    tracer = trace.get_tracer(service_name)
+
+    def export(span: Span) -> None:
+        start_ns = int(span.start_time * 1e9)
+        otel_span = tracer.start_span(span.name, start_time=start_ns,
+                                      attributes={**span.labels, **span.attributes})
+        if span.error:
+            otel_span.set_attribute("error.type", span.error)
+        otel_span.end(end_time=start_ns + int(span.duration * 1e9))
+    return export
+
+
+# The process-wide registry used by the application
+registry = MetricsRegistry()
+span = registry.span
+_opentelemetry_installed = False
+
+def configure(config: Dict[str, Any]) -> None:
+    """Apply the "metrics" section of config.json to the process-wide registry"""
+    global _opentelemetry_installed
+    registry.enabled = config.get('enabled', True)
+    if config.get('opentelemetry') and not _opentelemetry_installed:
+        exporter = opentelemetry_exporter(config.get('service_name', "recipegenie"))
+        if exporter is not None:
+            registry.add_exporter(exporter)
+            _opentelemetry_installed = True
@@ -0,0 +1,217 @@
+"""Compute a recipe's nutrition from its ingredient list, without asking the LLM
+
+The bundled nutrition_data.csv holds per-100 g values, a density and a
+typical piece weight for a couple of hundred common ingredients. It is read
+once, on first use, into parallel arrays indexed by row, with a dict from
+every normalized name and alias to its row. Ingredient names are matched by
+their longest known word sequence, so "boneless, skinless chicken thighs"
+finds "chicken thigh" and "fresh cilantro leaves" finds "cilantro".
+"""
+import copy
+import csv
+import os
+import re
+import threading
+from array import array
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from quantities import COUNT, MASS, VOLUME, Quantity, parse_amount, scale_amount
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "nutrition_data.csv")
+
+# Auto-scaling never changes the ingredient amounts by more than this factor
+MAX_SCALE = 2.0
+
+# Amounts like these are too small to matter and do not count against coverage
+_NEGLIGIBLE = re.compile(r"taste|needed|garnish|serving|optional|desired|drizzle|sprinkle", re.IGNORECASE)
+_WORD = re.compile(r"[a-z]+")
+
+
+class NutritionEstimate(NamedTuple):
+    calories: float
+    protein_g: float
+    fat_g: float
+    carbohydrates_g: float
+    coverage: float  # fraction of the ingredients that were matched and weighed
+    unmatched: List[str]
+
+
+def _singular(word: str) -> str:
+    if len(word) <= 3 or word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "xes", "sses")):
+        return word[:-2]
+    return word[:-1] if word.endswith("s") else word
+
+def normalize_words(name: str) -> tuple:
+    """Lowercase, singular words of an ingredient name, without anything in parentheses"""
+    name = re.sub(r"\([^)]*\)", " ", name.lower().replace("'", ""))
+    return tuple(_singular(word) for word in _WORD.findall(name))
+
+
+class NutritionTable:
+    """Per-100 g nutrition of common ingredients, in parallel arrays indexed by row"""
+
+    def __init__(self, names: List[str], index: Dict[tuple, int], columns: Dict[str, array]):
+        self.names = names
+        self.index = index
+        self.kcal = columns["kcal"]
+        self.protein = columns["protein_g"]
+        self.fat = columns["fat_g"]
+        self.carbs = columns["carbohydrates_g"]
+        self.density = columns["g_per_ml"]
+        self.piece = columns["g_per_piece"]  # 0 when unknown
+        self.longest_key = max(len(key) for key in index)
+        self.find = lru_cache(maxsize=4096)(self._find)
+
+    @classmethod
+    def load(cls, path: str = DATA_PATH) -> "NutritionTable":
+        """Read the table from a CSV file"""
+        names: List[str] = []
+        index: Dict[tuple, int] = {}
+        fields = ("kcal", "protein_g", "fat_g", "carbohydrates_g", "g_per_ml", "g_per_piece")
+        columns = {field: array("f") for field in fields}
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            for row, record in enumerate(csv.DictReader(f)):
+                names.append(record["name"])
+                for name in [record["name"]] + [alias for alias in record["aliases"].split("|") if alias]:
+                    index.setdefault(normalize_words(name), row)
+                for field in fields:
+                    columns[field].append(float(record[field] or 0))
+        return cls(names, index, columns)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _find(self, name: str) -> Optional[int]:
+        """Return the row of the longest known word sequence in a name (the last one on a tie)"""
+        words = normalize_words(name)
+        for size in range(min(len(words), self.longest_key), 0, -1):
+            for start in range(len(words) - size, -1, -1):
+                row = self.index.get(words[start:start + size])
+                if row is not None:
+                    return row
+        return None
+
+    def grams(self, row: int, quantity: Quantity) -> Optional[float]:
+        """Weigh a quantity of the ingredient in a row, or None if it cannot be
+
+        That is a volume without a known density or a count without a piece weight.
+        """
+        kind = quantity.kind
+        if kind == MASS:
+            return quantity.base
+        if kind == VOLUME and self.density[row]:
+            return quantity.base * self.density[row]
+        if kind == COUNT and self.piece[row]:
+            return quantity.base * self.piece[row]
+        return None
+
+
+_table: Optional[NutritionTable] = None
+_table_lock = threading.Lock()
+
+def get_table() -> NutritionTable:
+    """Return the bundled nutrition table, loading it on first use"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = NutritionTable.load()
+    return _table
+
+def estimate_nutrition(recipe_data: Dict[str, Any], table: Optional[NutritionTable] = None) -> NutritionEstimate:
+    """Add up the nutrition of a recipe's ingredients, per serving"""
+    table = table or get_table()
+    totals = [0.0, 0.0, 0.0, 0.0]
+    counted = 0
+    matched = 0
+    unmatched = []
+    for ingredient in recipe_data.get("ingredients", []):
+        name = str(ingredient.get("name", ""))
+        amount = str(ingredient.get("amount", ""))
+        quantity = parse_amount(amount)
+        if quantity is None and _NEGLIGIBLE.search(f"{amount} {name}"):
+            continue
+        counted += 1
+        row = table.find(name)
+        grams = table.grams(row, quantity) if row is not None and quantity is not None else None
+        if grams is None:
+            unmatched.append(name)
+            continue
+        matched += 1
+        scale = grams / 100.0
+        totals[0] += table.kcal[row] * scale
+        totals[1] += table.protein[row] * scale
+        totals[2] += table.fat[row] * scale
+        totals[3] += table.carbs[row] * scale
+
+    servings = recipe_data.get("servings") or 1
+    return NutritionEstimate(
+        calories=totals[0] / servings,
+        protein_g=totals[1] / servings,
+        fat_g=totals[2] / servings,
+        carbohydrates_g=totals[3] / servings,
+        coverage=matched / counted if counted else 0.0,
+        unmatched=unmatched
+    )
+
+def apply_estimate(recipe_data: Dict[str, Any], estimate: NutritionEstimate) -> None:
+    """Replace a recipe's calories and nutrition block with an estimate, in place
+
+    The recipe's "nutrition_source" is set to "table", marking the figures as
+    computed from the ingredient list rather than given by the model.
+    """
+    recipe_data["calories_per_serving"] = round(estimate.calories)
+    recipe_data["nutrition"] = {
+        "calories": round(estimate.calories),
+        "protein_g": round(estimate.protein_g),
+        "fat_g": round(estimate.fat_g),
+        "carbohydrates_g": round(estimate.carbohydrates_g)
+    }
+    recipe_data["nutrition_source"] = "table"
+
+def check_recipe(recipe_data: Dict[str, Any], target_calories: Optional[float], tolerance: float = 0.15,
+                 min_coverage: float = 0.75, auto_scale: bool = False) -> Dict[str, Any]:
+    """Return a copy of the recipe with nutrition computed from its ingredients and a "nutrition_check" entry
+
+    If enough of the ingredients are recognised (min_coverage), the model's
+    nutrition block is replaced with the computed one. A recipe more than
+    `tolerance` (a fraction) away from the calorie target is flagged "over" or
+    "under", or, with auto_scale, has its ingredient amounts scaled to meet it.
+
+    Args:
+        recipe_data: A validated recipe
+        target_calories: The calories per serving that were asked for, or None to skip the target check
+        tolerance: Allowed relative difference from the target
+        min_coverage: Fraction of ingredients that must be matched to trust the estimate
+        auto_scale: Scale the amounts (by at most MAX_SCALE either way) instead of only flagging
+    """
+    estimate = estimate_nutrition(recipe_data)
+    checked = copy.deepcopy(recipe_data)
+    check: Dict[str, Any] = {"status": "unchecked", "coverage": round(estimate.coverage, 2)}
+    checked["nutrition_check"] = check
+    if estimate.coverage < min_coverage or estimate.calories <= 0:
+        return checked
+
+    check["model_calories"] = recipe_data.get("nutrition", {}).get("calories")
+    apply_estimate(checked, estimate)
+    check["status"] = "ok"
+    if not target_calories:
+        return checked
+
+    check["target"] = target_calories
+    factor = target_calories / estimate.calories
+    if abs(1 - estimate.calories / target_calories) <= tolerance:
+        return checked
+    if auto_scale and 1 / MAX_SCALE <= factor <= MAX_SCALE:
+        for ingredient in checked["ingredients"]:
+            ingredient["amount"] = scale_amount(str(ingredient.get("amount", "")), factor)
+        apply_estimate(checked, estimate_nutrition(checked))
+        check.update(status="scaled", scale=round(factor, 2), unscaled_calories=round(estimate.calories))
+    else:
+        check["status"] = "over" if estimate.calories > target_calories else "under"
+    return checked
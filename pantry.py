@@ -0,0 +1,204 @@
+"""Find stored recipes that can be cooked with what is in the pantry, without asking the LLM
+
+PantryIndex is an inverted index from ingredients to the recipes that use
+them. Ingredient names are normalized the way nutrition.py matches them
+("boneless, skinless chicken thighs" and "chicken thigh" are the same
+ingredient) and numbered with small integer IDs. Each ingredient's posting
+list is a Python int used as a bitset over recipe slots, so finding the
+recipes that use mostly pantry ingredients takes a handful of big-integer
+AND/OR/XOR operations per pantry item, however many recipes there are:
+
+    index = PantryIndex.from_history(history)
+    for match in index.search(["eggs", "spinach", "feta", "onion"], min_coverage=0.75):
+        print(match.coverage, match.recipe_id, match.missing)
+
+Staples (salt, pepper, oil, water) are assumed to be at hand and do not count.
+"""
+import math
+import re
+import threading
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from nutrition import get_table, normalize_words
+
+DEFAULT_STAPLES = ("salt", "black pepper", "pepper", "water", "olive oil", "vegetable oil", "oil", "cooking spray")
+
+# Words that describe how an ingredient is prepared rather than what it is
+_DESCRIPTORS = {
+    "fresh", "freshly", "chopped", "diced", "sliced", "minced", "grated", "shredded", "crushed", "peeled",
+    "finely", "roughly", "thinly", "large", "small", "medium", "boneless", "skinless", "whole", "optional",
+    "to", "taste", "for", "garnish", "serving", "of", "and", "or", "a", "the", "cut", "into", "piece", "cube",
+    "halved", "quartered", "trimmed", "rinsed", "drained", "softened", "melted", "room", "temperature", "about"
+}
+
+
+class PantryMatch(NamedTuple):
+    recipe_id: int
+    coverage: float  # fraction of the recipe's (non-staple) ingredients in the pantry
+    matched: int
+    missing: List[str]  # the recipe's ingredients that are not in the pantry
+
+
+def ingredient_key(name: str) -> str:
+    """Normalize an ingredient name to the key the index uses
+
+    Names the nutrition table knows map to its entry, so "fresh baby spinach
+    leaves" is "spinach"; others become their singular words without
+    preparation words, so "2 shallots, finely chopped" is "shallot".
+    """
+    table = get_table()
+    row = table.find(name)
+    if row is not None:
+        return table.names[row]
+    words = normalize_words(re.sub(r"[\d/½¼¾⅓⅔.]+", " ", name))
+    kept = [word for word in words if word not in _DESCRIPTORS]
+    return " ".join(kept or words)
+
+def parse_pantry(text: str) -> List[str]:
+    """Split a pantry typed as a comma- or line-separated list into ingredient names"""
+    return [item.strip() for item in re.split(r"[,;\n]", text) if item.strip()]
+
+def pantry_request(pantry: Sequence[str], additional_info: str = "") -> str:
+    """The additional_info that asks the LLM for a recipe made from the pantry"""
+    request = (f"Use only these ingredients, plus basic staples such as salt, pepper and oil: "
+               f"{', '.join(pantry)}.")
+    return f"{request} {additional_info}".strip()
+
+
+class PantryIndex:
+    """Inverted index from normalized ingredients to recipes, with int bitsets as posting lists
+
+    Recipes are numbered by slot in the order they are added. Removing a
+    recipe clears its bits and leaves its slot empty.
+
+    Args:
+        staples: Ingredients assumed to be in every pantry, ignored in recipes and coverage
+    """
+
+    def __init__(self, staples: Iterable[str] = DEFAULT_STAPLES):
+        self._lock = threading.Lock()
+        self._ingredient_ids: Dict[str, int] = {}
+        self._ingredient_names: List[str] = []
+        self._postings: List[int] = []  # ingredient id -> bitset of recipe slots
+        self._by_size: Dict[int, int] = {}  # number of ingredients -> bitset of recipe slots
+        self._slot_recipe: List[Optional[int]] = []  # slot -> recipe id, None once removed
+        self._slot_ingredients: List[Tuple[int, ...]] = []
+        self._slots: Dict[int, int] = {}  # recipe id -> slot
+        self.staples = {ingredient_key(name) for name in staples}
+
+    @classmethod
+    def from_history(cls, history: Any, staples: Iterable[str] = DEFAULT_STAPLES) -> "PantryIndex":
+        """Index every recipe in a RecipeHistory"""
+        index = cls(staples)
+        for recipe_id, recipe_data in history.iter_recipes(with_ids=True):
+            index.add(recipe_id, recipe_data)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _ingredient_id(self, key: str) -> int:
+        ingredient_id = self._ingredient_ids.get(key)
+        if ingredient_id is None:
+            ingredient_id = self._ingredient_ids[key] = len(self._ingredient_names)
+            self._ingredient_names.append(key)
+            self._postings.append(0)
+        return ingredient_id
+
+    def add(self, recipe_id: int, recipe_data: Dict[str, Any]) -> None:
+        """Index a recipe's ingredients (again, if the recipe id is already indexed)"""
+        keys = set()
+        for item in recipe_data.get("ingredients", []):
+            name = item.get("name") if isinstance(item, dict) else item
+            if name:
+                key = ingredient_key(str(name))
+                if key and key not in self.staples:
+                    keys.add(key)
+        with self._lock:
+            self._remove(recipe_id)
+            if not keys:
+                return
+            slot = len(self._slot_recipe)
+            bit = 1 << slot
+            ingredient_ids = tuple(sorted(self._ingredient_id(key) for key in keys))
+            for ingredient_id in ingredient_ids:
+                self._postings[ingredient_id] |= bit
+            self._by_size[len(ingredient_ids)] = self._by_size.get(len(ingredient_ids), 0) | bit
+            self._slot_recipe.append(recipe_id)
+            self._slot_ingredients.append(ingredient_ids)
+            self._slots[recipe_id] = slot
+
+    def remove(self, recipe_id: int) -> None:
+        """Drop a recipe from the index, e.g. after deleting it from the history"""
+        with self._lock:
+            self._remove(recipe_id)
+
+    def _remove(self, recipe_id: int) -> None:
+        slot = self._slots.pop(recipe_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        ingredient_ids = self._slot_ingredients[slot]
+        for ingredient_id in ingredient_ids:
+            self._postings[ingredient_id] &= mask
+        self._by_size[len(ingredient_ids)] &= mask
+        self._slot_recipe[slot] = None
+        self._slot_ingredients[slot] = ()
+
+    def search(self, pantry: Sequence[str], min_coverage: float = 0.0, limit: int = 20) -> List[PantryMatch]:
+        """Rank recipes by the fraction of their ingredients in the pantry, best first
+
+        Ties go to the recipe with more matched ingredients, then the newest.
+
+        Args:
+            pantry: Ingredient names, in any form ("2 eggs", "baby spinach")
+            min_coverage: Leave out recipes with less of their ingredients in the pantry
+            limit: Most matches to return
+        """
+        with self._lock:
+            pantry_ids = {self._ingredient_ids[key] for key in map(ingredient_key, pantry)
+                          if key in self._ingredient_ids}
+            if not pantry_ids:
+                return []
+
+            # Per-recipe counts of pantry ingredients, bit-sliced: bit i of every slot's count is in planes[i]
+            planes: List[int] = []
+            for ingredient_id in pantry_ids:
+                carry = self._postings[ingredient_id]
+                for i, plane in enumerate(planes):
+                    if not carry:
+                        break
+                    planes[i], carry = plane ^ carry, plane & carry
+                if carry:
+                    planes.append(carry)
+
+            # Best coverage first, one (matched, size) class at a time, each a single bitset;
+            # within a class the newest recipe (highest slot) comes first
+            classes = sorted(((matched / size, matched, size) for size, slots in self._by_size.items() if slots
+                              for matched in range(max(1, math.ceil(min_coverage * size - 1e-9)),
+                                                   min(size, len(pantry_ids)) + 1)), reverse=True)
+            matches = []
+            for coverage, matched, size in classes:
+                slots = self._exactly(planes, matched, self._by_size[size])
+                while slots and len(matches) < limit:
+                    slot = slots.bit_length() - 1
+                    slots ^= 1 << slot
+                    matches.append(PantryMatch(
+                        recipe_id=self._slot_recipe[slot],
+                        coverage=coverage,
+                        matched=matched,
+                        missing=[self._ingredient_names[ingredient_id] for ingredient_id in self._slot_ingredients[slot]
+                                 if ingredient_id not in pantry_ids]
+                    ))
+                if len(matches) >= limit:
+                    break
+            return matches
+
+    @staticmethod
+    def _exactly(planes: List[int], count: int, universe: int) -> int:
+        """Bitset of the slots in universe whose bit-sliced count equals count"""
+        if count >> len(planes):
+            return 0
+        for i, plane in enumerate(planes):
+            universe &= plane if count >> i & 1 else ~plane
+        return universe
@@ -0,0 +1,111 @@
+import json
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import metrics
+from recipe_generator import RecipeGenerator
+
+def _ignore_event(kind: str, key: str, value: Any) -> None:
+    """Stream prefetches (so cancel_event can stop them early) without showing the fields"""
+
+
+class RecipePrefetcher:
+    """Generate alternative recipes for the last request while the user reads the current one
+
+    After a recipe is shown, start(form) generates up to `count` more recipes
+    for the same form in the background, one at a time. If the user asks for
+    another recipe with the same form, take(form) returns one instantly.
+    Changing the form (or calling cancel) throws the buffer away and stops the
+    generation in progress. No more than `budget` prefetches are made per session.
+
+    Args:
+        generator: The generator to prefetch with
+        count: Alternative recipes to keep ready
+        budget: Most prefetch generations per session
+    """
+
+    def __init__(self, generator: RecipeGenerator, count: int = 2, budget: int = 20):
+        self.generator = generator
+        self.count = count
+        self.budget = budget
+        self.used = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recipe-prefetch")
+        self._lock = threading.Lock()
+        self._key: Optional[str] = None
+        self._buffer: deque = deque()
+        self._in_flight = 0
+        self._epoch = 0
+        self._cancel_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, generator: RecipeGenerator, config: Dict[str, Any]) -> Optional["RecipePrefetcher"]:
+        """Create a prefetcher from the "prefetch" section of config.json, or None if disabled"""
+        if not config.get('enabled', False):
+            return None
+        return cls(generator, count=config.get('count', 2), budget=config.get('budget', 20))
+
+    @staticmethod
+    def _make_key(form: Dict[str, Any]) -> str:
+        return json.dumps(form, sort_keys=True)
+
+    def _reset(self, key: Optional[str]) -> None:
+        # Called with the lock held
+        self._cancel_event.set()
+        self._cancel_event = threading.Event()
+        self._buffer.clear()
+        self._in_flight = 0
+        self._epoch += 1
+        self._key = key
+
+    def start(self, form: Dict[str, Any]) -> None:
+        """Top up the buffer of alternatives for this form, replacing any other form's"""
+        key = self._make_key(form)
+        with self._lock:
+            if key != self._key:
+                self._reset(key)
+            wanted = min(self.count - len(self._buffer) - self._in_flight, self.budget - self.used)
+            for _ in range(max(0, wanted)):
+                self._in_flight += 1
+                self.used += 1
+                self._executor.submit(self._run, dict(form), self._epoch, self._cancel_event)
+
+    def take(self, form: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return a prefetched recipe for this form, or None"""
+        with self._lock:
+            recipe_data = self._buffer.popleft() if self._key == self._make_key(form) and self._buffer else None
+        metrics.registry.increment("recipegenie_prefetch_requests_total",
+                                   result="hit" if recipe_data is not None else "miss")
+        return recipe_data
+
+    def cancel(self) -> None:
+        """Drop prefetched recipes and stop the one being generated, e.g. when the form changes"""
+        with self._lock:
+            if self._key is not None:
+                self._reset(None)
+
+    def shutdown(self) -> None:
+        self.cancel()
+        self._executor.shutdown(wait=False)
+
+    def _run(self, form: Dict[str, Any], epoch: int, cancel_event: threading.Event) -> None:
+        if cancel_event.is_set():
+            with self._lock:
+                self.used -= 1  # never started, so it does not count against the budget
+            return
+        recipe_data = None
+        try:
+            with metrics.span("prefetch"):
+                # refresh=True bypasses the cache, which would return the recipe already shown;
+                # replace_cached=False leaves that recipe in the cache for the next identical request
+                recipe_data = self.generator.generate_recipe(**form, refresh=True, replace_cached=False,
+                                                             on_event=_ignore_event, cancel_event=cancel_event)
+        except Exception as e:
+            if not cancel_event.is_set():
+                print(f"Prefetch failed: {str(e)}")
+        with self._lock:
+            if epoch == self._epoch:
+                self._in_flight -= 1
+                if recipe_data is not None:
+                    self._buffer.append(recipe_data)
@@ -0,0 +1,274 @@
+"""Parse and rewrite the free-text `amount` strings of recipe ingredients
+
+Amounts such as "1 1/2 cups", "200g", "2-3 tbsp", "½ tsp" or "2 (14 oz) cans"
+become a Quantity: a number and a Unit. Each unit knows its kind ("mass",
+"volume" or "count") and its size in grams, millilitres or pieces, which is
+what nutrition.py and scaling need. Parsing is cached, since the same few
+hundred amount strings come up again and again.
+"""
+import re
+from functools import lru_cache
+from typing import NamedTuple, Optional
+
+MASS = "mass"
+VOLUME = "volume"
+COUNT = "count"
+
+# Unit systems for convert_quantity()
+METRIC = "metric"
+US = "us"
+
+
+class Unit(NamedTuple):
+    name: str
+    kind: str
+    factor: float  # grams, millilitres or pieces per unit
+
+
+class Quantity(NamedTuple):
+    value: float
+    unit: Optional[Unit]  # None for a bare count, as in "2" eggs
+
+    @property
+    def kind(self) -> str:
+        return self.unit.kind if self.unit is not None else COUNT
+
+    @property
+    def base(self) -> float:
+        """The amount in grams, millilitres or pieces"""
+        return self.value * (self.unit.factor if self.unit is not None else 1.0)
+
+
+class ParsedAmount(NamedTuple):
+    quantity: Quantity
+    remainder: str  # the text after the number and unit, e.g. ", packed" in "2 cups, packed"
+    is_range: bool  # True for "2-3 tbsp", whose quantity is the midpoint
+    package: Optional[Quantity] = None  # the size of each in "2 (14 oz) cans", whose quantity is the total
+
+
+def _units(kind: str, factor: float, *names: str) -> dict:
+    unit = Unit(names[0], kind, factor)
+    return {name: unit for name in names}
+
+UNITS = {
+    **_units(MASS, 1.0, "g", "gram", "grams", "gr"),
+    **_units(MASS, 1000.0, "kg", "kilogram", "kilograms", "kilo", "kilos"),
+    **_units(MASS, 0.001, "mg", "milligram", "milligrams"),
+    **_units(MASS, 28.35, "oz", "ounce", "ounces"),
+    **_units(MASS, 453.6, "lb", "lbs", "pound", "pounds"),
+    **_units(MASS, 400.0, "can", "cans", "tin", "tins"),
+    **_units(MASS, 113.0, "stick", "sticks"),
+    **_units(MASS, 30.0, "handful", "handfuls"),
+    **_units(VOLUME, 1.0, "ml", "milliliter", "milliliters", "millilitre", "millilitres", "mls"),
+    **_units(VOLUME, 1000.0, "l", "liter", "liters", "litre", "litres"),
+    **_units(VOLUME, 100.0, "dl", "deciliter", "deciliters", "decilitre", "decilitres"),
+    **_units(VOLUME, 4.93, "tsp", "teaspoon", "teaspoons"),
+    **_units(VOLUME, 14.79, "tbsp", "tablespoon", "tablespoons", "tbs", "tbl", "tb"),
+    **_units(VOLUME, 236.6, "cup", "cups"),
+    **_units(VOLUME, 29.57, "fl oz", "fluid ounce", "fluid ounces"),
+    **_units(VOLUME, 473.2, "pint", "pints", "pt"),
+    **_units(VOLUME, 946.4, "quart", "quarts", "qt"),
+    **_units(VOLUME, 3785.0, "gallon", "gallons", "gal"),
+    **_units(VOLUME, 0.3, "pinch", "pinches"),
+    **_units(VOLUME, 0.6, "dash", "dashes"),
+    **_units(VOLUME, 0.05, "drop", "drops"),
+    **_units(COUNT, 1.0, "piece", "pieces", "pc", "pcs"),
+    **_units(COUNT, 1.0, "whole"),
+    **_units(COUNT, 1.0, "clove", "cloves"),
+    **_units(COUNT, 1.0, "slice", "slices"),
+    **_units(COUNT, 1.0, "fillet", "fillets", "filet", "filets"),
+    **_units(COUNT, 1.0, "stalk", "stalks", "rib", "ribs"),
+    **_units(COUNT, 1.0, "head", "heads"),
+    **_units(COUNT, 1.0, "ear", "ears"),
+    **_units(COUNT, 1.0, "sprig", "sprigs"),
+    **_units(COUNT, 1.0, "bunch", "bunches"),
+    **_units(COUNT, 1.0, "large"),
+    **_units(COUNT, 1.0, "medium"),
+    **_units(COUNT, 1.0, "small"),
+}
+
+_VULGAR_FRACTIONS = {"½": 0.5, "⅓": 1 / 3, "⅔": 2 / 3, "¼": 0.25, "¾": 0.75,
+                     "⅕": 0.2, "⅛": 0.125, "⅜": 0.375, "⅝": 0.625, "⅞": 0.875}
+_NUMBER = r"(?:\d+\s+\d+/\d+|\d+/\d+|\d*\.\d+|\d+\s*[½⅓⅔¼¾⅕⅛⅜⅝⅞]|\d+|[½⅓⅔¼¾⅕⅛⅜⅝⅞]|an?\b)"
+_AMOUNT = re.compile(
+    rf"^\s*(?:about|approx\.?|approximately|~)?\s*(?P<value>{_NUMBER})"
+    rf"(?:\s*(?:-|–|to)\s*(?P<upper>{_NUMBER}))?"
+    rf"\s*(?:\((?P<inner>[^)]*)\))?"
+    r"\s*(?P<unit>fl\.?\s*oz\b|fluid ounces?\b|[a-zA-Z]+\.?)?",
+    re.IGNORECASE
+)
+
+def parse_number(text: str) -> float:
+    """Parse "2", "1.5", "3/4", "1 1/2", "½", "1½" or "a" into a float"""
+    text = text.strip().lower()
+    if text in ("a", "an"):
+        return 1.0
+    if text[-1] in _VULGAR_FRACTIONS:
+        whole = text[:-1].strip()
+        return (float(whole) if whole else 0.0) + _VULGAR_FRACTIONS[text[-1]]
+    parts = text.split()
+    if len(parts) == 2:
+        return float(parts[0]) + parse_number(parts[1])
+    if "/" in text:
+        numerator, denominator = text.split("/")
+        return float(numerator) / float(denominator)
+    return float(text)
+
+def find_unit(name: str) -> Optional[Unit]:
+    """Look up a unit by any of its spellings, ignoring case and a trailing period"""
+    name = re.sub(r"\s+", " ", name.lower().rstrip(".").replace("fl.", "fl"))
+    return UNITS.get(name)
+
+@lru_cache(maxsize=4096)
+def split_amount(amount: str) -> Optional[ParsedAmount]:
+    """Split an ingredient amount into a quantity and the text after it, or None if it has no leading number
+
+    Ranges become their midpoint, and a parenthesised size multiplies the
+    count, so "2 (14 oz) cans" is 28 oz. A word that is not a unit, as in
+    "2 eggs", leaves the quantity a bare count and stays in the remainder.
+    """
+    match = _AMOUNT.match(amount)
+    if match is None:
+        return None
+    try:
+        value = parse_number(match.group("value"))
+        if match.group("upper"):
+            value = (value + parse_number(match.group("upper"))) / 2
+    except (ValueError, ZeroDivisionError):
+        return None
+
+    unit = find_unit(match.group("unit")) if match.group("unit") else None
+    end = match.end("unit") if unit is not None else max(match.end("value"), match.end("upper"), match.end("inner") + 1)
+    remainder = amount[end:]
+    is_range = bool(match.group("upper"))
+    inner = parse_amount(match.group("inner")) if match.group("inner") else None
+    if inner is not None and inner.unit is not None and (unit is None or unit.kind == COUNT or unit.name == "can"):
+        return ParsedAmount(Quantity(value * inner.value, inner.unit), remainder, is_range, inner)
+    return ParsedAmount(Quantity(value, unit), remainder, is_range)
+
+def parse_amount(amount: str) -> Optional[Quantity]:
+    """Parse an ingredient amount, or return None if it has no leading number ("to taste")"""
+    parsed = split_amount(amount)
+    return parsed.quantity if parsed is not None else None
+
+_FRACTION_NAMES = {0.25: "1/4", 1 / 3: "1/3", 0.5: "1/2", 2 / 3: "2/3", 0.75: "3/4"}
+
+def format_number(value: float, unit: Optional[Unit]) -> str:
+    """Write a number the way a recipe would: whole grams and millilitres, kitchen fractions otherwise"""
+    if unit is not None and unit.name in ("g", "ml", "mg"):
+        return str(int(round(value / 5) * 5)) if value >= 50 else str(max(1, int(round(value))))
+    if unit is not None and unit.name in ("kg", "l"):
+        return f"{round(value, 2):g}"
+    whole = int(value)
+    # Nearest kitchen fraction; very small amounts keep a fraction rather than becoming 0
+    fraction = min([0.0, 1.0] + list(_FRACTION_NAMES), key=lambda f: abs(value - whole - f))
+    if fraction == 1.0:
+        whole, fraction = whole + 1, 0.0
+    if whole == 0 and fraction == 0.0:
+        return "1/4" if value > 0 else "0"
+    if fraction == 0.0:
+        return str(whole)
+    return f"{whole} {_FRACTION_NAMES[fraction]}" if whole else _FRACTION_NAMES[fraction]
+
+def scale_amount(amount: str, factor: float, system: Optional[str] = None) -> str:
+    """Multiply the number(s) at the start of an amount, keeping the rest of the text
+
+    "1 1/2 cups" scaled by 2 is "3 cups", "2-3 tbsp" is "4-6 tbsp" and
+    "a pinch" is "2 pinches". Given a unit system, a package size is
+    converted but the package kept, so "2 (14 oz) cans" in metric is
+    "2 (395 g) cans". Amounts without a number, like "to taste", are returned unchanged.
+    """
+    match = _AMOUNT.match(amount)
+    if match is None or parse_amount(amount) is None:
+        return amount
+    unit = find_unit(match.group("unit")) if match.group("unit") else None
+    # (start, end, replacement) in the order they appear in the amount
+    edits = [(match.start("value"), match.end("value"),
+              format_number(parse_number(match.group("value")) * factor, unit))]
+    if match.group("upper"):
+        edits.append((match.start("upper"), match.end("upper"),
+                      format_number(parse_number(match.group("upper")) * factor, unit)))
+    written = parse_number(edits[-1][2])
+    if system is not None and match.group("inner"):
+        size = parse_amount(match.group("inner"))
+        if size is not None and size.unit is not None:
+            converted = convert_quantity(size, system)
+            if converted.unit != size.unit:
+                edits.append((match.start("inner"), match.end("inner"), format_quantity(converted)))
+    if unit is not None:
+        edits.append((match.start("unit"), match.end("unit"), _inflect(match.group("unit"), written)))
+    for start, end, text in reversed(edits):
+        amount = amount[:start] + text + amount[end:]
+    return amount
+
+# Units written without a plural form
+_ABBREVIATIONS = {"g", "kg", "mg", "ml", "l", "dl", "oz", "lb", "tsp", "tbsp", "fl oz", "pt", "qt",
+                  "gr", "tb", "pc", "gal"}
+
+def _inflect(word: str, value: float) -> str:
+    """A unit as written in an amount ("pinch", "Cans"), made singular or plural for value; abbreviations stay"""
+    stem = word.rstrip(".")
+    lower = stem.lower()
+    unit = UNITS.get(lower)
+    if unit is None:
+        return word
+    singular = next((lower[:-len(suffix)] for suffix in ("es", "s")
+                     if lower.endswith(suffix) and UNITS.get(lower[:-len(suffix)]) == unit), lower)
+    plural = next((singular + suffix for suffix in ("s", "es") if UNITS.get(singular + suffix) == unit), None)
+    if plural is None or singular in _ABBREVIATIONS:
+        return word
+    form = plural if value > 1 else singular
+    if form == lower:
+        return word
+    return (form.capitalize() if stem[:1].isupper() else form) + word[len(stem):]
+
+def unit_label(unit: Unit, value: float) -> str:
+    """The unit's name, made plural for amounts over one ("2 cups", "3 pinches", but "2 tbsp")"""
+    name = unit.name
+    if value <= 1 or name in _ABBREVIATIONS or unit.kind == COUNT and name in ("large", "medium", "small", "whole"):
+        return name
+    return name + "es" if name.endswith(("ch", "sh", "s", "x")) else name + "s"
+
+def format_quantity(quantity: Quantity) -> str:
+    """Write a quantity as recipe text, e.g. "1 1/2 cups" or "250 g"."""
+    number = format_number(quantity.value, quantity.unit)
+    if quantity.unit is None:
+        return number
+    # Pluralize by the number as written, so 1.06 cups is "1 cup"
+    return f"{number} {unit_label(quantity.unit, parse_number(number))}"
+
+_METRIC_UNITS = {MASS: [UNITS["g"], UNITS["kg"]], VOLUME: [UNITS["ml"], UNITS["l"]]}
+_US_UNITS = {MASS: [UNITS["oz"], UNITS["lb"]], VOLUME: [UNITS["tsp"], UNITS["tbsp"], UNITS["cup"]]}
+# Only these are converted; spoons stay spoons in metric, and pinches, cans and so on stay as written
+_CONVERTIBLE = {"g", "kg", "mg", "oz", "lb", "ml", "l", "dl", "cup", "fl oz", "pint", "quart", "gallon"}
+# Units already at home in each system, which conversion only resizes (500 ml doubled is 1 l)
+NATIVE_UNITS = {METRIC: {"g", "kg", "mg", "ml", "l", "dl", "tsp", "tbsp"},
+                US: {"oz", "lb", "tsp", "tbsp", "cup", "fl oz", "pint", "quart", "gallon"}}
+
+def convert_quantity(quantity: Quantity, system: str) -> Quantity:
+    """Express a weight or volume in metric (g, kg, ml, l) or US (oz, lb, tsp, tbsp, cup) units
+
+    Picks the largest unit the amount is at least one of, or at least a
+    quarter of for cups. Counts and kitchen measures such as pinches and
+    cans are returned unchanged, as are teaspoons and tablespoons in metric.
+    """
+    unit = quantity.unit
+    if unit is None or unit.kind == COUNT:
+        return quantity
+    if system == METRIC:
+        if unit.name not in _CONVERTIBLE:
+            return quantity
+        choices = _METRIC_UNITS[unit.kind]
+    elif system == US:
+        if unit.name not in _CONVERTIBLE and unit.name not in ("tsp", "tbsp"):
+            return quantity
+        choices = _US_UNITS[unit.kind]
+    else:
+        raise ValueError(f"Unknown unit system: {system}")
+
+    base = quantity.base
+    target = choices[0]
+    for choice in choices[1:]:
+        if base >= choice.factor * (0.25 if choice.name == "cup" else 1.0):
+            target = choice
+    return Quantity(base / target.factor, target)
@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+import metrics
+from resilience import LLMCallError
+
+# Spend is capped over this rolling window
+SPEND_WINDOW_SECONDS = 24 * 3600
+
+
+class BudgetExceeded(LLMCallError):
+    """The daily spend cap has been reached; not retried and not passed to fallback models"""
+
+
+class _Ticket:
+    """A place in the rate limiter's queue"""
+    __slots__ = ("enqueued",)
+
+    def __init__(self):
+        self.enqueued = time.monotonic()
+
+
+class TokenBucket:
+    """Allow `rate` units per minute, with bursts of up to one minute's worth"""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)  # a request larger than the bucket waits for a full one
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Client-side request/token rate limits and a daily spend cap for a shared API key
+
+    Callers wait in a first-come, first-served queue: only the caller at the
+    head may take from the buckets, so a burst is spread out smoothly instead
+    of ending in provider 429s. Limits apply to this process.
+
+    Args:
+        requests_per_minute: Most LLM requests per minute, or None for no limit
+        tokens_per_minute: Most tokens (prompt plus max_tokens, as providers count
+            them) per minute, or None for no limit
+        daily_budget_usd: Most spend over the last 24 hours, or None for no cap
+        spend_file: JSON file the spend log is kept in, so the cap survives restarts
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None,
+                 daily_budget_usd: Optional[float] = None, spend_file: Optional[str] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.daily_budget_usd = daily_budget_usd
+        self.spend_file = spend_file
+        self.last_wait = 0.0
+        self._condition = threading.Condition()
+        self._waiting: deque = deque()
+        self._spend: deque = deque()  # (unix time, usd)
+        self._spend_total = 0.0
+        if spend_file:
+            self._load_spend()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RateLimiter":
+        """Create a limiter from the "rate_limit" section of config.json"""
+        return cls(
+            requests_per_minute=config.get('requests_per_minute'),
+            tokens_per_minute=config.get('tokens_per_minute'),
+            daily_budget_usd=config.get('daily_budget_usd'),
+            spend_file=config.get('spend_file') if config.get('daily_budget_usd') else None
+        )
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Wait for a turn to make one request of about `tokens` tokens; returns seconds waited
+
+        Raises:
+            BudgetExceeded: If the daily spend cap has been reached
+        """
+        ticket = _Ticket()
+        with self._condition:
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    self._check_budget()
+                    delay = None
+                    if self._waiting[0] is ticket:
+                        now = time.monotonic()
+                        delay = max(
+                            self.requests.time_until(1, now) if self.requests else 0.0,
+                            self.tokens.time_until(tokens, now) if self.tokens else 0.0
+                        )
+                        if delay <= 0:
+                            if self.requests:
+                                self.requests.take(1)
+                            if self.tokens:
+                                self.tokens.take(tokens)
+                            break
+                    self._condition.wait(delay)
+            finally:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+        waited = time.monotonic() - ticket.enqueued
+        self.last_wait = waited
+        metrics.registry.observe("recipegenie_rate_limit_wait_seconds", waited)
+        return waited
+
+    @property
+    def active(self) -> bool:
+        """True if any limit or cap is configured"""
+        return bool(self.requests or self.tokens or self.daily_budget_usd is not None)
+
+    def queue_depth(self) -> int:
+        """Number of requests currently waiting for their turn"""
+        return len(self._waiting)
+
+    def longest_wait(self) -> float:
+        """Seconds the request at the head of the queue has been waiting (0 if none)"""
+        waiting = list(self._waiting)
+        return time.monotonic() - waiting[0].enqueued if waiting else 0.0
+
+    def record_spend(self, usd: float) -> None:
+        """Add the cost of a completed request to the rolling spend"""
+        if usd <= 0:
+            return
+        metrics.registry.increment("recipegenie_spend_usd_total", usd)
+        with self._condition:
+            self._spend.append((time.time(), usd))
+            self._spend_total += usd
+            if self.spend_file:
+                self._save_spend()
+
+    def spent_today(self) -> float:
+        """Spend over the last 24 hours, in USD"""
+        with self._condition:
+            self._expire_spend()
+            return self._spend_total
+
+    def _expire_spend(self) -> None:
+        cutoff = time.time() - SPEND_WINDOW_SECONDS
+        while self._spend and self._spend[0][0] < cutoff:
+            self._spend_total -= self._spend.popleft()[1]
+
+    def _check_budget(self) -> None:
+        if self.daily_budget_usd is None:
+            return
+        self._expire_spend()
+        if self._spend_total >= self.daily_budget_usd:
+            raise BudgetExceeded(f"Daily budget of ${self.daily_budget_usd:.2f} reached "
+                                 f"(${self._spend_total:.2f} spent in the last 24 hours)")
+
+    def _load_spend(self) -> None:
+        try:
+            with open(self.spend_file, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Could not read spend log {self.spend_file}: {str(e)}")
+            return
+        for when, usd in sorted(entries):
+            self._spend.append((when, usd))
+            self._spend_total += usd
+        self._expire_spend()
+
+    def _save_spend(self) -> None:
+        self._expire_spend()
+        tmp_path = f"{self.spend_file}.tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(list(self._spend), f)
+            os.replace(tmp_path, self.spend_file)
+        except OSError as e:
+            print(f"Could not write spend log {self.spend_file}: {str(e)}")
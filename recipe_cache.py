@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+class RecipeCache:
+    """On-disk cache of validated recipes with LRU, TTL and size-cap eviction
+
+    Each entry is a small JSON file named after its key. Recency is tracked in
+    memory (seeded from file modification times on first use) and mirrored to
+    disk by touching the file on every hit, so the LRU order survives restarts.
+    """
+
+    def __init__(self, directory: str = "recipe_cache", max_entries: int = 500,
+                 max_bytes: int = 20 * 1024 * 1024, ttl_seconds: Optional[float] = 7 * 24 * 3600):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._index: Optional["OrderedDict[str, int]"] = None  # key -> size in bytes, oldest first
+        self._total_bytes = 0
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RecipeCache":
+        """Create a cache from the "cache" section of config.json"""
+        ttl_hours = config.get('ttl_hours', 168)
+        return cls(
+            directory=config.get('directory', "recipe_cache"),
+            max_entries=config.get('max_entries', 500),
+            max_bytes=int(config.get('max_size_mb', 20) * 1024 * 1024),
+            ttl_seconds=ttl_hours * 3600 if ttl_hours else None
+        )
+
+    @staticmethod
+    def make_key(prompt: str, model: str, temperature: float, options: Optional[Dict[str, Any]] = None) -> str:
+        """Hash the fully built prompt together with the sampling parameters
+
+        options holds any other settings that change the recipe returned for
+        the same prompt, such as structured output or the nutrition check.
+        """
+        payload = json.dumps([prompt, model, temperature, options or {}], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _load_index(self) -> "OrderedDict[str, int]":
+        if self._index is None:
+            entries = []
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    if not name.endswith('.json'):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(self.directory, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, name[:-5], stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def _remove(self, key: str) -> None:
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached recipe for key, or None on a miss or expired entry"""
+        with self._lock:
+            index = self._load_index()
+            if key not in index:
+                return None
+            try:
+                with open(self._path(key), 'r') as f:
+                    entry = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._remove(key)
+                return None
+
+            if self.ttl_seconds and time.time() - entry.get('created', 0) > self.ttl_seconds:
+                self._remove(key)
+                return None
+
+            index.move_to_end(key)
+            try:
+                os.utime(self._path(key))
+            except OSError:
+                pass
+            return entry['recipe']
+
+    def _is_fresh(self, key: str) -> bool:
+        # Called with the lock held
+        try:
+            with open(self._path(key), 'r') as f:
+                created = json.load(f).get('created', 0)
+        except (OSError, json.JSONDecodeError):
+            return False
+        return not self.ttl_seconds or time.time() - created <= self.ttl_seconds
+
+    def put(self, key: str, recipe_data: Dict[str, Any], replace: bool = True) -> bool:
+        """Store a validated recipe, evicting the least recently used entries if needed
+
+        With replace=False an unexpired entry already stored under key is kept.
+        Returns whether the recipe was stored.
+        """
+        data = json.dumps({'created': time.time(), 'recipe': recipe_data}, separators=(',', ':'))
+        with self._lock:
+            index = self._load_index()
+            if not replace and key in index and self._is_fresh(key):
+                return False
+            os.makedirs(self.directory, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+
+            self._total_bytes -= index.pop(key, 0)
+            index[key] = len(data)
+            self._total_bytes += len(data)
+
+            while index and (len(index) > self.max_entries or self._total_bytes > self.max_bytes):
+                oldest = next(iter(index))
+                if oldest == key:
+                    break
+                self._remove(oldest)
+            return True
+
+    def clear(self) -> None:
+        """Remove every cached recipe"""
+        with self._lock:
+            for key in list(self._load_index()):
+                self._remove(key)
@@ -1,83 +1,993 @@
+import asyncio
 import json
-import litellm
-from typing import Dict, Any, List, Optional
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, TimeoutError as FutureTimeoutError, wait
+from typing import Dict, Any, AsyncIterator, Callable, Iterator, List, NamedTuple, Optional, Tuple
+import metrics
+from nutrition import check_recipe
+from pantry import DEFAULT_STAPLES, PantryIndex, PantryMatch, pantry_request
+from rate_limit import BudgetExceeded, RateLimiter
+from recipe_cache import RecipeCache
+from recipe_history import RecipeHistory, SimilarRecipe
+from recipe_prompts import (PROMPT_VARIANTS, SAMPLE_INGREDIENT, SAMPLE_SKELETON, SAMPLE_STEP, VARIANTS_INSTRUCTION,
+                            compile_prompt, expected_counts, prompt_values)
+from recipe_schema import VARIANTS_SCHEMA, coerce_types, extract_json, extract_json_list, response_format, validate
+from resilience import LLMCallError, ResiliencePolicy
+from stream_parser import IncrementalRecipeParser, FIELD_EVENT, ITEM_EVENT, STREAMED_LISTS
+
+# litellm pulls in a large dependency tree and takes seconds to import, so it
+# is loaded on first use (or warmed in the background) rather than at startup
+_litellm = None
+_litellm_lock = threading.Lock()
+
+def load_litellm():
+    """Import and return the litellm module, loading it on first call"""
+    global _litellm
+    if _litellm is None:
+        with _litellm_lock:
+            if _litellm is None:
+                import litellm
+                _litellm = litellm
+    return _litellm
+
+def use_backend(backend) -> None:
+    """Replace litellm with an object offering the same completion API, e.g. fake_llm.FakeLiteLLM
+    
+    Used to run the app, server and benchmarks offline.
+    """
+    global _litellm
+    with _litellm_lock:
+        _litellm = backend
+
+
+# max_tokens used when "max_tokens" is a number of its own or cannot be estimated
+DEFAULT_MAX_TOKENS = 2500
+
+# Bounds and safety margin for max_tokens "auto"; the estimate covers a typical
+# recipe, and models are often wordier than that
+MIN_AUTO_MAX_TOKENS = 800
+MAX_AUTO_MAX_TOKENS = 4000
+AUTO_MAX_TOKENS_HEADROOM = 2.0
+
+# How generate_variants() asks for several recipes: the provider's n parameter, a JSON array, or n where supported
+VARIANT_MODES = ("auto", "n", "array")
+
+
+class GenerationCancelled(ValueError):
+    """Raised when a caller cancels a recipe that is still being generated"""
+
+
+class BatchResult(NamedTuple):
+    """Outcome of one spec in a generate_many() batch"""
+    index: int
+    spec: Dict[str, Any]
+    recipe: Optional[Dict[str, Any]]
+    error: Optional[Exception]
+    elapsed: float = 0.0  # seconds spent generating, excluding time waiting for a slot
+
 
 class RecipeGenerator:
     def __init__(self, config: Dict[str, Any]):
         """Initialize the recipe generator with configuration"""
         self.config = config
+        self.temperature = config.get('temperature', 0.7)
+        self.stream = config.get('stream', True)
+        self.batch_concurrency = config.get('batch_concurrency', 4)
+        self.request_timeout = config.get('request_timeout')
+        self.structured_output = config.get('structured_output', True)
+        self.max_tokens = config.get('max_tokens', "auto")
+        self._response_token_costs: Dict[str, Any] = {}
+        self.setup_prompt()
+        self._schema_support: Dict[str, bool] = {}
+        self._param_support: Dict[tuple, bool] = {}
+        self._output_limits: Dict[str, Optional[int]] = {}
+        self.rate_limiter = RateLimiter.from_config(config.get('rate_limit', {}))
+        self.nutrition_config = config.get('nutrition', {})
+        self.variants_config = config.get('variants', {})
+        self._llm_configured = False
+        self._llm_lock = threading.Lock()
         self.setup_llm()
+        self.setup_cache()
+        self.setup_history()
+        self.setup_pantry()
+        metrics.configure(config.get('metrics', {}))
     
     def setup_llm(self):
-        """Set up the LLM client based on configuration"""
-        # Configure LiteLLM with API keys from config
-        if 'api_key' in self.config:
-            litellm.api_key = self.config['api_key']
+        """Set up the LLM model name based on configuration
         
+        LiteLLM itself is configured lazily, the first time the llm property is used.
+        """
         # Set default model if specified
-        model_name = self.config.get('model', 'gpt-3.5-turbo')
+        self.model = self._resolve_model_name(self.config.get('model', 'gpt-3.5-turbo'))
         
+        # Backup models for retries and hedged requests
+        resilience_config = self.config.get('resilience', {})
+        self.fallback_models = [self._resolve_model_name(name) for name in resilience_config.get('fallback_models', [])]
+        hedge_model = resilience_config.get('hedge_model')
+        if hedge_model:
+            self.hedge_model = self._resolve_model_name(hedge_model)
+        else:
+            self.hedge_model = self.fallback_models[0] if self.fallback_models else self.model
+        self.resilience = ResiliencePolicy.from_config(resilience_config)
+    
+    def _resolve_model_name(self, model_name: str) -> str:
+        """Map a configured model name to the name LiteLLM expects"""
         # For Claude models, we need to prefix with 'anthropic/'
         # Handle specific Claude model versions correctly
         if model_name.startswith('claude'):
             # Claude 3.5 Sonnet is the correct model name
             if 'claude-3-7-sonnet' in model_name or 'claude-3.5' in model_name:
-                self.model = "anthropic/claude-3-5-sonnet-20240620"
+                return "anthropic/claude-3-5-sonnet-20240620"
             # Claude 3 Opus
             elif 'claude-3-opus' in model_name:
-                self.model = "anthropic/claude-3-opus-20240229"
+                return "anthropic/claude-3-opus-20240229"
             # Claude 3 Sonnet
             elif 'claude-3-sonnet' in model_name:
-                self.model = "anthropic/claude-3-sonnet-20240229"
+                return "anthropic/claude-3-sonnet-20240229"
             # Claude 3 Haiku
             elif 'claude-3-haiku' in model_name:
-                self.model = "anthropic/claude-3-haiku-20240307"
+                return "anthropic/claude-3-haiku-20240307"
             # Default to Claude 3 Sonnet if unspecified version
             else:
-                self.model = "anthropic/claude-3-sonnet-20240229"
-        else:
-            self.model = model_name
+                return "anthropic/claude-3-sonnet-20240229"
+        return model_name
+    
+    @property
+    def llm(self):
+        """The litellm module, imported and configured on first use"""
+        if not self._llm_configured:
+            with self._llm_lock:
+                if not self._llm_configured:
+                    self._configure_litellm(load_litellm())
+                    self._llm_configured = True
+        return load_litellm()
+    
+    def _configure_litellm(self, litellm) -> None:
+        """Apply the API key and LiteLLM settings from configuration"""
+        # Configure LiteLLM with API keys from config
+        if 'api_key' in self.config:
+            litellm.api_key = self.config['api_key']
         
         # Set any additional LiteLLM configuration
         if 'litellm_config' in self.config:
             for key, value in self.config['litellm_config'].items():
                 setattr(litellm, key, value)
+        
+        # Reuse pooled HTTP connections to the LLM backend across requests
+        pool_config = self.config.get('http_pool')
+        if pool_config and hasattr(litellm, 'client_session'):
+            import httpx
+            limits = httpx.Limits(
+                max_connections=pool_config.get('max_connections', 20),
+                max_keepalive_connections=pool_config.get('max_keepalive_connections', 10)
+            )
+            litellm.client_session = httpx.Client(limits=limits)
+            litellm.aclient_session = httpx.AsyncClient(limits=limits)
+    
+    def warm_up(self) -> None:
+        """Import and configure LiteLLM ahead of the first request, e.g. from a background thread
+        
+        Also loads the model's tokenizer, which max_tokens "auto" needs.
+        """
+        try:
+            self.llm
+            self.estimate_max_tokens(4, 30)
+        except Exception as e:
+            print(f"Could not load LiteLLM: {str(e)}")
+    
+    def setup_cache(self):
+        """Set up the on-disk response cache based on configuration"""
+        cache_config = self.config.get('cache', {})
+        self.cache = RecipeCache.from_config(cache_config) if cache_config.get('enabled', True) else None
+        self.cache_refresh = cache_config.get('refresh', False)
+    
+    def setup_prompt(self):
+        """Compile the configured prompt template once for this generator"""
+        self.prompt_variant = self.config.get('prompt_variant', "full")
+        if self.prompt_variant not in PROMPT_VARIANTS:
+            print(f"Unknown prompt_variant '{self.prompt_variant}', using 'full'")
+            self.prompt_variant = "full"
+        self._render_prompt = compile_prompt(PROMPT_VARIANTS[self.prompt_variant])
+    
+    def count_tokens(self, text: str, model: Optional[str] = None) -> int:
+        """Count tokens with LiteLLM's tokenizer for the model (about 4 characters per token without it)"""
+        counter = getattr(self.llm, "token_counter", None)
+        if counter is not None:
+            try:
+                return counter(model=model or self.model, text=text)
+            except Exception:
+                pass
+        return max(1, len(text) // 4)
+    
+    def estimate_max_tokens(self, servings: int, prep_time: int) -> int:
+        """Return max_tokens for a request: the configured number, or an estimate for "auto"
+        
+        The estimate is the tokenized size of a typical recipe skeleton plus a
+        typical ingredient and step for each one expected, with headroom.
+        """
+        if self.max_tokens != "auto":
+            return int(self.max_tokens or DEFAULT_MAX_TOKENS)
+        costs = self._response_token_costs.get(self.model)
+        if costs is None:
+            costs = self._response_token_costs[self.model] = {
+                "skeleton": self.count_tokens(SAMPLE_SKELETON),
+                "ingredients": self.count_tokens(SAMPLE_INGREDIENT),
+                "instructions": self.count_tokens(SAMPLE_STEP)
+            }
+        counts = expected_counts(servings, prep_time)
+        estimate = costs["skeleton"] + sum(costs[key] * count for key, count in counts.items())
+        return max(MIN_AUTO_MAX_TOKENS, min(MAX_AUTO_MAX_TOKENS, int(estimate * AUTO_MAX_TOKENS_HEADROOM)))
+    
+    def setup_history(self):
+        """Open the recipe history database based on configuration"""
+        history_config = self.config.get('history', {})
+        self.similar_config = history_config.get('similar', {})
+        self.history = None
+        if history_config.get('enabled', True):
+            try:
+                self.history = RecipeHistory.from_config(history_config)
+            except Exception as e:
+                print(f"Could not open recipe history: {str(e)}")
+    
+    def setup_pantry(self):
+        """Prepare the pantry index, which is built from the history on first use"""
+        self.pantry_config = self.config.get('pantry', {})
+        self._pantry_index: Optional[PantryIndex] = None
+        self._pantry_lock = threading.Lock()
+    
+    def pantry_index(self) -> Optional[PantryIndex]:
+        """Return the ingredient index of the history, building it on first use (None without a history)"""
+        if self.history is None:
+            return None
+        if self._pantry_index is None:
+            with self._pantry_lock:
+                if self._pantry_index is None:
+                    with metrics.span("pantry_index_build"):
+                        self._pantry_index = PantryIndex.from_history(
+                            self.history, self.pantry_config.get('staples', DEFAULT_STAPLES))
+        return self._pantry_index
+    
+    def find_pantry_recipes(self, pantry: List[str], limit: int = 20) -> List[PantryMatch]:
+        """Rank stored recipes by how much of their ingredient list the pantry covers
+        
+        Only recipes with at least the configured min_coverage are returned.
+        """
+        index = self.pantry_index()
+        if index is None:
+            return []
+        with metrics.span("pantry_search"):
+            matches = index.search(pantry, self.pantry_config.get('min_coverage', 0.75), limit)
+        metrics.registry.increment("recipegenie_pantry_requests_total", result="hit" if matches else "miss")
+        return matches
+    
+    def cook_from_pantry(self, pantry: List[str], cuisine: str, calories: int, servings: int, prep_time: int,
+                         additional_info: str = "",
+                         limit: int = 20) -> Tuple[List[PantryMatch], Optional[Dict[str, Any]]]:
+        """Find stored recipes the pantry covers, or generate one when none do
+        
+        Returns (matches, None) when find_pantry_recipes() finds any; otherwise
+        ([], recipe) from generate_recipe(), with the first pantry item as the
+        main ingredient and the whole pantry passed in additional_info.
+        """
+        if not pantry:
+            raise ValueError("The pantry is empty")
+        matches = self.find_pantry_recipes(pantry, limit)
+        if matches:
+            return matches, None
+        return [], self.generate_recipe(cuisine, pantry[0], calories, servings, prep_time,
+                                        pantry_request(pantry, additional_info))
+    
+    def find_similar(self, cuisine: str, centerpiece: str, calories: int, servings: int, prep_time: int,
+                     additional_info: str = "") -> Optional[SimilarRecipe]:
+        """Look for a stored recipe close enough to this request to serve instead of calling the LLM"""
+        if self.history is None or not self.similar_config.get('enabled', True):
+            return None
+        try:
+            with metrics.span("history_lookup"):
+                match = self.history.find_similar(
+                    cuisine, centerpiece, calories, servings, prep_time, additional_info,
+                    calorie_tolerance=self.similar_config.get('calorie_tolerance', 0.1),
+                    servings_tolerance=self.similar_config.get('servings_tolerance', 0),
+                    prep_time_tolerance=self.similar_config.get('prep_time_tolerance', 0),
+                    min_similarity=self.similar_config.get('min_similarity', 0.5)
+                )
+        except Exception as e:
+            print(f"Could not search recipe history: {str(e)}")
+            return None
+        metrics.registry.increment("recipegenie_history_requests_total", result="hit" if match is not None else "miss")
+        return match
+    
+    def _reuse_similar(self, cuisine: str, centerpiece: str, calories: int, servings: int, prep_time: int,
+                       additional_info: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of a similar stored recipe marked with where it came from, or None"""
+        match = self.find_similar(cuisine, centerpiece, calories, servings, prep_time, additional_info)
+        if match is None:
+            return None
+        return dict(match.recipe, from_history={"recipe_id": match.recipe_id, "similarity": match.similarity,
+                                                "created": match.created})
+    
+    def _remember(self, recipe_data: Dict[str, Any], spec: Dict[str, Any]) -> None:
+        """Add a freshly generated recipe to the history"""
+        if self.history is None:
+            return
+        try:
+            with metrics.span("history_save"):
+                recipe_id = self.history.add(recipe_data, spec, model=self.model)
+            if recipe_id is not None and self._pantry_index is not None:
+                self._pantry_index.add(recipe_id, recipe_data)
+        except Exception as e:
+            print(f"Could not save recipe to history: {str(e)}")
+    
+    def _nutrition_settings(self) -> Optional[Dict[str, Any]]:
+        """The nutrition check's effective keyword arguments for check_recipe(), or None if it is off"""
+        if not self.nutrition_config.get('enabled', True):
+            return None
+        return {
+            "tolerance": float(self.nutrition_config.get('calorie_tolerance', 0.15)),
+            "min_coverage": float(self.nutrition_config.get('min_coverage', 0.75)),
+            "auto_scale": bool(self.nutrition_config.get('auto_scale', False))
+        }
+    
+    def check_nutrition(self, recipe_data: Dict[str, Any], calories: int) -> Dict[str, Any]:
+        """Recompute nutrition from the ingredients and flag (or scale) recipes that miss the calorie target"""
+        settings = self._nutrition_settings()
+        if settings is None:
+            return recipe_data
+        try:
+            with metrics.span("nutrition_check"):
+                checked = check_recipe(recipe_data, calories, **settings)
+        except Exception as e:
+            print(f"Could not check recipe nutrition: {str(e)}")
+            return recipe_data
+        metrics.registry.increment("recipegenie_nutrition_checks_total", status=checked["nutrition_check"]["status"])
+        return checked
     
     def generate_recipe(self, cuisine: str, centerpiece: str, calories: int, 
-                        servings: int, prep_time: int, additional_info: str) -> Dict[str, Any]:
-        """Generate a recipe using the configured LLM"""
+                        servings: int, prep_time: int, additional_info: str,
+                        refresh: bool = False,
+                        on_event: Optional[Callable[[str, str, Any], None]] = None,
+                        cancel_event: Optional[threading.Event] = None,
+                        reuse_similar: bool = False, replace_cached: bool = True) -> Dict[str, Any]:
+        """Generate a recipe using the configured LLM
+        
+        Identical requests are answered from the response cache when it is enabled.
+        With reuse_similar, near-identical ones are answered from the recipe
+        history (see find_similar), and the recipe returned has a "from_history"
+        field with the stored recipe's id, similarity and creation time. Pass
+        refresh=True to skip both lookups and store a freshly generated recipe;
+        with replace_cached=False it is only stored if the cache has no entry
+        for the request yet.
+        
+        If on_event is given it is called as on_event(kind, key, value) for each
+        recipe field (and each ingredient/instruction) as soon as it is available.
+        With streaming enabled this happens while the response is still arriving;
+        setting cancel_event stops reading the stream.
+        """
         # Construct the prompt
-        prompt = self._build_prompt(cuisine, centerpiece, calories, servings, prep_time, additional_info)
+        with metrics.span("prompt_build"):
+            prompt = self._build_prompt(cuisine, centerpiece, calories, servings, prep_time, additional_info)
         
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(prompt)
+            if not (refresh or self.cache_refresh):
+                cached = self._cache_lookup(cache_key)
+                if cached is not None:
+                    if on_event is not None:
+                        self._replay_events(cached, on_event)
+                    return cached
+        
+        if reuse_similar and not refresh:
+            reused = self._reuse_similar(cuisine, centerpiece, calories, servings, prep_time, additional_info)
+            if reused is not None:
+                if on_event is not None:
+                    self._replay_events(reused, on_event)
+                return reused
+        
+        max_tokens = self.estimate_max_tokens(servings, prep_time)
+        if on_event is not None and self.stream:
+            recipe_data = self._stream_with_fallback(prompt, on_event, cancel_event, max_tokens)
+        else:
+            recipe_data = self._generate_from_prompt(prompt, max_tokens)
+            if on_event is not None:
+                self._replay_events(recipe_data, on_event)
+        
+        recipe_data = self.check_nutrition(recipe_data, calories)
+        self._remember(recipe_data, {"cuisine": cuisine, "centerpiece": centerpiece, "calories": calories,
+                                     "servings": servings, "additional_info": additional_info})
+        
+        if cache_key is not None:
+            try:
+                self.cache.put(cache_key, recipe_data, replace=replace_cached)
+            except OSError as e:
+                print(f"Could not write recipe cache: {str(e)}")
+        
+        return recipe_data
+    
+    def generate_variants(self, cuisine: str, centerpiece: str, calories: int, servings: int, prep_time: int,
+                          additional_info: str, count: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Generate several different recipes for one request with a single LLM call
+        
+        Where LiteLLM reports that the provider supports the `n` parameter, each
+        of the n choices is one recipe; otherwise the prompt asks for a JSON
+        array of `count` recipes (config "variants": "mode" forces either).
+        Every variant is validated on its own and invalid ones are dropped, so
+        fewer than `count` may come back; ValueError is raised only if none are
+        valid. Variants skip the response cache and similar-recipe lookup, since
+        the point is a fresh choice, but are checked and added to the history.
+        
+        Args:
+            count: Number of recipes to ask for (config "variants": "count", default 3)
+        """
+        count = max(1, int(count or self.variants_config.get('count', 3)))
+        with metrics.span("prompt_build"):
+            prompt = self._build_prompt(cuisine, centerpiece, calories, servings, prep_time, additional_info)
+        max_tokens = self.estimate_max_tokens(servings, prep_time)
+        
+        models = [self.model] + self.fallback_models
+        variants = self._generate_with_retries(
+            prompt, models, max_tokens,
+            call=lambda prompt, model, max_tokens: self._attempt_variants(prompt, model, max_tokens, count))
+        
+        spec = {"cuisine": cuisine, "centerpiece": centerpiece, "calories": calories,
+                "servings": servings, "additional_info": additional_info}
+        checked = []
+        for recipe_data in variants:
+            recipe_data = self.check_nutrition(recipe_data, calories)
+            self._remember(recipe_data, spec)
+            checked.append(recipe_data)
+        return checked
+    
+    def _variant_mode(self, model: str) -> str:
+        """Return "n" or "array" for a model, resolving the configured "auto" mode"""
+        mode = self.variants_config.get('mode', "auto")
+        if mode not in VARIANT_MODES:
+            print(f"Unknown variants mode '{mode}', using 'auto'")
+            mode = "auto"
+        if mode == "auto":
+            return "n" if self._supports_param(model, "n") else "array"
+        return mode
+    
+    def _attempt_variants(self, prompt: str, model: str, max_tokens: Optional[int], count: int) -> List[Dict[str, Any]]:
+        """Make one LLM call for `count` recipes and return the valid ones
+        
+        max_tokens is the budget for one recipe: it is per choice with `n`, and
+        multiplied by count when all the recipes share one response. Either is
+        capped at the model's output limit when LiteLLM knows it, asking for
+        fewer recipes if that many would not fit in one response.
+        """
+        mode = self._variant_mode(model)
+        per_recipe = max_tokens or DEFAULT_MAX_TOKENS
+        limit = self._output_token_limit(model)
+        if mode == "n":
+            max_tokens = per_recipe if limit is None else min(per_recipe, limit)
+            extra = {"n": count}
+            # Providers count every choice against tokens-per-minute limits
+            self._wait_for_rate_limit(prompt, max_tokens * count)
+        else:
+            if limit is not None and per_recipe * count > limit:
+                fits = max(1, limit // per_recipe)
+                if fits < count:
+                    print(f"Model '{model}' writes at most {limit} tokens, enough for {fits} of {count} recipes")
+                    count = fits
+            max_tokens = per_recipe * count if limit is None else min(per_recipe * count, limit)
+            prompt += VARIANTS_INSTRUCTION.format(count=count)
+            extra = {}
+            self._wait_for_rate_limit(prompt, max_tokens)
+        started = time.perf_counter()
+        try:
+            with metrics.span("llm_call", model=model, variants=str(count)) as span:
+                kwargs = self._completion_kwargs(prompt, model, max_tokens, **extra)
+                if mode == "array" and "response_format" in kwargs:
+                    kwargs["response_format"] = response_format("recipes", VARIANTS_SCHEMA)
+                response = self.llm.completion(**kwargs)
+                self._record_response(span, model, response)
+        except Exception as e:
+            print(f"LiteLLM error with model '{model}': {str(e)}")
+            raise LLMCallError(f"Failed to generate recipes with model '{model}': {str(e)}") from e
+        
+        variants = self._parse_variants([choice.message.content or "" for choice in response.choices], mode)
+        self.resilience.record_latency(time.perf_counter() - started)
+        return variants
+    
+    def _parse_variants(self, texts: List[str], mode: str) -> List[Dict[str, Any]]:
+        """Extract and validate each recipe in the response choices, dropping the invalid ones"""
+        candidates = []
+        problems = []
+        with metrics.span("parse"):
+            for text in texts:
+                try:
+                    if mode == "n":
+                        candidates.append(self._extract_recipe_json(text))
+                    else:
+                        candidates.extend(extract_json_list(text))
+                except (json.JSONDecodeError, ValueError) as e:
+                    problems.append(str(e))
+        
+        variants = []
+        with metrics.span("validate"):
+            for recipe_data in candidates:
+                try:
+                    self._validate_recipe_data(recipe_data)
+                except ValueError as e:
+                    problems.append(str(e))
+                    continue
+                variants.append(recipe_data)
+        metrics.registry.increment("recipegenie_variants_total", len(variants), result="valid")
+        if problems:
+            print(f"Discarded {len(problems)} invalid recipe variant(s): {problems[0]}")
+            metrics.registry.increment("recipegenie_variants_total", len(problems), result="invalid")
+        if not variants:
+            raise ValueError(f"Failed to parse recipe data: {problems[0] if problems else 'no recipes in response'}")
+        return variants
+    
+    def _cache_key(self, prompt: str) -> str:
+        """Cache key for a prompt under the settings that shape the recipe returned
+        
+        Settings are hashed as they take effect, with defaults filled in, so
+        config edits that change nothing (such as adding "enabled": true) keep the cache.
+        """
+        options = {
+            "structured_output": bool(self.structured_output),
+            "max_tokens": "auto" if self.max_tokens == "auto" else int(self.max_tokens or DEFAULT_MAX_TOKENS),
+            "nutrition": self._nutrition_settings()
+        }
+        return RecipeCache.make_key(prompt, self.model, self.temperature, options)
+    
+    def _cache_lookup(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached recipe, counting hits and misses"""
+        with metrics.span("cache_lookup"):
+            cached = self.cache.get(cache_key)
+        metrics.registry.increment("recipegenie_cache_requests_total", result="hit" if cached is not None else "miss")
+        return cached
+    
+    async def agenerate_recipe(self, cuisine: str, centerpiece: str, calories: int, 
+                               servings: int, prep_time: int, additional_info: str = "",
+                               refresh: bool = False, reuse_similar: bool = False) -> Dict[str, Any]:
+        """Asynchronous version of generate_recipe() built on litellm.acompletion"""
+        with metrics.span("prompt_build"):
+            prompt = self._build_prompt(cuisine, centerpiece, calories, servings, prep_time, additional_info)
+        
+        cache_key = None
+        if self.cache is not None:
+            cache_key = self._cache_key(prompt)
+            if not (refresh or self.cache_refresh):
+                cached = self._cache_lookup(cache_key)
+                if cached is not None:
+                    return cached
+        
+        if reuse_similar and not refresh:
+            reused = self._reuse_similar(cuisine, centerpiece, calories, servings, prep_time, additional_info)
+            if reused is not None:
+                return reused
+        
+        recipe_data = await self._agenerate_from_prompt(prompt, self.estimate_max_tokens(servings, prep_time))
+        recipe_data = self.check_nutrition(recipe_data, calories)
+        
+        self._remember(recipe_data, {"cuisine": cuisine, "centerpiece": centerpiece, "calories": calories,
+                                     "servings": servings, "additional_info": additional_info})
+        
+        if cache_key is not None:
+            try:
+                self.cache.put(cache_key, recipe_data)
+            except OSError as e:
+                print(f"Could not write recipe cache: {str(e)}")
+        
+        return recipe_data
+    
+    async def agenerate_many(self, specs: List[Dict[str, Any]],
+                             concurrency: Optional[int] = None) -> AsyncIterator[BatchResult]:
+        """Generate several recipes concurrently, yielding each result as it completes
+        
+        Each spec holds the keyword arguments of generate_recipe(). At most
+        `concurrency` requests are in flight at once, and a failure in one spec
+        is reported in its BatchResult without affecting the others.
+        """
+        limit = asyncio.Semaphore(concurrency or self.batch_concurrency)
+        
+        async def run(index: int, spec: Dict[str, Any]) -> BatchResult:
+            async with limit:
+                started = time.perf_counter()
+                try:
+                    recipe_data = await self.agenerate_recipe(**spec)
+                except Exception as e:
+                    return BatchResult(index, spec, None, e, time.perf_counter() - started)
+                return BatchResult(index, spec, recipe_data, None, time.perf_counter() - started)
+        
+        tasks = [asyncio.ensure_future(run(index, spec)) for index, spec in enumerate(specs)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    def generate_many(self, specs: List[Dict[str, Any]], concurrency: Optional[int] = None,
+                      cancel_event: Optional[threading.Event] = None) -> Iterator[BatchResult]:
+        """Synchronous wrapper around agenerate_many() for threaded callers
+        
+        The event loop runs on its own thread; results are yielded in completion
+        order. Setting cancel_event (or closing the iterator) abandons the rest.
+        """
+        results: queue.Queue = queue.Queue()
+        finished = object()
+        state: Dict[str, Any] = {}
+        
+        async def pump():
+            state['loop'] = asyncio.get_running_loop()
+            state['task'] = asyncio.current_task()
+            try:
+                async for result in self.agenerate_many(specs, concurrency):
+                    results.put(result)
+            finally:
+                results.put(finished)
+        
+        def run_loop():
+            try:
+                asyncio.run(pump())
+            except asyncio.CancelledError:
+                pass
+        
+        thread = threading.Thread(target=run_loop, name="recipe-batch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                if cancel_event is not None and cancel_event.is_set():
+                    break
+                try:
+                    item = results.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if item is finished:
+                    break
+                yield item
+        finally:
+            if thread.is_alive() and 'loop' in state:
+                state['loop'].call_soon_threadsafe(state['task'].cancel)
+    
+    def _completion_kwargs(self, prompt: str, model: Optional[str] = None, max_tokens: Optional[int] = None,
+                           **extra: Any) -> Dict[str, Any]:
+        """Build the keyword arguments for a litellm completion call"""
+        kwargs = {
+            "model": model or self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "max_tokens": max_tokens or DEFAULT_MAX_TOKENS
+        }
+        if self.request_timeout:
+            kwargs["timeout"] = self.request_timeout
+        if self.structured_output and self._supports_response_schema(kwargs["model"]):
+            kwargs["response_format"] = response_format()
+        kwargs.update(extra)
+        return kwargs
+    
+    def _supports_response_schema(self, model: str) -> bool:
+        """Ask LiteLLM (once per model) whether the provider can enforce a JSON Schema"""
+        supported = self._schema_support.get(model)
+        if supported is None:
+            check = getattr(self.llm, "supports_response_schema", None)
+            try:
+                supported = bool(check(model=model)) if check is not None else False
+            except Exception:
+                supported = False
+            self._schema_support[model] = supported
+        return supported
+    
+    def _attempt(self, prompt: str, model: str, max_tokens: Optional[int] = None,
+                 on_start: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+        """Make one LLM call and return the validated recipe; on_start() runs once the rate limiter lets it go"""
+        self._wait_for_rate_limit(prompt, max_tokens)
+        if on_start is not None:
+            on_start()
+        started = time.perf_counter()
         try:
             # Call the LLM
-            response = litellm.completion(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                max_tokens=2500
-            )
+            with metrics.span("llm_call", model=model) as span:
+                response = self.llm.completion(**self._completion_kwargs(prompt, model, max_tokens))
+                self._record_response(span, model, response)
         except Exception as e:
-            print(f"LiteLLM error with model '{self.model}': {str(e)}")
-            raise ValueError(f"Failed to generate recipe with model '{self.model}': {str(e)}")
+            print(f"LiteLLM error with model '{model}': {str(e)}")
+            raise LLMCallError(f"Failed to generate recipe with model '{model}': {str(e)}") from e
         
         # Extract and parse the response
-        response_text = response.choices[0].message.content
+        recipe_data = self._parse_response_text(response.choices[0].message.content)
+        self.resilience.record_latency(time.perf_counter() - started)
+        return recipe_data
+    
+    def _record_response(self, span: metrics.Span, model: str, response: Any) -> None:
+        """Attach the responding model and token usage of a LiteLLM response to a span, and count its cost"""
+        response_model = getattr(response, "model", None) or model
+        tokens = metrics.registry.record_usage(response_model, response)
+        span.set(response_model=response_model, **tokens)
+        if tokens:
+            self.rate_limiter.record_spend(self._usage_cost(model, response_model, tokens))
+    
+    def _usage_cost(self, model: str, response_model: str, tokens: Dict[str, int]) -> float:
+        """Price a response's token usage with LiteLLM's cost table (0 if the model is not in it)"""
+        cost_per_token = getattr(self.llm, "cost_per_token", None)
+        if cost_per_token is None:
+            return 0.0
+        for name in (response_model, model):
+            try:
+                prompt_cost, completion_cost = cost_per_token(
+                    model=name, prompt_tokens=tokens.get("prompt_tokens", 0),
+                    completion_tokens=tokens.get("completion_tokens", 0))
+                return prompt_cost + completion_cost
+            except Exception:
+                continue
+        return 0.0
+    
+    def _wait_for_rate_limit(self, prompt: str, max_tokens: Optional[int]) -> None:
+        """Wait for a turn under the configured rate limits; raises BudgetExceeded past the daily cap"""
+        if not self.rate_limiter.active:
+            return
+        # Providers count max_tokens, not the actual output, against tokens-per-minute limits
+        tokens = self.count_tokens(prompt) + (max_tokens or DEFAULT_MAX_TOKENS) if self.rate_limiter.tokens else 0
+        with metrics.span("rate_limit_wait"):
+            self.rate_limiter.acquire(tokens)
+    
+    def _output_token_limit(self, model: str) -> Optional[int]:
+        """Ask LiteLLM (once per model) for the most tokens the model can write in one response, None if unknown"""
+        if model not in self._output_limits:
+            get_max_tokens = getattr(self.llm, "get_max_tokens", None)
+            try:
+                limit = int(get_max_tokens(model)) if get_max_tokens is not None else None
+            except Exception:
+                limit = None
+            self._output_limits[model] = limit
+        return self._output_limits[model]
+    
+    def _supports_param(self, model: str, param: str) -> bool:
+        """Ask LiteLLM (once per model and parameter) whether the provider accepts an OpenAI parameter"""
+        supported = self._param_support.get((model, param))
+        if supported is None:
+            get_params = getattr(self.llm, "get_supported_openai_params", None)
+            try:
+                supported = param in (get_params(model=model) or []) if get_params is not None else False
+            except Exception:
+                supported = False
+            self._param_support[(model, param)] = supported
+        return supported
+    
+    def _supports_stream_usage(self, model: str) -> bool:
+        """Whether the provider reports token usage at the end of a stream (needed to track spend)"""
+        return self._supports_param(model, "stream_options")
+    
+    def _generate_with_retries(self, prompt: str, models: List[str], max_tokens: Optional[int] = None,
+                               call: Optional[Callable[[str, str, Optional[int]], Any]] = None) -> Any:
+        """Try each model in order, retrying transient failures with exponential backoff
         
-        # Find the JSON part of the response
+        Each try is call(prompt, model, max_tokens), _attempt() by default.
+        """
+        call = call or self._attempt
+        last_error = None
+        for model in models:
+            for attempt in range(self.resilience.max_retries + 1):
+                if attempt:
+                    time.sleep(self.resilience.backoff(attempt))
+                try:
+                    return call(prompt, model, max_tokens)
+                except BudgetExceeded:
+                    raise
+                except ValueError as e:
+                    last_error = e
+                    if not self.resilience.is_retryable(e):
+                        break
+        raise last_error
+    
+    def _generate_from_prompt(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Call the LLM with a built prompt and return the validated recipe
+        
+        Failures are retried and then passed on to the fallback models. When
+        hedging is enabled and the first request is slower than the hedge delay,
+        a second request goes to the hedge model and the first valid recipe wins.
+        """
+        models = [self.model] + self.fallback_models
+        delay = self.resilience.hedge_delay()
+        if delay is None:
+            return self._generate_with_retries(prompt, models, max_tokens)
+        
+        # The hedge delay counts from the first LLM call, not from time spent waiting for the rate limiter
+        call_started = threading.Event()
+        primary = self._start_thread(self._generate_with_retries, prompt, models, max_tokens,
+                                     lambda *args: self._attempt(*args, on_start=call_started.set))
+        primary.add_done_callback(lambda future: call_started.set())
+        call_started.wait()
         try:
-            # Try to find JSON in the response
-            json_start = response_text.find('{')
-            json_end = response_text.rfind('}') + 1
-            
-            if json_start >= 0 and json_end > json_start:
-                json_str = response_text[json_start:json_end]
-                recipe_data = json.loads(json_str)
-            else:
-                raise ValueError("No JSON found in response")
+            return primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        
+        # The slower request cannot be interrupted; its result is simply ignored
+        backup_models = [self.hedge_model] + [model for model in self.fallback_models if model != self.hedge_model]
+        pending = {primary, self._start_thread(self._generate_with_retries, prompt, backup_models, max_tokens)}
+        errors = []
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    return future.result()
+                except ValueError as e:
+                    errors.append(e)
+        raise errors[0]
+    
+    @staticmethod
+    def _start_thread(fn: Callable[..., Any], *args: Any) -> Future:
+        """Run fn(*args) on a new thread of its own, so concurrent generations never queue behind each other"""
+        future: Future = Future()
+        future.set_running_or_notify_cancel()
+        
+        def run():
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+        
+        threading.Thread(target=run, name="recipe-hedge", daemon=True).start()
+        return future
+    
+    async def _aattempt(self, prompt: str, model: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Asynchronous version of _attempt()"""
+        if self.rate_limiter.active:
+            await asyncio.get_running_loop().run_in_executor(None, self._wait_for_rate_limit, prompt, max_tokens)
+        started = time.perf_counter()
+        try:
+            with metrics.span("llm_call", model=model) as span:
+                response = await self.llm.acompletion(**self._completion_kwargs(prompt, model, max_tokens))
+                self._record_response(span, model, response)
+        except Exception as e:
+            print(f"LiteLLM error with model '{model}': {str(e)}")
+            raise LLMCallError(f"Failed to generate recipe with model '{model}': {str(e)}") from e
+        
+        recipe_data = self._parse_response_text(response.choices[0].message.content)
+        self.resilience.record_latency(time.perf_counter() - started)
+        return recipe_data
+    
+    async def _agenerate_with_retries(self, prompt: str, models: List[str],
+                                      max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Asynchronous version of _generate_with_retries()"""
+        last_error = None
+        for model in models:
+            for attempt in range(self.resilience.max_retries + 1):
+                if attempt:
+                    await asyncio.sleep(self.resilience.backoff(attempt))
+                try:
+                    return await self._aattempt(prompt, model, max_tokens)
+                except BudgetExceeded:
+                    raise
+                except ValueError as e:
+                    last_error = e
+                    if not self.resilience.is_retryable(e):
+                        break
+        raise last_error
+    
+    async def _agenerate_from_prompt(self, prompt: str, max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Asynchronous version of _generate_from_prompt(); the losing hedged request is cancelled"""
+        models = [self.model] + self.fallback_models
+        delay = self.resilience.hedge_delay()
+        if delay is None:
+            return await self._agenerate_with_retries(prompt, models, max_tokens)
+        
+        primary = asyncio.ensure_future(self._agenerate_with_retries(prompt, models, max_tokens))
+        try:
+            return await asyncio.wait_for(asyncio.shield(primary), delay)
+        except asyncio.TimeoutError:
+            pass
+        
+        backup_models = [self.hedge_model] + [model for model in self.fallback_models if model != self.hedge_model]
+        pending = {primary, asyncio.ensure_future(self._agenerate_with_retries(prompt, backup_models, max_tokens))}
+        errors = []
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    try:
+                        return task.result()
+                    except ValueError as e:
+                        errors.append(e)
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    def _stream_with_fallback(self, prompt: str, on_event: Callable[[str, str, Any], None],
+                              cancel_event: Optional[threading.Event] = None,
+                              max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Stream the recipe, retrying without streaming if it fails before anything was shown
+        
+        Once a field has been reported the caller may already be displaying it,
+        so a later failure is raised instead of retried.
+        """
+        reported = []
+        
+        def report(kind: str, key: str, value: Any) -> None:
+            reported.append(key)
+            on_event(kind, key, value)
+        
+        try:
+            return self._stream_from_prompt(prompt, report, cancel_event, max_tokens)
+        except GenerationCancelled:
+            raise
+        except ValueError as e:
+            can_retry = self.resilience.max_retries or self.fallback_models
+            if reported or not can_retry or not self.resilience.is_retryable(e):
+                raise
+            print(f"Streaming failed, retrying without streaming: {str(e)}")
+        
+        recipe_data = self._generate_from_prompt(prompt, max_tokens)
+        self._replay_events(recipe_data, on_event)
+        return recipe_data
+    
+    def _stream_from_prompt(self, prompt: str, on_event: Callable[[str, str, Any], None],
+                            cancel_event: Optional[threading.Event] = None,
+                            max_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Stream the LLM response, reporting recipe fields as soon as each one is complete"""
+        self._wait_for_rate_limit(prompt, max_tokens)
+        extra = {"stream_options": {"include_usage": True}} if self._supports_stream_usage(self.model) else {}
+        try:
+            with metrics.span("llm_call", model=self.model, stream="true") as span:
+                started = time.perf_counter()
+                response = self.llm.completion(**self._completion_kwargs(prompt, max_tokens=max_tokens, stream=True,
+                                                                         **extra))
+                
+                parser = IncrementalRecipeParser()
+                first_token = True
+                for chunk in response:
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise GenerationCancelled("Recipe generation was cancelled")
+                    if getattr(chunk, "usage", None):
+                        self._record_response(span, self.model, chunk)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first_token:
+                            first_token = False
+                            time_to_first_token = time.perf_counter() - started
+                            metrics.registry.observe("recipegenie_time_to_first_token_seconds",
+                                                     time_to_first_token, model=self.model)
+                            span.set(time_to_first_token=time_to_first_token)
+                        for kind, key, value in parser.feed(delta):
+                            on_event(kind, key, value)
+        except ValueError:
+            raise
+        except Exception as e:
+            print(f"LiteLLM error with model '{self.model}': {str(e)}")
+            raise LLMCallError(f"Failed to generate recipe with model '{self.model}': {str(e)}") from e
+        
+        # The parser already knows where the object starts and ends; fall back to
+        # scanning the whole text if the stream ended before the object closed
+        json_text = parser.json_text()
+        if json_text is not None:
+            try:
+                return self._parse_response_text(json_text)
+            except ValueError:
+                pass
+        return self._parse_response_text(parser.text())
+    
+    def _replay_events(self, recipe_data: Dict[str, Any], on_event: Callable[[str, str, Any], None]) -> None:
+        """Report a complete recipe through on_event in the same order streaming would"""
+        for key, value in recipe_data.items():
+            if key in STREAMED_LISTS and isinstance(value, list):
+                for item in value:
+                    on_event(ITEM_EVENT, key, item)
+            on_event(FIELD_EVENT, key, value)
+    
+    def _extract_recipe_json(self, response_text: str) -> Any:
+        """Find and decode the JSON part of a response"""
+        return extract_json(response_text)
+    
+    def _parse_response_text(self, response_text: str) -> Dict[str, Any]:
+        """Extract, parse and validate the recipe JSON in a response"""
+        try:
+            with metrics.span("parse"):
+                recipe_data = self._extract_recipe_json(response_text)
             
             # Validate the recipe data
-            self._validate_recipe_data(recipe_data)
+            with metrics.span("validate"):
+                self._validate_recipe_data(recipe_data)
             
             return recipe_data
         except (json.JSONDecodeError, ValueError) as e:
@@ -85,92 +995,16 @@ class RecipeGenerator:
     
     def _build_prompt(self, cuisine: str, centerpiece: str, calories: int, 
                      servings: int, prep_time: int, additional_info: str) -> str:
-        """Build the prompt for the LLM"""
-        prompt = """
-You are an expert recipe developer. Generate a high-quality recipe in JSON format based on the following parameters:
-
--   Cuisine: **{cuisine}**
--   Main Ingredient: **{centerpiece}**
--   Maximum Calories per Serving (approx): **{calories}**
--   Number of Servings: **{servings}**
--   Maximum Prep Time: **{prep_time}** minutes
--   Additional Information: **{additional_info}**
-
-The recipe should include:
-
-1.  A title that reflects the cuisine and main ingredient.
-2.  A short description of the dish.
-3.  A list of ingredients with precise measurements.
-4.  Step-by-step cooking instructions that are clear and concise.
-5.  Nutritional information, including approximate calories per serving, protein, fats, and carbohydrates.
-
-Ensure the output is **formatted as valid JSON**. Follow this exact structure:
-
-```
-{{
-  "title": "Example Dish Name",
-  "description": "A brief, enticing description of the dish.",
-  "cuisine": "{cuisine}",
-  "servings": {servings},
-  "calories_per_serving": {calories},
-  "prep_time_minutes": 20,
-  "cook_time_minutes": 30,
-  "ingredients": [
-    {{"name": "Ingredient 1", "amount": "1 cup"}},
-    {{"name": "Ingredient 2", "amount": "2 tbsp"}}
-  ],
-  "instructions": [
-    "Step 1: Detailed cooking instruction.",
-    "Step 2: Next step in preparation."
-  ],
-  "nutrition": {{
-    "calories": {calories},
-    "protein_g": 0,
-    "fat_g": 0,
-    "carbohydrates_g": 0
-  }}
-}}
-```
-
-Generate **a realistic and delicious recipe** while maintaining the requested calorie target.
-"""
-        # Format the prompt with the user's inputs
-        return prompt.format(
-            cuisine=cuisine,
-            centerpiece=centerpiece,
-            calories=calories,
-            servings=servings,
-            prep_time=prep_time,
-            additional_info=additional_info
-        )
+        """Build the prompt for the LLM from the compiled template (see recipe_prompts.py)"""
+        return self._render_prompt(**prompt_values(cuisine, centerpiece, calories, servings, prep_time, additional_info))
     
     def _validate_recipe_data(self, recipe_data: Dict[str, Any]) -> None:
-        """Validate that the recipe data has all required fields"""
-        required_fields = [
-            "title", "description", "cuisine", "servings", "calories_per_serving",
-            "ingredients", "instructions", "nutrition", "prep_time_minutes", "cook_time_minutes"
-        ]
-        
-        for field in required_fields:
-            if field not in recipe_data:
-                raise ValueError(f"Missing required field: {field}")
-        
-        # Validate ingredients
-        if not isinstance(recipe_data["ingredients"], list):
-            raise ValueError("Ingredients must be a list")
-        
-        for ingredient in recipe_data["ingredients"]:
-            if not isinstance(ingredient, dict) or "name" not in ingredient or "amount" not in ingredient:
-                raise ValueError("Each ingredient must have 'name' and 'amount'")
-        
-        # Validate instructions
-        if not isinstance(recipe_data["instructions"], list):
-            raise ValueError("Instructions must be a list")
-        
-        # Validate nutrition
-        nutrition = recipe_data["nutrition"]
-        required_nutrition = ["calories", "protein_g", "fat_g", "carbohydrates_g"]
-        
-        for field in required_nutrition:
-            if field not in nutrition:
-                raise ValueError(f"Missing nutrition field: {field}")
+        """Validate the recipe against recipe_schema.RECIPE_SCHEMA, reporting every problem at once
+        
+        Numbers written as text ("servings": "4") are converted first, as the
+        loose checks before the schema accepted them.
+        """
+        coerce_types(recipe_data)
+        problems = validate(recipe_data)
+        if problems:
+            raise ValueError("; ".join(problems))
@@ -0,0 +1,396 @@
+"""Persistent history of generated recipes, searchable by text and by facets
+
+Recipes live in a SQLite database. Title, description, ingredients and
+instructions are indexed with FTS5 for full-text search; cuisine, calories,
+prep time and servings have ordinary indexes so filters stay fast on tens of
+thousands of recipes.
+
+    history = RecipeHistory("recipe_history.db")
+    history.add(recipe_data, spec)
+    for row in history.search("lemon chicken", max_calories=600):
+        print(row["title"])
+"""
+import datetime
+import glob
+import hashlib
+import json
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS recipes (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    title TEXT NOT NULL,
+    cuisine TEXT COLLATE NOCASE,
+    centerpiece TEXT,
+    additional_info TEXT,
+    calories INTEGER,
+    requested_calories INTEGER,
+    prep_time_minutes INTEGER,
+    servings INTEGER,
+    model TEXT,
+    fingerprint TEXT NOT NULL UNIQUE,
+    recipe_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS recipes_created ON recipes (created);
+CREATE INDEX IF NOT EXISTS recipes_cuisine ON recipes (cuisine);
+CREATE INDEX IF NOT EXISTS recipes_calories ON recipes (calories);
+CREATE INDEX IF NOT EXISTS recipes_prep_time ON recipes (prep_time_minutes);
+CREATE INDEX IF NOT EXISTS recipes_servings ON recipes (servings);
+CREATE VIRTUAL TABLE IF NOT EXISTS recipes_fts USING fts5 (
+    title, description, ingredients, instructions, tokenize = 'porter unicode61'
+);
+"""
+
+# Columns returned by search(); the full recipe comes from get()
+SUMMARY_COLUMNS = ("id", "created", "title", "cuisine", "calories", "prep_time_minutes", "servings")
+
+def _as_int(value: Any) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def match_query(text: str) -> str:
+    """Turn free text into an FTS5 query that matches every word as a prefix"""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text.lower()))
+
+# Words that say nothing about the dish; negations such as "no" and "without" are kept
+STOPWORDS = frozenset("a an and any for in is it of on or please the to with".split())
+
+def request_terms(*texts: Optional[str]) -> List[str]:
+    """Normalize request text into terms: lowercase words, stopwords dropped, crude singular forms"""
+    terms = []
+    for text in texts:
+        for word in re.findall(r"[a-z0-9]+", (text or "").lower()):
+            if word in STOPWORDS:
+                continue
+            if len(word) > 4 and word.endswith("oes"):
+                word = word[:-2]
+            elif len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+                word = word[:-1]
+            terms.append(word)
+    return terms
+
+def fingerprint(recipe_data: Dict[str, Any]) -> str:
+    """Return a stable hash of a recipe, used to skip duplicates"""
+    return hashlib.sha256(json.dumps(recipe_data, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class SimilarRecipe(NamedTuple):
+    """A stored recipe close enough to a new request to be offered instead"""
+    recipe_id: int
+    recipe: Dict[str, Any]
+    similarity: float  # TF-IDF cosine similarity of centerpiece + additional_info, 0-1
+    created: float
+
+
+class RecipeHistory:
+    """SQLite-backed store of every recipe generated
+
+    Args:
+        path: Database file, created on first use
+    """
+
+    def __init__(self, path: str = "recipe_history.db"):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # One connection shared by the GUI, worker threads and the batch loop
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        # Document frequencies of request terms, built on the first find_similar()
+        self._term_counts: Optional[Counter] = None
+        self._term_documents = 0
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self) -> None:
+        # Databases created before requested_calories was added; their rows keep it NULL
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(recipes)")}
+        if "requested_calories" not in columns:
+            self._conn.execute("ALTER TABLE recipes ADD COLUMN requested_calories INTEGER")
+            self._conn.commit()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RecipeHistory":
+        """Create a history from the "history" section of config.json"""
+        return cls(config.get('path', "recipe_history.db"))
+
+    def add(self, recipe_data: Dict[str, Any], spec: Optional[Dict[str, Any]] = None,
+            model: Optional[str] = None, created: Optional[float] = None) -> Optional[int]:
+        """Store a recipe and return its id, or None if the same recipe is already stored
+
+        Args:
+            recipe_data: The validated recipe
+            spec: The request it was generated for (cuisine, centerpiece, additional_info, ...)
+            model: The model that generated it
+            created: Unix time it was generated (default now)
+        """
+        with self._lock, self._conn:
+            return self._insert(recipe_data, spec or {}, model, created or time.time())
+
+    def add_many(self, entries: Iterable[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[float]]]) -> int:
+        """Store (recipe, spec, created) entries in one transaction; returns how many were new"""
+        added = 0
+        with self._lock, self._conn:
+            for recipe_data, spec, created in entries:
+                if self._insert(recipe_data, spec or {}, None, created or time.time()) is not None:
+                    added += 1
+        return added
+
+    def _insert(self, recipe_data: Dict[str, Any], spec: Dict[str, Any], model: Optional[str],
+                created: float) -> Optional[int]:
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO recipes (created, title, cuisine, centerpiece, additional_info, calories,"
+            " requested_calories, prep_time_minutes, servings, model, fingerprint, recipe_json)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                created,
+                str(recipe_data.get("title", "")),
+                # The cuisine picked in the form, since models often shorten it
+                " ".join(str(spec.get("cuisine") or recipe_data.get("cuisine") or "").split()) or None,
+                spec.get("centerpiece"),
+                spec.get("additional_info"),
+                _as_int(recipe_data.get("calories_per_serving", spec.get("calories"))),
+                # What was asked for; calories above may be the nutrition check's estimate
+                _as_int(spec.get("calories")),
+                _as_int(recipe_data.get("prep_time_minutes")),
+                _as_int(recipe_data.get("servings", spec.get("servings"))),
+                model,
+                fingerprint(recipe_data),
+                json.dumps(recipe_data, ensure_ascii=False)
+            )
+        )
+        if cursor.rowcount != 1:
+            return None
+        if self._term_counts is not None and spec.get("centerpiece"):
+            self._term_counts.update(set(request_terms(spec.get("centerpiece"), spec.get("additional_info"))))
+            self._term_documents += 1
+        ingredients = " ".join(
+            f"{item.get('amount', '')} {item.get('name', '')}" if isinstance(item, dict) else str(item)
+            for item in recipe_data.get("ingredients", [])
+        )
+        self._conn.execute(
+            "INSERT INTO recipes_fts (rowid, title, description, ingredients, instructions) VALUES (?, ?, ?, ?, ?)",
+            (
+                cursor.lastrowid,
+                str(recipe_data.get("title", "")),
+                str(recipe_data.get("description", "")),
+                ingredients,
+                " ".join(str(step) for step in recipe_data.get("instructions", []))
+            )
+        )
+        return cursor.lastrowid
+
+    def search(self, text: str = "", cuisine: Optional[str] = None,
+               min_calories: Optional[int] = None, max_calories: Optional[int] = None,
+               max_prep_time: Optional[int] = None, servings: Optional[int] = None,
+               limit: int = 50) -> List[Dict[str, Any]]:
+        """Find recipes, best text match first (newest first without text)
+
+        Args:
+            text: Words that must all appear (as prefixes) in the title, description,
+                ingredients or instructions
+            cuisine: Cuisine, or the start of one ("Thai" also matches "Thai (Northern)")
+            min_calories, max_calories: Range for calories per serving
+            max_prep_time: Longest prep time in minutes
+            servings: Exact number of servings
+            limit: Most rows to return
+        """
+        columns = ", ".join(f"r.{column}" for column in SUMMARY_COLUMNS)
+        sql = f"SELECT {columns} FROM recipes r"
+        where = []
+        params: List[Any] = []
+        query = match_query(text)
+        if query:
+            sql += " JOIN recipes_fts ON recipes_fts.rowid = r.id"
+            where.append("recipes_fts MATCH ?")
+            params.append(query)
+        if cuisine:
+            where.append("r.cuisine LIKE ? ESCAPE '\\'")
+            params.append(re.sub(r"([%_\\])", r"\\\1", cuisine.strip()) + "%")
+        if min_calories is not None:
+            where.append("r.calories >= ?")
+            params.append(min_calories)
+        if max_calories is not None:
+            where.append("r.calories <= ?")
+            params.append(max_calories)
+        if max_prep_time is not None:
+            where.append("r.prep_time_minutes <= ?")
+            params.append(max_prep_time)
+        if servings is not None:
+            where.append("r.servings = ?")
+            params.append(servings)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY recipes_fts.rank" if query else " ORDER BY r.created DESC"
+        sql += " LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def find_similar(self, cuisine: str, centerpiece: str, calories: int, servings: int, prep_time: int,
+                     additional_info: str = "", calorie_tolerance: float = 0.1, servings_tolerance: int = 0,
+                     prep_time_tolerance: int = 0, min_similarity: float = 0.5,
+                     max_candidates: int = 500) -> Optional[SimilarRecipe]:
+        """Return the stored recipe that best matches a request, or None
+
+        A candidate must have the same cuisine, have been requested with calories
+        per serving within calorie_tolerance (a fraction) of this request (its
+        stored calories when the request is unknown), servings within
+        servings_tolerance and a prep time no longer than prep_time plus
+        prep_time_tolerance minutes. Among those, the centerpiece and additional
+        information are compared with TF-IDF cosine similarity, so "chicken" and
+        "chicken breast" are close while "chicken" and "chicken, no peanuts" are not.
+        """
+        query_terms = request_terms(centerpiece, additional_info)
+        if not query_terms:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created, centerpiece, additional_info FROM recipes"
+                " WHERE cuisine = ? AND COALESCE(requested_calories, calories) BETWEEN ? AND ?"
+                " AND servings BETWEEN ? AND ?"
+                " AND prep_time_minutes <= ? AND centerpiece IS NOT NULL"
+                " ORDER BY created DESC LIMIT ?",
+                (
+                    " ".join(cuisine.split()),
+                    calories * (1 - calorie_tolerance), calories * (1 + calorie_tolerance),
+                    servings - servings_tolerance, servings + servings_tolerance,
+                    prep_time + prep_time_tolerance,
+                    max_candidates
+                )
+            ).fetchall()
+            if not rows:
+                return None
+            if self._term_counts is None:
+                self._load_term_counts()
+            term_counts, documents = self._term_counts, self._term_documents
+
+        def vector(terms: List[str]) -> Dict[str, float]:
+            weights = {}
+            for term, count in Counter(terms).items():
+                idf = math.log((documents + 1) / (term_counts.get(term, 0) + 1)) + 1
+                weights[term] = count * idf
+            return weights
+
+        def norm(weights: Dict[str, float]) -> float:
+            return math.sqrt(sum(weight * weight for weight in weights.values()))
+
+        query = vector(query_terms)
+        query_norm = norm(query)
+        best_row, best_score = None, 0.0
+        for row in rows:
+            candidate = vector(request_terms(row["centerpiece"], row["additional_info"]))
+            if not candidate:
+                continue
+            dot = sum(weight * candidate.get(term, 0.0) for term, weight in query.items())
+            score = dot / (query_norm * norm(candidate))
+            if score > best_score:
+                best_row, best_score = row, score
+        if best_row is None or best_score < min_similarity:
+            return None
+        recipe_data = self.get(best_row["id"])
+        if recipe_data is None:
+            return None
+        return SimilarRecipe(best_row["id"], recipe_data, min(1.0, best_score), best_row["created"])
+
+    def _load_term_counts(self) -> None:
+        term_counts: Counter = Counter()
+        documents = 0
+        for row in self._conn.execute("SELECT centerpiece, additional_info FROM recipes WHERE centerpiece IS NOT NULL"):
+            term_counts.update(set(request_terms(row["centerpiece"], row["additional_info"])))
+            documents += 1
+        self._term_counts, self._term_documents = term_counts, documents
+
+    def get(self, recipe_id: int) -> Optional[Dict[str, Any]]:
+        """Return the full recipe with this id, or None"""
+        with self._lock:
+            row = self._conn.execute("SELECT recipe_json FROM recipes WHERE id = ?", (recipe_id,)).fetchone()
+        return json.loads(row["recipe_json"]) if row else None
+
+    def iter_recipes(self, batch_size: int = 200, with_ids: bool = False) -> Iterator[Any]:
+        """Yield every recipe, oldest first, reading batch_size rows at a time (as (id, recipe) with_ids)"""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute("SELECT id, recipe_json FROM recipes WHERE id > ? ORDER BY id LIMIT ?",
+                                          (last_id, batch_size)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                recipe_data = json.loads(row["recipe_json"])
+                yield (row["id"], recipe_data) if with_ids else recipe_data
+            last_id = rows[-1]["id"]
+
+    def delete(self, recipe_id: int) -> None:
+        """Remove a recipe from the history"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+            self._conn.execute("DELETE FROM recipes_fts WHERE rowid = ?", (recipe_id,))
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM recipes").fetchone()[0]
+
+    def import_debug_logs(self, directory: str = "debug_logs") -> Tuple[int, int]:
+        """Import recipes saved in a debug_logs directory; returns (imported, skipped)
+
+        Reads both the old per-recipe recipe_data_*.json files and the
+        recipegenie.jsonl log (including rotated copies). Recipes already in
+        the history are skipped.
+        """
+        entries = []
+        skipped = 0
+        for path in sorted(glob.glob(os.path.join(directory, "recipe_data_*.json"))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    recipe_data = json.load(f)
+            except (OSError, ValueError):
+                skipped += 1
+                continue
+            match = re.search(r"recipe_data_(\d{8}_\d{6})", os.path.basename(path))
+            created = (datetime.datetime.strptime(match.group(1), "%Y%m%d_%H%M%S").timestamp()
+                       if match else os.path.getmtime(path))
+            entries.append((recipe_data, None, created))
+
+        for path in sorted(glob.glob(os.path.join(directory, "*.jsonl*"))):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            skipped += 1
+                            continue
+                        if not isinstance(record, dict) or record.get("type") != "recipe":
+                            continue
+                        try:
+                            created = datetime.datetime.fromisoformat(record["time"]).timestamp()
+                        except (KeyError, TypeError, ValueError):
+                            created = None
+                        entries.append((record.get("data"), None, created))
+            except OSError:
+                skipped += 1
+
+        valid = [entry for entry in entries
+                 if isinstance(entry[0], dict) and entry[0].get("title") and entry[0].get("ingredients")]
+        skipped += len(entries) - len(valid)
+        imported = self.add_many(valid)
+        return imported, skipped + len(valid) - imported
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -1,28 +1,180 @@
-import tempfile
+import glob
+import itertools
 import os
+import queue
+import shlex
+import shutil
 import subprocess
-from typing import Dict, Any
-
-def print_recipe(recipe_data: Dict[str, Any], formatted_text: str) -> None:
-    """Print the recipe to the default printer"""
-    # Create a temporary file
-    with tempfile.NamedTemporaryFile(delete=False, suffix='.txt', mode='w') as temp_file:
-        temp_file.write(f"{recipe_data['title']}\n\n")
-        temp_file.write(f"{recipe_data['description']}\n\n")
-        temp_file.write(formatted_text)
-        temp_file_path = temp_file.name
-    
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from recipe_render import get_renderer, render
+
+# Print job states, as reported by PrintQueue.poll()
+PRINT_QUEUED = "queued"
+PRINT_PRINTING = "printing"
+PRINT_DONE = "done"
+PRINT_FAILED = "failed"
+
+# On Windows the shell "print" verb opens its file after os.startfile() returns,
+# so the file is removed this many seconds later
+WINDOWS_PRINT_FILE_SECONDS = 120
+_WINDOWS_PRINT_PREFIX = "recipegenie-print-"
+
+
+class PrintJob:
+    """One or more recipes printed together as a single job"""
+
+    def __init__(self, job_id: int, recipes: List[Dict[str, Any]], title: str):
+        self.job_id = job_id
+        self.recipes = recipes
+        self.title = title
+        self.status = PRINT_QUEUED
+        self.error: Optional[str] = None
+
+
+class PrintQueue:
+    """Print recipes on a background thread by piping the printable layout to lpr's stdin
+
+    Each submit() becomes one print job, with a page break between recipes,
+    so a week's meal plan is a single job rather than one per recipe.
+    Nothing is written to disk. Jobs run one at a time in order; the owner
+    (normally the Tk main loop) calls poll() to collect status changes.
+
+    Args:
+        command: The print command and its options, as a list or a shell-style
+            string; the program is looked up on PATH when each job runs
+        timeout: Seconds to wait for the print command before failing the job
+    """
+
+    def __init__(self, command: Union[str, List[str], None] = None, timeout: float = 60):
+        if isinstance(command, str):
+            command = shlex.split(command)
+        self.command = list(command or ["lpr"])
+        self.timeout = timeout
+        self._jobs: queue.Queue = queue.Queue()
+        self._events: queue.Queue = queue.Queue()
+        self._ids = itertools.count(1)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PrintQueue":
+        """Create a print queue from the "printing" section of config.json"""
+        return cls(command=config.get('command'), timeout=config.get('timeout', 60))
+
+    def submit(self, recipes: List[Dict[str, Any]], title: Optional[str] = None) -> PrintJob:
+        """Queue recipes to be printed together and return the job"""
+        if not recipes:
+            raise ValueError("Nothing to print")
+        job = PrintJob(next(self._ids), list(recipes), title or recipes[0]["title"])
+        with self._lock:
+            self._pending += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name="recipe-printer", daemon=True)
+                self._thread.start()
+        self._events.put((job, PRINT_QUEUED))
+        self._jobs.put(job)
+        return job
+
+    def pending(self) -> int:
+        """Number of jobs queued or printing"""
+        return self._pending
+
+    def poll(self) -> List[Tuple[PrintJob, str]]:
+        """Drain the (job, status) changes since the last call, in order, without blocking"""
+        changed = []
+        while True:
+            try:
+                changed.append(self._events.get_nowait())
+            except queue.Empty:
+                return changed
+
+    def shutdown(self, timeout: Optional[float] = None) -> None:
+        """Stop the worker after the jobs already queued, waiting up to timeout seconds for them"""
+        self._jobs.put(None)
+        if self._thread is not None and timeout:
+            self._thread.join(timeout)
+
+    def _worker(self) -> None:
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            job.status = PRINT_PRINTING
+            self._events.put((job, PRINT_PRINTING))
+            try:
+                self._print(job)
+                job.status = PRINT_DONE
+            except Exception as e:
+                job.status = PRINT_FAILED
+                job.error = str(e)
+                print(f"Error printing: {job.error}")
+            with self._lock:
+                self._pending -= 1
+            self._events.put((job, job.status))
+
+    def _print(self, job: PrintJob) -> None:
+        text = get_renderer("print").separator.join(render(recipe_data, "print") for recipe_data in job.recipes)
+        executable = shutil.which(self.command[0])
+        if executable is None:
+            if os.name == 'nt':
+                self._print_windows(text)
+                return
+            raise RuntimeError(f"Print command not found: {self.command[0]}")
+
+        args = [executable] + self.command[1:]
+        if os.path.basename(self.command[0]) == "lpr":
+            args += ["-T", job.title]
+        result = subprocess.run(args, input=text.encode('utf-8'), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                timeout=self.timeout)
+        if result.returncode != 0:
+            message = result.stderr.decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"{self.command[0]} exited with status {result.returncode}: {message}")
+
+    @staticmethod
+    def _print_windows(text: str) -> None:
+        # Windows has no lpr; the shell "print" verb needs a file, which must outlive the call.
+        # Files an earlier run did not get to remove are cleaned up first.
+        _remove_print_files(older_than=WINDOWS_PRINT_FILE_SECONDS)
+        with tempfile.NamedTemporaryFile(delete=False, prefix=_WINDOWS_PRINT_PREFIX, suffix='.txt', mode='w',
+                                         encoding='utf-8') as temp_file:
+            temp_file.write(text)
+        try:
+            os.startfile(temp_file.name, 'print')
+        except OSError:
+            _remove_file(temp_file.name)
+            raise
+        timer = threading.Timer(WINDOWS_PRINT_FILE_SECONDS, _remove_file, (temp_file.name,))
+        timer.daemon = True
+        timer.start()
+
+
+def _remove_file(path: str) -> None:
     try:
-        # Print the file using the system's default print command
-        if os.name == 'nt':  # Windows
-            os.startfile(temp_file_path, 'print')
-        else:  # Linux/Mac
-            subprocess.run(['lpr', temp_file_path])
-    except Exception as e:
-        print(f"Error printing: {e}")
-    finally:
-        # Clean up the temporary file
+        os.remove(path)
+    except OSError:
+        pass
+
+def _remove_print_files(older_than: float) -> None:
+    """Remove temporary print files last modified more than older_than seconds ago"""
+    cutoff = time.time() - older_than
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), _WINDOWS_PRINT_PREFIX + "*.txt")):
         try:
-            os.unlink(temp_file_path)
-        except:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
             pass
+
+
+_default_queue: Optional[PrintQueue] = None
+
+def print_recipe(recipe_data: Dict[str, Any]) -> PrintJob:
+    """Print one recipe in the background on a shared default queue"""
+    global _default_queue
+    if _default_queue is None:
+        _default_queue = PrintQueue()
+    return _default_queue.submit([recipe_data])
@@ -0,0 +1,145 @@
+"""Prompt templates for RecipeGenerator
+
+Two variants are available (config "prompt_variant"):
+
+    full     The original Markdown brief with an example recipe, about 370 tokens
+    compact  The same parameters and field list in about a third of the tokens;
+             the JSON shape is enforced by the schema (see recipe_schema.py)
+
+Templates are compiled once per generator with compile_prompt(), so building a
+prompt is a single join instead of re-parsing the template on every request.
+"""
+import string
+from typing import Any, Callable, Dict
+
+from recipe_schema import RECIPE_FIELDS
+
+FULL_PROMPT = """
+You are an expert recipe developer. Generate a high-quality recipe in JSON format based on the following parameters:
+
+-   Cuisine: **{cuisine}**
+-   Main Ingredient: **{centerpiece}**
+-   Maximum Calories per Serving (approx): **{calories}**
+-   Number of Servings: **{servings}**
+-   Maximum Prep Time: **{prep_time}** minutes
+-   Additional Information: **{additional_info}**
+
+The recipe should include:
+
+1.  A title that reflects the cuisine and main ingredient.
+2.  A short description of the dish.
+3.  A list of ingredients with precise measurements.
+4.  Step-by-step cooking instructions that are clear and concise.
+5.  Nutritional information, including approximate calories per serving, protein, fats, and carbohydrates.
+
+Ensure the output is **formatted as valid JSON**. Follow this exact structure:
+
+```
+{{
+  "title": "Example Dish Name",
+  "description": "A brief, enticing description of the dish.",
+  "cuisine": "{cuisine}",
+  "servings": {servings},
+  "calories_per_serving": {calories},
+  "prep_time_minutes": 20,
+  "cook_time_minutes": 30,
+  "ingredients": [
+    {{"name": "Ingredient 1", "amount": "1 cup"}},
+    {{"name": "Ingredient 2", "amount": "2 tbsp"}}
+  ],
+  "instructions": [
+    "Step 1: Detailed cooking instruction.",
+    "Step 2: Next step in preparation."
+  ],
+  "nutrition": {{
+    "calories": {calories},
+    "protein_g": 0,
+    "fat_g": 0,
+    "carbohydrates_g": 0
+  }}
+}}
+```
+
+Generate **a realistic and delicious recipe** while maintaining the requested calorie target.
+"""
+
+
+def _describe_fields() -> str:
+    """List the recipe keys, with the shape of nested ones, for the compact prompt"""
+    parts = []
+    for name, schema in RECIPE_FIELDS.items():
+        if schema["type"] == "array" and schema["items"]["type"] == "object":
+            parts.append(f"{name} [{{{', '.join(schema['items']['properties'])}}}]")
+        elif schema["type"] == "array":
+            parts.append(f"{name} [{schema['items']['type']}]")
+        elif schema["type"] == "object":
+            parts.append(f"{name} {{{', '.join(schema['properties'])}}}")
+        else:
+            parts.append(name)
+    return ", ".join(parts)
+
+# Doubled braces survive str.format-style compilation as literal braces
+COMPACT_PROMPT = (
+    "Create a realistic, delicious recipe. Reply with only a JSON object.\n"
+    "Cuisine: {cuisine}\n"
+    "Main ingredient: {centerpiece}\n"
+    "Calories per serving: {calories} (approx. maximum)\n"
+    "Number of servings: {servings}\n"
+    "Maximum prep time: {prep_time} minutes\n"
+    "{additional_info_line}"
+    "Keys: " + _describe_fields().replace("{", "{{").replace("}", "}}") + ". "
+    "Give precise ingredient amounts, clear concise steps, and nutrition per serving.\n"
+)
+
+# Appended to either prompt to ask for several recipes in one response
+VARIANTS_INSTRUCTION = (
+    "\nInstead of a single recipe, create {count} clearly different recipes for these parameters: different "
+    "dishes, not the same dish reworded. Reply with only a JSON object of the form "
+    '{{"recipes": [recipe, ...]}}, each recipe having all of the keys described above.\n'
+)
+
+PROMPT_VARIANTS = {
+    "full": FULL_PROMPT,
+    "compact": COMPACT_PROMPT
+}
+
+def compile_prompt(template: str) -> Callable[..., str]:
+    """Parse a str.format template once and return a function that fills it in"""
+    pieces = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+    def render(**values: Any) -> str:
+        return "".join(literal + (str(values[field]) if field is not None else "") for literal, field in pieces)
+    return render
+
+def prompt_values(cuisine: str, centerpiece: str, calories: int, servings: int, prep_time: int,
+                  additional_info: str) -> Dict[str, Any]:
+    """Return the values every template can use"""
+    return {
+        "cuisine": cuisine,
+        "centerpiece": centerpiece,
+        "calories": calories,
+        "servings": servings,
+        "prep_time": prep_time,
+        "additional_info": additional_info,
+        "additional_info_line": f"Additional requirements: {additional_info}\n" if additional_info else ""
+    }
+
+# Typical pieces of a response, tokenized to estimate how long a recipe will be
+SAMPLE_SKELETON = (
+    '{"title": "Lemongrass Chicken with Coconut Rice", "description": "Tender chicken thighs marinated in '
+    'lemongrass and garlic, seared and served over fragrant coconut rice.", "cuisine": "Thai", "servings": 4, '
+    '"calories_per_serving": 500, "prep_time_minutes": 20, "cook_time_minutes": 25, "ingredients": [], '
+    '"instructions": [], "nutrition": {"calories": 500, "protein_g": 35, "fat_g": 18, "carbohydrates_g": 45}}'
+)
+SAMPLE_INGREDIENT = '{"name": "boneless, skinless chicken thighs, sliced", "amount": "1 1/2 lb (680 g)"}, '
+SAMPLE_STEP = (
+    '"Heat the oil in a large skillet over medium-high heat, add the chicken in a single layer and sear '
+    'for 3-4 minutes per side until golden and cooked through.", '
+)
+
+def expected_counts(servings: int, prep_time: int) -> Dict[str, int]:
+    """Estimate how many ingredients and steps a recipe for these parameters will have"""
+    return {
+        "ingredients": min(25, 8 + servings // 2),
+        "instructions": min(16, 5 + prep_time // 10)
+    }
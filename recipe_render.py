@@ -0,0 +1,328 @@
+"""Turn recipes into text, Markdown, HTML, JSON or a printable layout, and export them in bulk
+
+Each format is a Renderer registered under a name; add one with
+register_renderer(). render() caches the output of the last few recipes, so
+showing, copying, exporting and printing the same recipe builds its text once.
+Recipes are treated as immutable once rendered: change a copy instead.
+RecipeExporter writes any number of recipes, one at a time, to a single
+document or to a zip archive with one file per recipe.
+"""
+import html
+import json
+import re
+import textwrap
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, TextIO, Union
+
+RULE = "=" * 50
+
+def format_recipe_text(recipe_data: Dict[str, Any]) -> str:
+    """Format the recipe data as readable text"""
+    prep = recipe_data['prep_time_minutes']
+    cook = recipe_data['cook_time_minutes']
+    parts = ["TIME REQUIRED:\n", RULE, "\n",
+             f"Preparation: {prep} minutes\n", f"Cooking: {cook} minutes\n", f"Total: {prep + cook} minutes\n\n",
+             "INGREDIENTS:\n", RULE, "\n"]
+    parts.extend(f"• {ingredient['amount']} {ingredient['name']}\n" for ingredient in recipe_data["ingredients"])
+
+    parts += ["\n\nINSTRUCTIONS:\n", RULE, "\n"]
+    parts.extend(f"{i}. {step}\n\n" for i, step in enumerate(recipe_data["instructions"], 1))
+
+    nutrition = recipe_data["nutrition"]
+    parts += ["NUTRITION INFORMATION:\n", RULE, "\n",
+              f"Calories: {nutrition['calories']} per serving\n",
+              f"Protein: {nutrition['protein_g']}g\n",
+              f"Fat: {nutrition['fat_g']}g\n",
+              f"Carbohydrates: {nutrition['carbohydrates_g']}g\n"]
+    note = format_nutrition_note(recipe_data)
+    if note:
+        parts.append(f"\n{note}\n")
+
+    return "".join(parts)
+
+def format_nutrition_note(recipe_data: Dict[str, Any]) -> str:
+    """Describe the local nutrition check (see nutrition.check_recipe), or return "" if there was none"""
+    check = recipe_data.get("nutrition_check") or {}
+    status = check.get("status")
+    if status == "ok":
+        return "Nutrition estimated from the ingredient list."
+    if status == "scaled":
+        return (f"Ingredient amounts were scaled by {check['scale']:g} to meet the target of "
+                f"{check['target']} calories per serving (was {check['unscaled_calories']}).")
+    if status in ("over", "under"):
+        calories = recipe_data["nutrition"]["calories"]
+        difference = abs(calories - check["target"]) / check["target"]
+        return (f"Warning: the ingredients add up to about {calories} calories per serving, "
+                f"{difference:.0%} {'above' if status == 'over' else 'below'} the target of {check['target']}.")
+    return ""
+
+def format_recipe_document(recipe_data: Dict[str, Any]) -> str:
+    """Format the whole recipe, including title and description, as readable text"""
+    return render(recipe_data, "text")
+
+def _details(recipe_data: Dict[str, Any]) -> str:
+    return (f"Cuisine: {recipe_data['cuisine']} | Servings: {recipe_data['servings']} | "
+            f"Prep: {recipe_data['prep_time_minutes']} min | Cook: {recipe_data['cook_time_minutes']} min")
+
+
+class Renderer:
+    """One output format
+
+    A combined document of several recipes is header(), then each recipe's
+    body joined by `separator`, then footer(); a single recipe is the same
+    with one body.
+    """
+    name = ""
+    extension = ".txt"
+    description = ""
+    separator = ""
+
+    def header(self, title: str) -> str:
+        return ""
+
+    def body(self, recipe_data: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def footer(self) -> str:
+        return ""
+
+    def render(self, recipe_data: Dict[str, Any]) -> str:
+        """Render one recipe as a complete document"""
+        return self.header(recipe_data["title"]) + self.body(recipe_data) + self.footer()
+
+
+class TextRenderer(Renderer):
+    name = "text"
+    extension = ".txt"
+    description = "Text files"
+    separator = "\n" + "-" * 50 + "\n\n"
+
+    def body(self, recipe_data: Dict[str, Any]) -> str:
+        return f"{recipe_data['title']}\n\n{recipe_data['description']}\n\n{format_recipe_text(recipe_data)}"
+
+
+class MarkdownRenderer(Renderer):
+    name = "markdown"
+    extension = ".md"
+    description = "Markdown files"
+    separator = "\n---\n\n"
+
+    def body(self, recipe_data: Dict[str, Any]) -> str:
+        nutrition = recipe_data["nutrition"]
+        parts = [f"# {recipe_data['title']}\n\n", f"{recipe_data['description']}\n\n",
+                 f"*{_details(recipe_data)}*\n\n", "## Ingredients\n\n"]
+        parts.extend(f"- {ingredient['amount']} {ingredient['name']}\n" for ingredient in recipe_data["ingredients"])
+        parts.append("\n## Instructions\n\n")
+        parts.extend(f"{i}. {step}\n" for i, step in enumerate(recipe_data["instructions"], 1))
+        parts += ["\n## Nutrition (per serving)\n\n",
+                  "| Calories | Protein | Fat | Carbohydrates |\n",
+                  "| ---: | ---: | ---: | ---: |\n",
+                  f"| {nutrition['calories']} | {nutrition['protein_g']}g | {nutrition['fat_g']}g "
+                  f"| {nutrition['carbohydrates_g']}g |\n"]
+        note = format_nutrition_note(recipe_data)
+        if note:
+            parts.append(f"\n> {note}\n")
+        return "".join(parts)
+
+
+class HtmlRenderer(Renderer):
+    name = "html"
+    extension = ".html"
+    description = "HTML files"
+
+    STYLE = ("body{font-family:Georgia,serif;max-width:46em;margin:2em auto;padding:0 1em;line-height:1.5}"
+             "article{margin-bottom:3em}.details{color:#555}.note{color:#a04000}"
+             "table{border-collapse:collapse}td,th{padding:.2em .8em;border:1px solid #ccc;text-align:right}"
+             "@media print{article{page-break-after:always}}")
+
+    def header(self, title: str) -> str:
+        return ("<!DOCTYPE html>\n<html lang=\"en\">\n<head>\n<meta charset=\"utf-8\">\n"
+                f"<title>{html.escape(title)}</title>\n<style>{self.STYLE}</style>\n</head>\n<body>\n")
+
+    def body(self, recipe_data: Dict[str, Any]) -> str:
+        escape = html.escape
+        nutrition = recipe_data["nutrition"]
+        parts = ["<article class=\"recipe\">\n",
+                 f"<h1>{escape(recipe_data['title'])}</h1>\n",
+                 f"<p>{escape(recipe_data['description'])}</p>\n",
+                 f"<p class=\"details\">{escape(_details(recipe_data))}</p>\n",
+                 "<h2>Ingredients</h2>\n<ul>\n"]
+        parts.extend(f"<li>{escape(str(ingredient['amount']))} {escape(str(ingredient['name']))}</li>\n"
+                     for ingredient in recipe_data["ingredients"])
+        parts.append("</ul>\n<h2>Instructions</h2>\n<ol>\n")
+        parts.extend(f"<li>{escape(str(step))}</li>\n" for step in recipe_data["instructions"])
+        parts += ["</ol>\n<h2>Nutrition (per serving)</h2>\n<table>\n",
+                  "<tr><th>Calories</th><th>Protein</th><th>Fat</th><th>Carbohydrates</th></tr>\n",
+                  f"<tr><td>{nutrition['calories']}</td><td>{nutrition['protein_g']}g</td>"
+                  f"<td>{nutrition['fat_g']}g</td><td>{nutrition['carbohydrates_g']}g</td></tr>\n</table>\n"]
+        note = format_nutrition_note(recipe_data)
+        if note:
+            parts.append(f"<p class=\"note\">{escape(note)}</p>\n")
+        parts.append("</article>\n")
+        return "".join(parts)
+
+    def footer(self) -> str:
+        return "</body>\n</html>\n"
+
+
+class JsonRenderer(Renderer):
+    """One JSON object per line, so combined documents are JSON Lines"""
+    name = "json"
+    extension = ".json"
+    description = "JSON files"
+
+    def body(self, recipe_data: Dict[str, Any]) -> str:
+        return json.dumps(recipe_data, ensure_ascii=False) + "\n"
+
+
+class PrintRenderer(Renderer):
+    """Plain ASCII-friendly text wrapped for a printed page, with a form feed between recipes"""
+    name = "print"
+    extension = ".txt"
+    description = "Printable text"
+    separator = "\f"
+    width = 78
+
+    def body(self, recipe_data: Dict[str, Any]) -> str:
+        width = self.width
+        nutrition = recipe_data["nutrition"]
+        parts = [recipe_data["title"].upper().center(width).rstrip(), "\n", "=" * width, "\n\n",
+                 textwrap.fill(recipe_data["description"], width), "\n\n",
+                 textwrap.fill(_details(recipe_data), width), "\n\n", "INGREDIENTS\n", "-" * width, "\n"]
+        parts.extend(textwrap.fill(f"{ingredient['amount']} {ingredient['name']}", width,
+                                   initial_indent="  [ ] ", subsequent_indent="      ") + "\n"
+                     for ingredient in recipe_data["ingredients"])
+        parts += ["\nINSTRUCTIONS\n", "-" * width, "\n"]
+        parts.extend(textwrap.fill(str(step), width, initial_indent=f"{i:>3}. ", subsequent_indent="     ") + "\n\n"
+                     for i, step in enumerate(recipe_data["instructions"], 1))
+        parts += ["NUTRITION PER SERVING\n", "-" * width, "\n",
+                  f"Calories {nutrition['calories']}   Protein {nutrition['protein_g']}g   "
+                  f"Fat {nutrition['fat_g']}g   Carbohydrates {nutrition['carbohydrates_g']}g\n"]
+        note = format_nutrition_note(recipe_data)
+        if note:
+            parts += ["\n", textwrap.fill(note, width), "\n"]
+        return "".join(parts)
+
+
+RENDERERS: Dict[str, Renderer] = {}
+
+def register_renderer(renderer: Renderer) -> None:
+    """Make a renderer available to render(), RecipeExporter and the --format options"""
+    RENDERERS[renderer.name] = renderer
+
+for _renderer in (TextRenderer(), MarkdownRenderer(), HtmlRenderer(), JsonRenderer(), PrintRenderer()):
+    register_renderer(_renderer)
+
+def get_renderer(name: str) -> Renderer:
+    try:
+        return RENDERERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown format '{name}'; choose from: {', '.join(RENDERERS)}")
+
+def renderer_for_path(path: str, default: str = "text") -> Renderer:
+    """Pick the renderer whose extension matches a file name"""
+    lowered = path.lower()
+    for renderer in RENDERERS.values():
+        if lowered.endswith(renderer.extension):
+            return renderer
+    return get_renderer(default)
+
+# Rendered documents of recently shown recipes, keyed by (id(recipe), format). The
+# recipe itself is kept in the entry, so its id cannot be reused while cached.
+RENDER_CACHE_SIZE = 64
+_render_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_render_cache_lock = threading.Lock()
+
+def render(recipe_data: Dict[str, Any], fmt: str = "text") -> str:
+    """Render one recipe as a complete document in a registered format, reusing recent results"""
+    key = (id(recipe_data), fmt)
+    with _render_cache_lock:
+        entry = _render_cache.get(key)
+        if entry is not None and entry[0] is recipe_data:
+            _render_cache.move_to_end(key)
+            return entry[1]
+    text = get_renderer(fmt).render(recipe_data)
+    with _render_cache_lock:
+        _render_cache[key] = (recipe_data, text)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return text
+
+def file_name(recipe_data: Dict[str, Any], extension: str = ".txt") -> str:
+    """A safe file name for a recipe, from its title"""
+    return (re.sub(r"[^\w-]+", "_", recipe_data.get("title", "")).strip("_")[:80] or "recipe") + extension
+
+
+class RecipeExporter:
+    """Write recipes one at a time to a single document, or to a zip archive with one file per recipe
+
+    Each recipe is written (and flushed) as soon as it is passed in, so a
+    whole history or batch run can be exported without holding it in memory.
+
+    Args:
+        target: A file path (ending in .zip for an archive), or an open text stream such as sys.stdout
+        fmt: Name of a registered renderer
+        title: Title of the combined document, where the format has one
+    """
+
+    def __init__(self, target: Union[str, TextIO], fmt: str = "text", title: str = "Recipes"):
+        self.renderer = get_renderer(fmt)
+        self.count = 0
+        self._zip = None
+        self._stream = None
+        self._owns_stream = False
+        if isinstance(target, str) and target.lower().endswith(".zip"):
+            self._zip = zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED)
+            self._names: set = set()
+        else:
+            if isinstance(target, str):
+                self._stream = open(target, 'w', encoding='utf-8')
+                self._owns_stream = True
+            else:
+                self._stream = target
+            self._stream.write(self.renderer.header(title))
+
+    def write(self, recipe_data: Dict[str, Any]) -> None:
+        """Add one recipe to the export"""
+        if self._zip is not None:
+            name = file_name(recipe_data, self.renderer.extension)
+            if name in self._names:
+                name = f"{self.count + 1:04d}-{name}"
+            self._names.add(name)
+            self._zip.writestr(name, self.renderer.render(recipe_data))
+        else:
+            if self.count:
+                self._stream.write(self.renderer.separator)
+            self._stream.write(self.renderer.body(recipe_data))
+            self._stream.flush()
+        self.count += 1
+
+    def write_all(self, recipes: Iterable[Dict[str, Any]]) -> int:
+        """Add every recipe from an iterable (such as a generator); returns how many were written"""
+        for recipe_data in recipes:
+            self.write(recipe_data)
+        return self.count
+
+    def close(self) -> None:
+        if self._zip is not None:
+            self._zip.close()
+        else:
+            self._stream.write(self.renderer.footer())
+            if self._owns_stream:
+                self._stream.close()
+            else:
+                self._stream.flush()
+
+    def __enter__(self) -> "RecipeExporter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def export_recipes(recipes: Iterable[Dict[str, Any]], target: Union[str, TextIO], fmt: str = "text",
+                   title: str = "Recipes") -> int:
+    """Export recipes to a file, zip archive or stream; returns how many were written"""
+    with RecipeExporter(target, fmt, title) as exporter:
+        return exporter.write_all(recipes)
@@ -0,0 +1,77 @@
+"""Rescale a recipe to another number of servings and convert its units, without asking the LLM
+
+Ingredient amounts are parsed by quantities.py, so "1 1/2 cups, packed" for
+4 servings becomes "3 cups, packed" for 8, or "710 ml, packed" in metric.
+Rescaling is cached per (amount, factor, units), which makes stepping through
+serving counts in the results window effectively free.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from nutrition import apply_estimate, estimate_nutrition
+from quantities import (METRIC, NATIVE_UNITS, US, Quantity, convert_quantity, format_quantity, scale_amount,
+                        split_amount)
+
+UNIT_SYSTEMS = (METRIC, US)
+
+
+@lru_cache(maxsize=4096)
+def rescale_amount(amount: str, factor: float, units: Optional[str] = None) -> str:
+    """Multiply an ingredient amount by a factor and optionally convert it to metric or US units
+
+    Amounts whose unit does not change keep their own wording, as do ranges
+    already in the target system, so "2-3 tbsp" doubled is "4-6 tbsp", and
+    packages, so "2 (14 oz) cans" in metric is "2 (395 g) cans".
+    Amounts without a number, like "to taste", are returned unchanged.
+
+    Args:
+        amount: The free-text amount, e.g. "200g" or "2 (14 oz) cans"
+        factor: What to multiply the amount by
+        units: METRIC or US, or None to keep the units as written
+    """
+    if units is None:
+        return amount if factor == 1 else scale_amount(amount, factor)
+    parsed = split_amount(amount)
+    if parsed is None:
+        return amount
+    if parsed.package is not None:
+        # Convert the size of each can or packet, not the total
+        return scale_amount(amount, factor, units)
+    quantity = parsed.quantity
+    converted = convert_quantity(Quantity(quantity.value * factor, quantity.unit), units)
+    if converted.unit == quantity.unit or parsed.is_range and quantity.unit.name in NATIVE_UNITS[units]:
+        return amount if factor == 1 else scale_amount(amount, factor)
+    return format_quantity(converted) + parsed.remainder
+
+def scale_recipe(recipe_data: Dict[str, Any], servings: Optional[int] = None,
+                 units: Optional[str] = None) -> Dict[str, Any]:
+    """Return a copy of the recipe for a different number of servings, optionally in metric or US units
+
+    The original recipe is left unchanged; the copy shares its other fields.
+    Nutrition is per serving, so it stays the same, except that it is
+    recomputed from the new amounts when it was computed locally in the
+    first place (see nutrition.check_recipe).
+
+    Args:
+        recipe_data: A validated recipe
+        servings: The number of servings wanted, or None to keep the recipe's own
+        units: METRIC or US to convert weights and volumes, or None to keep them as written
+    """
+    if units is not None and units not in UNIT_SYSTEMS:
+        raise ValueError(f"Unknown unit system: {units}")
+    current = recipe_data.get("servings") or 0
+    if servings is None:
+        servings = current
+    if current <= 0 or servings <= 0:
+        raise ValueError("Servings must be a positive number")
+
+    factor = servings / current
+    scaled = dict(recipe_data)
+    scaled["servings"] = servings
+    scaled["ingredients"] = [
+        dict(ingredient, amount=rescale_amount(str(ingredient.get("amount", "")), factor, units))
+        for ingredient in recipe_data.get("ingredients", [])
+    ]
+    if (recipe_data.get("nutrition_check") or {}).get("status", "unchecked") != "unchecked":
+        apply_estimate(scaled, estimate_nutrition(scaled))
+    return scaled
@@ -0,0 +1,222 @@
+"""The recipe JSON contract: a JSON Schema, a validator and a tolerant extractor
+
+The schema is what RecipeGenerator validates every response against and what
+it sends as ``response_format`` to providers that support structured output.
+"""
+import json
+import re
+from typing import Any, Dict, List
+
+from stream_parser import IncrementalRecipeParser
+
+# Top-level fields every recipe needs, with their JSON Schema types
+RECIPE_FIELDS = {
+    "title": {"type": "string"},
+    "description": {"type": "string"},
+    "cuisine": {"type": "string"},
+    "servings": {"type": "integer"},
+    "calories_per_serving": {"type": "number"},
+    "prep_time_minutes": {"type": "number"},
+    "cook_time_minutes": {"type": "number"},
+    "ingredients": {
+        "type": "array",
+        "items": {
+            "type": "object",
+            "properties": {"name": {"type": "string"}, "amount": {"type": "string"}},
+            "required": ["name", "amount"],
+            "additionalProperties": False
+        }
+    },
+    "instructions": {"type": "array", "items": {"type": "string"}},
+    "nutrition": {
+        "type": "object",
+        "properties": {
+            "calories": {"type": "number"},
+            "protein_g": {"type": "number"},
+            "fat_g": {"type": "number"},
+            "carbohydrates_g": {"type": "number"}
+        },
+        "required": ["calories", "protein_g", "fat_g", "carbohydrates_g"],
+        "additionalProperties": False
+    }
+}
+
+RECIPE_SCHEMA = {
+    "type": "object",
+    "properties": RECIPE_FIELDS,
+    "required": list(RECIPE_FIELDS),
+    "additionalProperties": False
+}
+
+# Several recipes in one response (RecipeGenerator.generate_variants)
+VARIANTS_SCHEMA = {
+    "type": "object",
+    "properties": {"recipes": {"type": "array", "items": RECIPE_SCHEMA}},
+    "required": ["recipes"],
+    "additionalProperties": False
+}
+
+# Python types accepted for each JSON Schema type
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int
+}
+
+# A number written as text, optionally with a unit: "450", "12.5 g", "30 minutes"
+_NUMBER_TEXT = re.compile(r"\s*(-?\d+(?:\.\d+)?)\s*(?:[A-Za-z%]+\.?)?\s*$")
+
+_FENCED_BLOCK = re.compile(r"```(?:json|JSON)?\s*\n(.*?)```", re.DOTALL)
+_OBJECT_START = re.compile(r'\{\s*"')
+_RECIPE_START = re.compile(r'\{\s*"title"')
+
+def response_format(name: str = "recipe", schema: Dict[str, Any] = RECIPE_SCHEMA) -> Dict[str, Any]:
+    """Return the OpenAI-style response_format that asks for a recipe matching RECIPE_SCHEMA (or another schema)"""
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
+
+def validate(value: Any, schema: Dict[str, Any] = RECIPE_SCHEMA, path: str = "") -> List[str]:
+    """Check a value against a schema and return every problem found (empty if valid)
+
+    Supports the keywords RECIPE_SCHEMA uses: type, properties, required and
+    items. Extra fields are tolerated so that chatty models are not rejected
+    for adding, say, a "tips" list.
+    """
+    expected = schema.get("type")
+    if expected is not None:
+        python_type = _TYPES[expected]
+        if not isinstance(value, python_type) or isinstance(value, bool):
+            article = "an" if expected[0] in "aeiou" else "a"
+            return [f"{path or 'recipe'} must be {article} {expected}, not {type(value).__name__}"]
+
+    problems = []
+    if expected == "object":
+        prefix = f"{path}." if path else ""
+        for key in schema.get("required", []):
+            if key not in value:
+                problems.append(f"Missing required field: {prefix}{key}")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                problems.extend(validate(value[key], subschema, f"{prefix}{key}"))
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            problems.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return problems
+
+def coerce_types(value: Any, schema: Dict[str, Any] = RECIPE_SCHEMA) -> Any:
+    """Convert numbers written as text to numbers, and numbers to text, where the schema expects them
+
+    Models without structured output often write "servings": "4" or
+    "amount": 2. Objects and arrays are updated in place; the (possibly
+    converted) value is returned. Anything else is left for validate() to report.
+    """
+    expected = schema.get("type")
+    if expected in ("number", "integer") and isinstance(value, str):
+        match = _NUMBER_TEXT.match(value)
+        if match:
+            number = float(match.group(1))
+            if number.is_integer():
+                return int(number)
+            if expected == "number":
+                return number
+    elif expected == "string" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return f"{value:g}"
+    elif expected == "object" and isinstance(value, dict):
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                value[key] = coerce_types(value[key], subschema)
+    elif expected == "array" and isinstance(value, list) and "items" in schema:
+        value[:] = [coerce_types(item, schema["items"]) for item in value]
+    return value
+
+def extract_json(response_text: str) -> Any:
+    """Find and decode the recipe object in a response
+
+    Tries, in order: the whole text (structured output), the span from the
+    first '{"' to the last '}' (the usual case of commentary without braces),
+    each fenced code block, then each balanced top-level {...} object. Braces
+    in commentary before or after the recipe, or inside its strings, do not
+    confuse it.
+    """
+    stripped = response_text.strip()
+    if stripped.startswith("{"):
+        try:
+            return json.loads(stripped)
+        except json.JSONDecodeError:
+            pass
+
+    match = _OBJECT_START.search(response_text)
+    if match is None:
+        raise ValueError("No JSON object found in response")
+    try:
+        value = json.loads(response_text[match.start():response_text.rfind("}") + 1])
+        if isinstance(value, dict):
+            return value
+    except json.JSONDecodeError:
+        pass
+
+    for block in _FENCED_BLOCK.findall(response_text):
+        try:
+            value = json.loads(block)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict):
+            return value
+
+    # Prefer an object that looks like a recipe over, say, a small example object
+    first = None
+    start = match.start()
+    while start >= 0:
+        parser = IncrementalRecipeParser()
+        parser.feed(response_text[start:])
+        object_text = parser.json_text()
+        if object_text is None:
+            break
+        try:
+            value = json.loads(object_text)
+            if "title" in value:
+                return value
+            if first is None:
+                first = value
+            start = response_text.find("{", start + parser.root_end)
+        except json.JSONDecodeError:
+            start = response_text.find("{", start + parser.root_start + 1)
+    if first is not None:
+        return first
+    raise ValueError("No JSON object found in response")
+
+def extract_json_list(response_text: str, key: str = "recipes") -> List[Any]:
+    """Find and decode the recipes in a response that asked for several
+
+    Accepts {"recipes": [...]}, a bare [...] array or a single recipe object,
+    on their own or in a fenced code block. If none of those parse, as when
+    the response was cut off part-way through the last recipe, every complete
+    recipe object in the text is returned instead.
+    """
+    for text in [response_text.strip()] + _FENCED_BLOCK.findall(response_text):
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(value, dict) and isinstance(value.get(key), list):
+            return value[key]
+        if isinstance(value, list):
+            return value
+        if isinstance(value, dict):
+            return [value]
+
+    decoder = json.JSONDecoder()
+    values: List[Any] = []
+    end = 0
+    for match in _RECIPE_START.finditer(response_text):
+        if match.start() < end:
+            continue  # a "title" nested inside the recipe just decoded
+        try:
+            value, end = decoder.raw_decode(response_text, match.start())
+        except json.JSONDecodeError:
+            continue
+        values.append(value)
+    if not values:
+        raise ValueError("No recipes found in response")
+    return values
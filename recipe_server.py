@@ -0,0 +1,217 @@
+"""Local HTTP service exposing RecipeGenerator as a JSON endpoint
+
+    python recipe_server.py --port 8080
+    curl -X POST localhost:8080/recipe -d '{"cuisine": "Thai", "centerpiece": "tofu"}'
+
+Endpoints:
+    POST /recipe   Request body holds the form fields (see recipegenie.make_spec);
+                   responds with the validated recipe JSON.
+    GET  /health   Liveness check.
+    GET  /stats    Request, coalescing and error counters.
+    GET  /metrics  Per-stage latency histograms and token counts (Prometheus text).
+
+Identical requests that arrive while one is already in flight share a single
+upstream completion. Use --fake-llm to serve synthetic recipes offline.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import metrics
+from recipe_generator import RecipeGenerator, use_backend
+from recipegenie import load_config, make_spec
+
+# Largest request body accepted, in bytes
+MAX_BODY_BYTES = 64 * 1024
+
+class RecipeService:
+    """Generate recipes for concurrent callers, coalescing identical in-flight requests
+
+    Args:
+        generator: The RecipeGenerator that serves every request
+        request_timeout: Seconds a caller waits for its recipe, or None to wait indefinitely
+        max_workers: Most recipes generated at once
+    """
+
+    def __init__(self, generator: RecipeGenerator, request_timeout: Optional[float] = None, max_workers: int = 16):
+        self.generator = generator
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="recipe-server")
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "coalesced": 0, "upstream": 0, "errors": 0, "timeouts": 0}
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def generate(self, spec: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """Return (recipe, coalesced) for a normalized spec
+
+        The first caller for a spec starts the generation on a worker; callers
+        arriving while it is running wait for the same result instead of
+        starting their own. Every caller, the first included, gives up after
+        request_timeout with FutureTimeoutError; the generation itself runs on
+        and later callers still share it.
+        """
+        key = json.dumps(spec, sort_keys=True)
+        with self._lock:
+            self.stats["requests"] += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._executor.submit(self.generator.generate_recipe, **spec)
+                self._inflight[key] = future
+                self.stats["upstream"] += 1
+            else:
+                self.stats["coalesced"] += 1
+        if leader:
+            future.add_done_callback(lambda done: self._forget(key, done))
+
+        try:
+            return future.result(timeout=self.request_timeout), not leader
+        except FutureTimeoutError:
+            self._count("timeouts")
+            raise
+        except Exception:
+            self._count("errors")
+            raise
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def close(self) -> None:
+        """Stop accepting generations; ones already running are left to finish in the background"""
+        self._executor.shutdown(wait=False)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, in_flight=len(self._inflight))
+
+
+class RecipeRequestHandler(BaseHTTPRequestHandler):
+    server_version = "RecipeGenie"
+
+    @property
+    def service(self) -> RecipeService:
+        return self.server.service
+
+    def send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self.send_json(200, self.service.snapshot())
+        elif self.path == "/metrics":
+            data = metrics.registry.to_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/recipe":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length <= 0 or length > MAX_BODY_BYTES:
+            self.send_json(400, {"error": "request body must be a JSON object of at most 64 KiB"})
+            return
+
+        try:
+            values = json.loads(self.rfile.read(length))
+            if not isinstance(values, dict):
+                raise ValueError("expected a JSON object")
+            spec = make_spec(values)
+        except (json.JSONDecodeError, ValueError) as e:
+            self.send_json(400, {"error": str(e)})
+            return
+
+        try:
+            recipe_data, coalesced = self.service.generate(spec)
+        except FutureTimeoutError:
+            self.send_json(504, {"error": "timed out waiting for the recipe"})
+            return
+        except Exception as e:
+            self.send_json(502, {"error": str(e)})
+            return
+        self.send_json(200, recipe_data, {"X-Recipe-Coalesced": "1" if coalesced else "0"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def make_server(generator: RecipeGenerator, host: str = "127.0.0.1", port: int = 8080,
+                request_timeout: Optional[float] = None, quiet: bool = False,
+                max_workers: int = 16) -> ThreadingHTTPServer:
+    """Create (but do not start) an HTTP server for the generator"""
+    server = ThreadingHTTPServer((host, port), RecipeRequestHandler)
+    server.daemon_threads = True
+    server.service = RecipeService(generator, request_timeout, max_workers)
+    server.quiet = quiet
+    return server
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serve Recipe Genie over HTTP.")
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'),
+                        help="path to config.json (default: the one next to this program)")
+    parser.add_argument("--host", help="address to listen on (default from config, else 127.0.0.1)")
+    parser.add_argument("--port", type=int, help="port to listen on (default from config, else 8080)")
+    parser.add_argument("--fake-llm", action="store_true", help="serve synthetic recipes without calling an LLM")
+    parser.add_argument("--fake-latency", type=float, default=1.0, help="simulated LLM latency with --fake-llm")
+    parser.add_argument("--quiet", action="store_true", help="do not log each request")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    server_config = config.get('server', {})
+    if args.fake_llm:
+        from fake_llm import FakeLiteLLM
+        use_backend(FakeLiteLLM(latency=args.fake_latency))
+
+    generator = RecipeGenerator(config)
+    generator.warm_up()
+    server = make_server(
+        generator,
+        host=args.host or server_config.get('host', "127.0.0.1"),
+        port=args.port or server_config.get('port', 8080),
+        request_timeout=server_config.get('request_timeout', 120),
+        quiet=args.quiet,
+        max_workers=server_config.get('max_workers', 16)
+    )
+    host, port = server.server_address[:2]
+    print(f"Recipe Genie serving on http://{host}:{port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,292 @@
+"""Headless command-line interface for Recipe Genie
+
+Run ``python -m recipegenie --help`` for usage. This module must not import
+tkinter or pyperclip so that it starts quickly on servers and in cron jobs.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import metrics
+from pantry import parse_pantry
+from recipe_generator import RecipeGenerator
+from recipe_history import RecipeHistory
+from recipe_render import RENDERERS, RecipeExporter
+from recipe_schema import validate
+
+# Defaults match the initial values of the GUI form
+DEFAULT_SPEC = {
+    "calories": 500,
+    "servings": 4,
+    "prep_time": 30,
+    "additional_info": ""
+}
+
+SPEC_FIELDS = ("cuisine", "centerpiece", "calories", "servings", "prep_time", "additional_info")
+
+def load_config(path: str) -> Dict[str, Any]:
+    """Load configuration from a config.json file"""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise SystemExit(f"Error: config file not found: {path}")
+    except json.JSONDecodeError as e:
+        raise SystemExit(f"Error: invalid config file {path}: {str(e)}")
+
+def make_spec(values: Dict[str, Any], where: str = "") -> Dict[str, Any]:
+    """Build a generate_recipe() keyword dict from user-supplied values, applying form defaults"""
+    unknown = set(values) - set(SPEC_FIELDS)
+    if unknown:
+        raise ValueError(f"{where}unknown field(s): {', '.join(sorted(unknown))}")
+    spec = dict(DEFAULT_SPEC)
+    spec.update({key: value for key, value in values.items() if value is not None})
+    for field in ("cuisine", "centerpiece"):
+        if not str(spec.get(field, "")).strip():
+            raise ValueError(f"{where}'{field}' is required")
+    try:
+        for field in ("calories", "servings", "prep_time"):
+            spec[field] = int(spec[field])
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}calories, servings, and prep_time must be numbers")
+    return spec
+
+def read_specs(path: str) -> List[Dict[str, Any]]:
+    """Read request specs from a JSONL file, one JSON object per line"""
+    specs = []
+    stream = sys.stdin if path == "-" else open(path, 'r')
+    try:
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            where = f"{path}:{line_number}: "
+            try:
+                values = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{where}invalid JSON: {str(e)}")
+            if not isinstance(values, dict):
+                raise ValueError(f"{where}expected a JSON object")
+            specs.append(make_spec(values, where))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+    return specs
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+def print_summary(total: int, latencies: List[float], failures: int, wall_time: float) -> None:
+    """Print a throughput/latency summary to stderr"""
+    succeeded = total - failures
+    print(f"\n{succeeded} of {total} recipe(s) generated, {failures} failed in {wall_time:.2f}s", file=sys.stderr)
+    if wall_time > 0:
+        print(f"Throughput: {succeeded / wall_time * 60:.1f} recipes/min", file=sys.stderr)
+    if latencies:
+        print(
+            f"Latency: mean {sum(latencies) / len(latencies):.2f}s, p50 {percentile(latencies, 0.5):.2f}s, "
+            f"p95 {percentile(latencies, 0.95):.2f}s, max {max(latencies):.2f}s",
+            file=sys.stderr
+        )
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="recipegenie",
+        description="Generate recipes without the GUI, one at a time or in batches."
+    )
+    parser.add_argument("--config", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json'),
+                        help="path to config.json (default: the one next to this program)")
+    parser.add_argument("--cuisine", help="cuisine, e.g. 'Thai'")
+    parser.add_argument("--centerpiece", help="main ingredient, e.g. 'chicken'")
+    parser.add_argument("--calories", type=int, help="calories per serving (default 500)")
+    parser.add_argument("--servings", type=int, help="number of servings (default 4)")
+    parser.add_argument("--prep-time", type=int, dest="prep_time", help="maximum prep time in minutes (default 30)")
+    parser.add_argument("--additional-info", dest="additional_info", help="additional requirements")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="JSONL file of request specs with the fields above ('-' for stdin)")
+    parser.add_argument("--format", choices=tuple(RENDERERS), default="json",
+                        help="output format; json writes one recipe per line (default json)")
+    parser.add_argument("-o", "--output",
+                        help="write recipes to FILE instead of stdout; a .zip FILE gets one file per recipe")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="number of recipes generated concurrently (default: batch_concurrency from config)")
+    parser.add_argument("--refresh", action="store_true", help="skip the response cache lookup")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="write per-stage timing metrics to FILE (Prometheus text for .prom, else JSON)")
+    history = parser.add_argument_group(
+        "history",
+        "Search previously generated recipes instead of generating new ones. With --search, "
+        "--cuisine filters by cuisine, --calories is the maximum calories per serving, "
+        "--prep-time the maximum prep time and --servings the exact number of servings."
+    )
+    history.add_argument("--search", metavar="TEXT", nargs="?", const="",
+                         help="search the recipe history (all recipes if TEXT is omitted)")
+    history.add_argument("--pantry", metavar="ITEMS",
+                         help="list stored recipes that use mostly these comma-separated ingredients, or generate "
+                              "one from them (with the other request options) when none do")
+    history.add_argument("--limit", type=int, default=20,
+                         help="most recipes to list with --search or --pantry (default 20)")
+    history.add_argument("--import-logs", metavar="DIR", dest="import_logs",
+                         help="import recipes saved in a debug_logs directory into the history")
+    history.add_argument("--export", metavar="FILE",
+                         help="write the recipes found by --search (every recipe without --search) to FILE in "
+                              "--format; a .zip FILE gets one file per recipe")
+    return parser
+
+def complete_recipes(recipes: Iterable[Optional[Dict[str, Any]]], skipped: List[Any]) -> Iterator[Dict[str, Any]]:
+    """Yield the recipes that pass validation, appending the others to skipped
+
+    Recipes imported from old debug logs may lack fields the renderers need.
+    """
+    for recipe_data in recipes:
+        if recipe_data is None or validate(recipe_data):
+            skipped.append(recipe_data)
+            continue
+        yield recipe_data
+
+def report_skipped(skipped: List[Any]) -> None:
+    if skipped:
+        print(f"Skipped {len(skipped)} incomplete recipe(s)", file=sys.stderr)
+
+def run_history(args: argparse.Namespace, config: Dict[str, Any]) -> int:
+    """Handle --search, --import-logs and --export"""
+    history = RecipeHistory.from_config(config.get('history', {}))
+    incomplete: List[Any] = []
+    try:
+        if args.import_logs:
+            imported, skipped = history.import_debug_logs(args.import_logs)
+            print(f"Imported {imported} recipe(s), skipped {skipped}; {history.count()} in history",
+                  file=sys.stderr)
+        if args.search is None:
+            if args.export:
+                with RecipeExporter(args.export, args.format, title="Recipe history") as exporter:
+                    exporter.write_all(complete_recipes(history.iter_recipes(), incomplete))
+                print(f"Exported {exporter.count} recipe(s) to {args.export}", file=sys.stderr)
+                report_skipped(incomplete)
+            return 0
+
+        started = time.perf_counter()
+        rows = history.search(args.search, cuisine=args.cuisine, max_calories=args.calories,
+                              max_prep_time=args.prep_time, servings=args.servings, limit=args.limit)
+        elapsed = time.perf_counter() - started
+        if args.export or args.format != "text":
+            # Full recipes, fetched one at a time as they are written
+            with RecipeExporter(args.export or args.output or sys.stdout, args.format,
+                                title=f"Recipes: {args.search}" if args.search else "Recipes") as exporter:
+                exporter.write_all(complete_recipes((history.get(row["id"]) for row in rows), incomplete))
+            report_skipped(incomplete)
+        else:
+            out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+            try:
+                for row in rows:
+                    created = time.strftime("%Y-%m-%d", time.localtime(row["created"]))
+                    out.write(f"{row['id']:>6}  {created}  {row['title']}  ({row['cuisine']}, "
+                              f"{row['calories']} cal, {row['prep_time_minutes']} min, serves {row['servings']})\n")
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+        print(f"{len(rows)} recipe(s) found in {elapsed * 1000:.1f} ms", file=sys.stderr)
+        return 0
+    finally:
+        history.close()
+
+def run_pantry(args: argparse.Namespace, config: Dict[str, Any]) -> int:
+    """Handle --pantry"""
+    pantry = parse_pantry(args.pantry)
+    if not pantry:
+        print("Error: --pantry needs at least one ingredient", file=sys.stderr)
+        return 2
+    generator = RecipeGenerator(config)
+    spec = make_spec(dict({field: getattr(args, field) for field in SPEC_FIELDS},
+                          cuisine=args.cuisine or "Any", centerpiece=pantry[0]))
+    started = time.perf_counter()
+    try:
+        matches, recipe_data = generator.cook_from_pantry(pantry, spec["cuisine"], spec["calories"],
+                                                          spec["servings"], spec["prep_time"],
+                                                          spec["additional_info"], limit=args.limit)
+    except Exception as e:
+        print(f"Error: {str(e)}", file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - started
+    if recipe_data is not None:
+        print("No stored recipe uses mostly these ingredients; generated a new one", file=sys.stderr)
+        with RecipeExporter(args.output or sys.stdout, args.format, title="Pantry recipe") as exporter:
+            exporter.write(recipe_data)
+        return 0
+
+    history = generator.history
+    if args.format != "text":
+        incomplete: List[Any] = []
+        with RecipeExporter(args.output or sys.stdout, args.format, title="Pantry recipes") as exporter:
+            exporter.write_all(complete_recipes((history.get(match.recipe_id) for match in matches), incomplete))
+        report_skipped(incomplete)
+    else:
+        out = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+        try:
+            for match in matches:
+                recipe = history.get(match.recipe_id) or {}
+                missing = f"  (missing: {', '.join(match.missing)})" if match.missing else ""
+                out.write(f"{match.recipe_id:>6}  {match.coverage:>4.0%}  {recipe.get('title', '')}{missing}\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+    print(f"{len(matches)} recipe(s) found in {elapsed * 1000:.1f} ms", file=sys.stderr)
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.pantry:
+        return run_pantry(args, load_config(args.config))
+
+    if args.search is not None or args.import_logs or args.export:
+        return run_history(args, load_config(args.config))
+
+    try:
+        if args.batch:
+            specs = read_specs(args.batch)
+        else:
+            specs = [make_spec({field: getattr(args, field) for field in SPEC_FIELDS})]
+    except ValueError as e:
+        parser.error(str(e))
+    except OSError as e:
+        parser.error(f"could not read {args.batch}: {str(e)}")
+
+    generator = RecipeGenerator(load_config(args.config))
+    if args.refresh:
+        for spec in specs:
+            spec["refresh"] = True
+
+    exporter = RecipeExporter(args.output or sys.stdout, args.format, title="Generated recipes")
+    latencies = []
+    failures = 0
+    started = time.perf_counter()
+    try:
+        for result in generator.generate_many(specs, concurrency=args.workers):
+            if result.error is not None:
+                failures += 1
+                spec = result.spec
+                print(f"Error: #{result.index + 1} ({spec['cuisine']}, {spec['centerpiece']}): {str(result.error)}",
+                      file=sys.stderr)
+                continue
+            latencies.append(result.elapsed)
+            exporter.write(result.recipe)
+    except KeyboardInterrupt:
+        print("Interrupted", file=sys.stderr)
+        return 130
+    finally:
+        exporter.close()
+
+    print_summary(len(specs), latencies, failures, time.perf_counter() - started)
+    if args.metrics:
+        metrics.registry.dump(args.metrics)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, Optional, Union
+
+# LiteLLM (and httpx/builtin) exception class names worth retrying
+TRANSIENT_ERRORS = {
+    "RateLimitError", "APIConnectionError", "Timeout", "APITimeoutError", "TimeoutError",
+    "ServiceUnavailableError", "InternalServerError", "BadGatewayError", "ConnectionError",
+    "ConnectTimeout", "ReadTimeout", "RemoteProtocolError"
+}
+
+class LLMCallError(ValueError):
+    """The LLM call itself failed; the original exception is available as __cause__"""
+
+
+class ResiliencePolicy:
+    """Retry, backoff and hedging settings, plus the latency history hedging is based on
+
+    Args:
+        max_retries: Extra attempts per model after the first one fails
+        backoff_seconds: Delay before the first retry; doubles on each further retry
+        max_backoff_seconds: Upper bound for a single backoff delay
+        retry_on_parse_error: Whether an unparseable or invalid response is retried
+        hedge_after_seconds: Fire a hedged request after this many seconds, or "p95" to
+            use the 95th percentile of recent successful latencies; None disables hedging
+        hedge_min_samples: Latencies needed before "p95" hedging starts
+    """
+
+    def __init__(self, max_retries: int = 2, backoff_seconds: float = 1.0, max_backoff_seconds: float = 10.0,
+                 retry_on_parse_error: bool = True, hedge_after_seconds: Union[float, str, None] = None,
+                 hedge_min_samples: int = 20):
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.retry_on_parse_error = retry_on_parse_error
+        self.hedge_after_seconds = hedge_after_seconds
+        self.hedge_min_samples = hedge_min_samples
+        self._latencies: deque = deque(maxlen=200)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "ResiliencePolicy":
+        """Create a policy from the "resilience" section of config.json"""
+        return cls(
+            max_retries=config.get('max_retries', 2),
+            backoff_seconds=config.get('backoff_seconds', 1.0),
+            max_backoff_seconds=config.get('max_backoff_seconds', 10.0),
+            retry_on_parse_error=config.get('retry_on_parse_error', True),
+            hedge_after_seconds=config.get('hedge_after_seconds'),
+            hedge_min_samples=config.get('hedge_min_samples', 20)
+        )
+
+    def backoff(self, attempt: int) -> float:
+        """Return the delay before retry number `attempt` (1-based), with jitter"""
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * (2 ** (attempt - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Decide whether a failed attempt is worth repeating against the same model"""
+        if isinstance(error, LLMCallError):
+            cause = error.__cause__
+            if cause is None:
+                return False
+            return any(klass.__name__ in TRANSIENT_ERRORS for klass in type(cause).__mro__)
+        return self.retry_on_parse_error
+
+    def record_latency(self, seconds: float) -> None:
+        """Remember the latency of a successful attempt"""
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return how long to wait before hedging, or None if hedging is off (or still warming up)"""
+        if self.hedge_after_seconds is None:
+            return None
+        if self.hedge_after_seconds != "p95":
+            return float(self.hedge_after_seconds)
+        with self._lock:
+            if len(self._latencies) < self.hedge_min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
@@ -0,0 +1,390 @@
+"""One reusable window for every generated recipe
+
+Instead of a new Toplevel with its own text box and buttons per recipe, the
+ResultsViewer keeps a single window: a list of recipes on the left and one
+detail pane on the right whose widgets are reused for whichever recipe is
+selected. A recipe's text is only rendered when it is selected, and rendered
+text is kept for the most recently viewed `cache_size` recipes. The list holds
+at most `max_recipes` entries (older ones are still in the history), so the
+widget count and memory stay the same after 5 recipes or 500.
+"""
+import itertools
+import time
+import tkinter as tk
+from collections import OrderedDict
+from tkinter import messagebox, scrolledtext, ttk
+from typing import Any, Dict, List, Optional
+
+import metrics
+from recipe_render import format_nutrition_note
+from recipe_scaling import scale_recipe
+from stream_parser import FIELD_EVENT, ITEM_EVENT
+
+UNIT_CHOICES = {"As written": None, "Metric": "metric", "US": "us"}
+
+
+class ResultEntry:
+    """One recipe in the viewer's list, or a recipe still being streamed"""
+
+    def __init__(self, entry_id: int, recipe: Optional[Dict[str, Any]] = None, similar_match: Any = None,
+                 form: Optional[Dict[str, Any]] = None, job_id: Optional[int] = None, label: str = ""):
+        self.entry_id = entry_id
+        self.recipe = recipe  # what is shown, possibly a scaled copy of original
+        self.original = recipe
+        self.similar_match = similar_match
+        self.form = form
+        self.job_id = job_id  # set while the recipe is streaming in
+        self.label = label
+        self.scale_units = "As written"
+        # Streamed so far
+        self.title = "Generating recipe..."
+        self.description = ""
+        self.partial: List[str] = []
+        self.counts = {"ingredients": 0, "instructions": 0}
+
+    @property
+    def streaming(self) -> bool:
+        return self.recipe is None
+
+
+class ResultsViewer:
+    """The results window, created on first use and hidden rather than destroyed when closed
+
+    Args:
+        app: The RecipeApp, for its root window and its print, copy, export and generate actions
+        max_recipes: Most recipes kept in the list; the oldest finished ones are dropped first
+        cache_size: Number of rendered recipe texts to keep
+    """
+
+    def __init__(self, app: Any, max_recipes: int = 200, cache_size: int = 32):
+        self.app = app
+        self.max_recipes = max_recipes
+        self.cache_size = cache_size
+        self.entries: List[ResultEntry] = []
+        self.selected: Optional[ResultEntry] = None
+        self._ids = itertools.count(1)
+        self._rendered: "OrderedDict[int, str]" = OrderedDict()
+        self.window: Optional[tk.Toplevel] = None
+
+    @classmethod
+    def from_config(cls, app: Any, config: Dict[str, Any]) -> "ResultsViewer":
+        """Create the viewer from the "results_viewer" section of config.json"""
+        return cls(app, max_recipes=config.get('max_recipes', 200), cache_size=config.get('cache_size', 32))
+
+    def show(self, recipe_data: Dict[str, Any], similar_match: Any = None, form: Optional[Dict[str, Any]] = None,
+             job_id: Optional[int] = None, label: str = "") -> None:
+        """Add a recipe to the list and select it, or complete the entry of the job that streamed it
+
+        A streamed entry is only redrawn if it is the one selected, so a
+        recipe finishing does not take the pane away from the one being read.
+        """
+        entry = self._find_job(job_id) if job_id is not None else None
+        if entry is None:
+            entry = self._add(ResultEntry(next(self._ids), recipe_data, similar_match, form, label=label))
+            self.select(entry)
+            return
+        entry.recipe = entry.original = recipe_data
+        entry.similar_match = similar_match
+        entry.form = form
+        entry.job_id = None
+        entry.partial = []
+        self._relabel(entry)
+        if entry is self.selected:
+            self._display(entry)
+
+    def show_many(self, recipes: List[Dict[str, Any]], label: str = "Variant") -> None:
+        """Add several recipes, such as the variants of one request, and select the first"""
+        added = [self._add(ResultEntry(next(self._ids), recipe_data, label=f"{label} {number}: "))
+                 for number, recipe_data in enumerate(recipes, 1)]
+        if added:
+            self.select(added[0])
+
+    def stream_event(self, job: Any, event: tuple) -> None:
+        """Add one streamed recipe field to the job's entry, creating the entry on the first one"""
+        entry = self._find_job(job.job_id)
+        if entry is None:
+            entry = self._add(ResultEntry(next(self._ids), job_id=job.job_id))
+            self.select(entry)
+
+        kind, key, value = event
+        if kind == FIELD_EVENT and key == "title":
+            entry.title = value
+            self._relabel(entry)
+            if entry is self.selected:
+                self.title_var.set(value)
+        elif kind == FIELD_EVENT and key == "description":
+            entry.description = value
+            if entry is self.selected:
+                self.description_var.set(value)
+        elif kind == ITEM_EVENT and key in ("ingredients", "instructions"):
+            if key == "ingredients" and isinstance(value, dict):
+                heading = "INGREDIENTS:\n"
+                line = f"• {value.get('amount', '')} {value.get('name', '')}\n"
+            elif key == "instructions":
+                heading = "\n\nINSTRUCTIONS:\n" if entry.counts["ingredients"] else "INSTRUCTIONS:\n"
+                line = f"{entry.counts['instructions'] + 1}. {value}\n\n"
+            else:
+                return
+
+            text = line if entry.counts[key] else heading + "=" * 50 + "\n" + line
+            entry.counts[key] += 1
+            entry.partial.append(text)
+            if entry is self.selected:
+                self.text.config(state=tk.NORMAL)
+                self.text.insert(tk.END, text)
+                self.text.config(state=tk.DISABLED)
+
+    def discard(self, job_id: int) -> None:
+        """Remove the partly streamed entry of a failed or cancelled job"""
+        entry = self._find_job(job_id)
+        if entry is not None:
+            self._remove(entry)
+
+    def select(self, entry: ResultEntry) -> None:
+        """Show an entry in the detail pane, opening the window if needed"""
+        self._ensure_window()
+        index = self.entries.index(entry)
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(index)
+        self.listbox.see(index)
+        self.selected = entry
+        self._display(entry)
+        self.window.deiconify()
+        self.window.lift()
+
+    def _add(self, entry: ResultEntry) -> ResultEntry:
+        self._ensure_window()
+        self.entries.append(entry)
+        self.listbox.insert(tk.END, self._label(entry))
+        while len(self.entries) > self.max_recipes:
+            oldest = next((old for old in self.entries if not old.streaming and old is not entry), None)
+            if oldest is None:
+                break
+            self._remove(oldest)
+        return entry
+
+    def _remove(self, entry: ResultEntry) -> None:
+        index = self.entries.index(entry)
+        del self.entries[index]
+        self.listbox.delete(index)
+        self._rendered.pop(entry.entry_id, None)
+        if entry is self.selected:
+            self.selected = None
+            if self.entries:
+                self.select(self.entries[min(index, len(self.entries) - 1)])
+            else:
+                self._display(None)
+
+    def _find_job(self, job_id: int) -> Optional[ResultEntry]:
+        return next((entry for entry in self.entries if entry.job_id == job_id), None)
+
+    def _label(self, entry: ResultEntry) -> str:
+        if entry.streaming:
+            return f"Generating: {entry.title}"
+        return f"{entry.label}{entry.recipe['title']} ({entry.recipe.get('cuisine', '')})"
+
+    def _relabel(self, entry: ResultEntry) -> None:
+        index = self.entries.index(entry)
+        self.listbox.delete(index)
+        self.listbox.insert(index, self._label(entry))
+        if entry is self.selected:
+            self.listbox.selection_set(index)
+
+    def _rendered_text(self, entry: ResultEntry) -> str:
+        """The entry's recipe text, rendered on first view and kept for the most recently viewed ones"""
+        text = self._rendered.get(entry.entry_id)
+        if text is None:
+            with metrics.span("render"):
+                text = self.app.format_recipe_text(entry.recipe)
+            self._rendered[entry.entry_id] = text
+            while len(self._rendered) > self.cache_size:
+                self._rendered.popitem(last=False)
+        else:
+            self._rendered.move_to_end(entry.entry_id)
+        return text
+
+    def _ensure_window(self) -> None:
+        """Build the window and its widgets once; later recipes only change their contents"""
+        if self.window is not None and self.window.winfo_exists():
+            return
+        self.entries = []
+        self.selected = None
+        self._rendered.clear()
+        window = self.window = tk.Toplevel(self.app.root)
+        window.title("Recipes")
+        window.geometry("950x700")
+        window.minsize(800, 600)
+        window.protocol("WM_DELETE_WINDOW", window.withdraw)
+
+        panes = ttk.PanedWindow(window, orient=tk.HORIZONTAL)
+        panes.pack(fill=tk.BOTH, expand=True)
+
+        list_frame = ttk.Frame(panes, padding=(10, 20, 0, 20))
+        self.listbox = tk.Listbox(list_frame, width=32, exportselection=False)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.listbox.yview)
+        self.listbox.config(yscrollcommand=scrollbar.set)
+        self.listbox.grid(column=0, row=0, sticky=tk.NSEW)
+        scrollbar.grid(column=1, row=0, sticky=tk.NS)
+        self.remove_button = ttk.Button(list_frame, text="Remove", command=self._remove_selected)
+        self.remove_button.grid(column=0, row=1, columnspan=2, pady=(10, 0))
+        list_frame.rowconfigure(0, weight=1)
+        list_frame.columnconfigure(0, weight=1)
+        self.listbox.bind("<<ListboxSelect>>", lambda event: self._on_list_select())
+        panes.add(list_frame, weight=1)
+
+        content_frame = ttk.Frame(panes, padding="20")
+        panes.add(content_frame, weight=3)
+        content_frame.columnconfigure(0, weight=1)
+        content_frame.rowconfigure(6, weight=1)
+
+        self.title_var = tk.StringVar()
+        ttk.Label(content_frame, textvariable=self.title_var, font=("Arial", 16, "bold"),
+                  wraplength=620).grid(column=0, row=0, sticky=tk.W, pady=(0, 10))
+        self.description_var = tk.StringVar()
+        ttk.Label(content_frame, textvariable=self.description_var,
+                  wraplength=620).grid(column=0, row=1, sticky=tk.W, pady=(0, 15))
+        self.details_var = tk.StringVar()
+        self.details_label = ttk.Label(content_frame, textvariable=self.details_var, wraplength=620)
+        self.details_label.grid(column=0, row=2, sticky=tk.W, pady=(0, 15))
+        self.note_var = tk.StringVar()
+        self.note_label = ttk.Label(content_frame, textvariable=self.note_var, wraplength=620, foreground="#a04000")
+        self.note_label.grid(column=0, row=3, sticky=tk.W, pady=(0, 15))
+
+        self.similar_frame = ttk.Frame(content_frame)
+        self.similar_frame.grid(column=0, row=4, sticky=tk.EW, pady=(0, 15))
+        self.similar_var = tk.StringVar()
+        ttk.Label(self.similar_frame, textvariable=self.similar_var, wraplength=420).pack(side=tk.LEFT)
+        ttk.Button(self.similar_frame, text="Generate Fresh Anyway",
+                   command=self._generate_fresh).pack(side=tk.RIGHT)
+
+        # Scale controls; always scale from the recipe as generated so rounding does not compound
+        self.scale_frame = ttk.Frame(content_frame)
+        self.scale_frame.grid(column=0, row=5, sticky=tk.EW, pady=(0, 10))
+        ttk.Label(self.scale_frame, text="Servings:").pack(side=tk.LEFT)
+        self.servings_var = tk.StringVar()
+        ttk.Spinbox(self.scale_frame, from_=1, to=100, textvariable=self.servings_var,
+                    width=5).pack(side=tk.LEFT, padx=5)
+        ttk.Label(self.scale_frame, text="Units:").pack(side=tk.LEFT, padx=(10, 0))
+        self.units_var = tk.StringVar(value="As written")
+        ttk.Combobox(self.scale_frame, textvariable=self.units_var, values=list(UNIT_CHOICES), state="readonly",
+                     width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Button(self.scale_frame, text="Scale", command=self._rescale).pack(side=tk.LEFT, padx=5)
+
+        self.text = scrolledtext.ScrolledText(content_frame, width=80, height=25, wrap=tk.WORD)
+        self.text.grid(column=0, row=6, sticky=tk.NSEW, pady=(0, 15))
+        self.text.config(state=tk.DISABLED)
+
+        buttons_frame = ttk.Frame(content_frame)
+        buttons_frame.grid(column=0, row=7, sticky=tk.EW, pady=(0, 10))
+        ttk.Button(buttons_frame, text="New Recipe", command=self._new_recipe).pack(side=tk.LEFT, padx=5)
+        self.recipe_buttons = [
+            ttk.Button(buttons_frame, text="Print", command=lambda: self._act(self.app.print_recipe)),
+            ttk.Button(buttons_frame, text="Copy to Clipboard", command=lambda: self._act(self.app.copy_to_clipboard)),
+            ttk.Button(buttons_frame, text="Export...", command=lambda: self._act(self.app.export_recipe))
+        ]
+        for button in self.recipe_buttons:
+            button.pack(side=tk.LEFT, padx=5)
+
+    def _display(self, entry: Optional[ResultEntry]) -> None:
+        """Fill the reused detail widgets with an entry"""
+        recipe_data = entry.recipe if entry is not None else None
+        if entry is None:
+            self.window.title("Recipes")
+            self.title_var.set("")
+            self.description_var.set("")
+            text = ""
+        elif recipe_data is None:
+            self.window.title(f"Generating: {entry.title}")
+            self.title_var.set(entry.title)
+            self.description_var.set(entry.description)
+            text = "".join(entry.partial)
+        else:
+            self.window.title(recipe_data["title"])
+            self.title_var.set(recipe_data["title"])
+            self.description_var.set(recipe_data["description"])
+            text = self._rendered_text(entry)
+
+        if recipe_data is not None:
+            time_info = ""
+            if "prep_time_minutes" in recipe_data:
+                time_info = f" | Prep: {recipe_data['prep_time_minutes']} min"
+            if "cook_time_minutes" in recipe_data:
+                time_info += f" | Cook: {recipe_data['cook_time_minutes']} min"
+            self.details_var.set(f"Cuisine: {recipe_data['cuisine']} | Servings: {recipe_data['servings']} | "
+                                 f"Calories: {recipe_data['calories_per_serving']} per serving{time_info}")
+            self.details_label.grid()
+            self.scale_frame.grid()
+            self.servings_var.set(str(recipe_data.get("servings", "")))
+            self.units_var.set(entry.scale_units)
+        else:
+            self.details_label.grid_remove()
+            self.scale_frame.grid_remove()
+
+        if recipe_data is not None and (recipe_data.get("nutrition_check") or {}).get("status") in (
+                "over", "under", "scaled"):
+            self.note_var.set(format_nutrition_note(recipe_data))
+            self.note_label.grid()
+        else:
+            self.note_label.grid_remove()
+
+        if entry is not None and entry.similar_match is not None:
+            created = time.strftime("%Y-%m-%d", time.localtime(entry.similar_match.created))
+            self.similar_var.set(f"From your history: generated on {created} for a similar request "
+                                 f"({entry.similar_match.similarity:.0%} match).")
+            self.similar_frame.grid()
+        else:
+            self.similar_frame.grid_remove()
+
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert(tk.END, text)
+        self.text.config(state=tk.DISABLED)
+        for button in self.recipe_buttons:
+            button.state(['!disabled'] if recipe_data is not None else ['disabled'])
+        self.remove_button.config(text="Cancel" if entry is not None and entry.streaming else "Remove")
+
+    def _on_list_select(self) -> None:
+        selection = self.listbox.curselection()
+        if selection and self.entries[selection[0]] is not self.selected:
+            self.selected = self.entries[selection[0]]
+            self._display(self.selected)
+
+    def _remove_selected(self) -> None:
+        """Remove the selected recipe from the list, or cancel it if it is still being generated"""
+        entry = self.selected
+        if entry is None:
+            return
+        if entry.streaming:
+            self.app.cancel_job(entry.job_id)  # the job's cancelled event then discards the entry
+        else:
+            self._remove(entry)
+
+    def _rescale(self) -> None:
+        entry = self.selected
+        if entry is None or entry.streaming:
+            return
+        try:
+            scaled = scale_recipe(entry.original, int(self.servings_var.get()), UNIT_CHOICES[self.units_var.get()])
+        except ValueError:
+            messagebox.showerror("Error", "Servings must be a whole number of 1 or more.", parent=self.window)
+            return
+        entry.recipe = scaled
+        entry.scale_units = self.units_var.get()
+        self._rendered.pop(entry.entry_id, None)
+        self._display(entry)
+
+    def _generate_fresh(self) -> None:
+        entry = self.selected
+        if entry is not None and entry.form is not None:
+            self._remove(entry)
+            self.app.start_generation(entry.form, refresh=True)
+
+    def _new_recipe(self) -> None:
+        self.window.withdraw()
+        self.app.root.lift()
+
+    def _act(self, action: Any) -> None:
+        """Run a print, copy or export action on the selected recipe"""
+        entry = self.selected
+        if entry is not None and not entry.streaming:
+            action(entry.recipe, self._rendered_text(entry))
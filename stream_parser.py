@@ -0,0 +1,129 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# Event kinds produced by IncrementalRecipeParser.feed()
+FIELD_EVENT = "field"  # a complete top-level field: (FIELD_EVENT, key, value)
+ITEM_EVENT = "item"    # one complete element of a streamed list: (ITEM_EVENT, key, value)
+
+# Top-level lists whose elements are reported one at a time
+STREAMED_LISTS = ("ingredients", "instructions")
+
+
+class IncrementalRecipeParser:
+    """Parse a recipe JSON object as it streams in, reporting fields as they complete
+
+    Text before the first '{' (model commentary) is ignored. The parser only
+    tracks nesting depth and string state, and hands each finished value to
+    json.loads, so it stays linear in the size of the response.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.started = False
+        self.confirmed = False
+        self.finished = False
+        self.root_start = None
+        self.root_end = None
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.item_start = None
+        self.expecting_key = False
+
+    def _emit(self, events: List[Tuple[str, str, Any]], kind: str, key: str, start: int, end: int) -> None:
+        raw = self._text[start:end].strip()
+        if not raw:
+            return
+        try:
+            events.append((kind, key, json.loads(raw)))
+        except json.JSONDecodeError:
+            # Leave malformed fragments to the final full-text parse
+            pass
+
+    def feed(self, text: str) -> List[Tuple[str, str, Any]]:
+        """Consume the next chunk of text and return any newly completed events"""
+        events: List[Tuple[str, str, Any]] = []
+        if self.finished or not text:
+            return events
+
+        base = len(self._text)
+        self._text += text
+
+        for offset, char in enumerate(text):
+            pos = base + offset
+            if not self.started:
+                if char == '{':
+                    self.started = True
+                    self.root_start = pos
+                    self.depth = 1
+                    self.expecting_key = True
+                continue
+
+            if not self.confirmed:
+                # A JSON object must open with a key; anything else was a brace in commentary
+                if char.isspace():
+                    continue
+                if char != '"':
+                    self.started = False
+                    self.depth = 0
+                    continue
+                self.confirmed = True
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == '\\':
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+                    if self.depth == 1 and self.expecting_key and self.key_start is not None:
+                        self.key = json.loads(self._text[self.key_start:pos + 1])
+                        self.key_start = None
+                continue
+
+            if char == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expecting_key:
+                    self.key_start = pos
+            elif char == ':' and self.depth == 1 and self.expecting_key:
+                self.expecting_key = False
+                self.value_start = pos + 1
+            elif char in '{[':
+                self.depth += 1
+                if char == '[' and self.depth == 2 and self.key in STREAMED_LISTS:
+                    self.item_start = pos + 1
+            elif char in '}]':
+                if self.depth == 2 and char == ']' and self.item_start is not None:
+                    self._emit(events, ITEM_EVENT, self.key, self.item_start, pos)
+                    self.item_start = None
+                self.depth -= 1
+                if self.depth == 0:
+                    if self.value_start is not None:
+                        self._emit(events, FIELD_EVENT, self.key, self.value_start, pos)
+                    self.finished = True
+                    self.root_end = pos + 1
+                    break
+            elif char == ',':
+                if self.depth == 1:
+                    if self.value_start is not None:
+                        self._emit(events, FIELD_EVENT, self.key, self.value_start, pos)
+                    self.value_start = None
+                    self.expecting_key = True
+                elif self.depth == 2 and self.item_start is not None:
+                    self._emit(events, ITEM_EVENT, self.key, self.item_start, pos)
+                    self.item_start = pos + 1
+
+        return events
+
+    def text(self) -> str:
+        """Return everything fed so far"""
+        return self._text
+
+    def json_text(self) -> Optional[str]:
+        """Return the complete recipe object text, or None if it has not closed yet"""
+        if not self.finished:
+            return None
+        return self._text[self.root_start:self.root_end]
@@ -0,0 +1,32 @@
+"""Shared fixtures; the app's modules live at the top of the repository, so it goes on sys.path"""
+import os
+import sys
+
+os.environ.setdefault("LITELLM_LOCAL_MODEL_COST_MAP", "True")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import recipe_generator
+from fake_llm import FakeLiteLLM
+
+
+@pytest.fixture
+def fake_llm():
+    """A FakeLiteLLM installed as the LLM backend for the duration of the test"""
+    backend = FakeLiteLLM()
+    recipe_generator.use_backend(backend)
+    yield backend
+    recipe_generator.use_backend(None)
+
+
+@pytest.fixture
+def generator(fake_llm):
+    """A RecipeGenerator on the fake backend, without cache, history or retries"""
+    return recipe_generator.RecipeGenerator({
+        "model": "gpt-3.5-turbo",
+        "stream": False,
+        "cache": {"enabled": False},
+        "history": {"enabled": False},
+        "resilience": {"max_retries": 0}
+    })
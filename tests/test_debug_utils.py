@@ -0,0 +1,54 @@
+import json
+import os
+
+from debug_utils import DebugLogWriter
+
+
+def read_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+def test_log_rotates_by_size_and_keeps_backup_count_files(tmp_path):
+    writer = DebugLogWriter(str(tmp_path), max_bytes=200, backup_count=2)
+    for number in range(41):
+        writer.write({"n": number, "padding": "x" * 20})
+    writer.close()
+
+    path = str(tmp_path / "recipegenie.jsonl")
+    assert sorted(os.listdir(str(tmp_path))) == ["recipegenie.jsonl", "recipegenie.jsonl.1", "recipegenie.jsonl.2"]
+    files = [read_lines(f"{path}.2"), read_lines(f"{path}.1"), read_lines(path)]
+    numbers = [record["n"] for records in files for record in records]
+    assert numbers == list(range(numbers[0], 41))
+    assert all(os.path.getsize(name) <= 200 + 40 for name in (path, f"{path}.1", f"{path}.2"))
+
+
+def test_flush_and_close_drain_the_queue(tmp_path):
+    writer = DebugLogWriter(str(tmp_path), queue_size=1000)
+    path = str(tmp_path / "recipegenie.jsonl")
+    for number in range(300):
+        writer.write({"n": number})
+    writer.flush()
+    assert len(read_lines(path)) == 300
+
+    for number in range(300, 600):
+        writer.write({"n": number})
+    writer.close()
+    assert [record["n"] for record in read_lines(path)] == list(range(600))
+    assert not writer._thread.is_alive()
+    assert writer.dropped == 0
+
+
+def test_failed_write_does_not_stop_the_writer(tmp_path):
+    directory = tmp_path / "logs"
+    directory.write_text("not a directory")
+    writer = DebugLogWriter(str(directory))
+    writer.write({"n": 1})
+    writer.flush(timeout=2)
+    assert writer.dropped == 1
+    assert writer._thread.is_alive()
+
+    directory.unlink()
+    writer.write({"n": 2})
+    writer.close()
+    assert read_lines(str(directory / "recipegenie.jsonl")) == [{"n": 2}]
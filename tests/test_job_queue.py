@@ -0,0 +1,88 @@
+import threading
+import time
+
+from job_queue import JOB_CANCELLED, JOB_DONE, JOB_ERROR, JOB_PROGRESS, RecipeJobQueue
+
+
+def poll_until(job_queue, count, timeout=5.0):
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count and time.monotonic() < deadline:
+        events.extend(job_queue.poll())
+        time.sleep(0.01)
+    return events
+
+
+def test_results_progress_and_errors_are_handed_back():
+    job_queue = RecipeJobQueue(max_workers=2)
+
+    def works(job):
+        job.report("half way")
+        return 42
+
+    def fails(job):
+        raise ValueError("no recipe")
+
+    done = job_queue.submit(works, "works")
+    failed = job_queue.submit(fails, "fails")
+    events = poll_until(job_queue, 3)
+    job_queue.shutdown()
+
+    by_job = {(job.job_id, kind): payload for job, kind, payload in events}
+    assert by_job[(done.job_id, JOB_PROGRESS)] == "half way"
+    assert by_job[(done.job_id, JOB_DONE)] == 42
+    assert str(by_job[(failed.job_id, JOB_ERROR)][0]) == "no recipe"
+    assert job_queue.pending() == []
+
+
+def test_cancelling_a_running_job_discards_its_result():
+    job_queue = RecipeJobQueue(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def slow(job):
+        started.set()
+        release.wait(5)
+        return "too late"
+
+    job = job_queue.submit(slow)
+    assert started.wait(5)
+    assert job_queue.cancel(job.job_id)
+    assert job.cancelled
+    release.set()
+    time.sleep(0.05)
+    events = job_queue.poll()
+    job_queue.shutdown()
+
+    assert [(event_job, kind) for event_job, kind, _ in events] == [(job, JOB_CANCELLED)]
+    assert not job_queue.cancel(job.job_id)
+
+
+def test_a_queued_job_cancelled_before_it_starts_never_runs():
+    job_queue = RecipeJobQueue(max_workers=1)
+    release = threading.Event()
+    ran = []
+    blocker = job_queue.submit(lambda job: release.wait(5))
+    queued = job_queue.submit(lambda job: ran.append(job))
+
+    job_queue.cancel(queued.job_id)
+    release.set()
+    events = poll_until(job_queue, 2)
+    job_queue.shutdown()
+
+    assert (blocker, JOB_DONE) in [(job, kind) for job, kind, _ in events]
+    assert ran == []
+
+
+def test_shutdown_cancels_outstanding_jobs():
+    job_queue = RecipeJobQueue(max_workers=1)
+    release = threading.Event()
+    jobs = [job_queue.submit(lambda job: release.wait(5)) for _ in range(3)]
+    job_queue.shutdown()
+    release.set()
+
+    events = job_queue.poll()
+    assert sorted(job.job_id for job, kind, _ in events if kind == JOB_CANCELLED) == [job.job_id for job in jobs]
+    assert all(job.cancelled for job in jobs)
+    assert all(job.future.cancelled() for job in jobs[1:])
+    assert job_queue.pending() == []
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from metrics import STAGE_METRIC, Histogram, MetricsRegistry
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram(buckets=(0.1, 1.0, 10.0))
+    for value in (0.05, 0.1, 0.5, 2.0, 20.0):
+        histogram.observe(value)
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(22.65)
+    assert histogram.quantile(0.4) == 0.1
+    assert histogram.quantile(0.6) == 1.0
+    assert histogram.quantile(1.0) == float("inf")
+    assert Histogram().quantile(0.5) is None
+
+
+def test_span_times_stages_and_counts_errors():
+    registry = MetricsRegistry()
+    finished = []
+    registry.add_exporter(finished.append)
+    with registry.span("parse", model="m") as span:
+        time.sleep(0.01)
+        span.set(tokens=5)
+    with pytest.raises(ValueError):
+        with registry.span("parse", model="m"):
+            raise ValueError("bad json")
+
+    stage = registry.to_dict()["histograms"][STAGE_METRIC]
+    assert stage[0]["labels"] == {"model": "m", "stage": "parse"}
+    assert stage[0]["count"] == 2
+    assert stage[0]["sum"] >= 0.01
+    assert registry.to_dict()["counters"]["recipegenie_stage_errors_total"] == [
+        {"labels": {"error": "ValueError", "model": "m", "stage": "parse"}, "value": 1}]
+    assert [(span.attributes, span.error) for span in finished] == [({"tokens": 5}, None), ({}, "ValueError")]
+
+
+def test_prometheus_text_export():
+    registry = MetricsRegistry()
+    for value in (0.0003, 0.02, 0.02, 500.0):
+        registry.observe("recipegenie_llm_seconds", value, model='gpt "4"')
+    registry.increment("recipegenie_cache_requests_total", result="hit")
+    registry.increment("recipegenie_cache_requests_total", 2, result="hit")
+
+    lines = registry.to_prometheus().splitlines()
+    label = 'model="gpt \\"4\\""'
+    assert lines[0] == "# TYPE recipegenie_llm_seconds histogram"
+    assert f'recipegenie_llm_seconds_bucket{{{label},le="0.0005"}} 1' in lines
+    assert f'recipegenie_llm_seconds_bucket{{{label},le="0.01"}} 1' in lines
+    assert f'recipegenie_llm_seconds_bucket{{{label},le="0.05"}} 3' in lines
+    assert f'recipegenie_llm_seconds_bucket{{{label},le="120.0"}} 3' in lines
+    assert f'recipegenie_llm_seconds_bucket{{{label},le="+Inf"}} 4' in lines
+    assert f"recipegenie_llm_seconds_count{{{label}}} 4" in lines
+    assert "# TYPE recipegenie_cache_requests_total counter" in lines
+    assert 'recipegenie_cache_requests_total{result="hit"} 3' in lines
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry()
+    registry.enabled = False
+    with registry.span("parse"):
+        pass
+    registry.increment("recipegenie_cache_requests_total")
+    assert registry.to_prometheus() == "\n"
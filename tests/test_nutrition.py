@@ -0,0 +1,36 @@
+from nutrition import NutritionTable, check_recipe, estimate_nutrition, normalize_words
+
+
+def make_table(g_per_ml):
+    rows = {"rice": (130, 2.7, 0.3, 28, g_per_ml, 0), "chicken thigh": (180, 24, 9, 0, 0.6, 120)}
+    names = list(rows)
+    columns = {field: [] for field in ("kcal", "protein_g", "fat_g", "carbohydrates_g", "g_per_ml", "g_per_piece")}
+    for values in rows.values():
+        for field, value in zip(columns, values):
+            columns[field].append(value)
+    return NutritionTable(names, {normalize_words(name): row for row, name in enumerate(names)}, columns)
+
+
+def test_volume_without_density_is_not_weighed_as_water():
+    recipe = {"servings": 1, "ingredients": [{"name": "rice", "amount": "1 cup"},
+                                             {"name": "chicken thighs", "amount": "200 g"}]}
+    with_density = estimate_nutrition(recipe, make_table(0.8))
+    assert with_density.coverage == 1.0
+
+    without = estimate_nutrition(recipe, make_table(0))
+    assert without.coverage == 0.5
+    assert without.unmatched == ["rice"]
+    assert round(without.calories) == 360
+
+
+def test_replaced_nutrition_is_marked_as_estimated():
+    recipe = {"servings": 2, "nutrition": {"calories": 900, "protein_g": 1, "fat_g": 1, "carbohydrates_g": 1},
+              "ingredients": [{"name": "chicken thighs", "amount": "500 g"}, {"name": "rice", "amount": "200 g"}]}
+    checked = check_recipe(recipe, None)
+    assert checked["nutrition_source"] == "table"
+    assert checked["nutrition_check"]["model_calories"] == 900
+    assert "nutrition_source" not in recipe
+
+    unchecked = check_recipe(dict(recipe, ingredients=[{"name": "dragon fruit jam", "amount": "1 jar"}]), None)
+    assert unchecked["nutrition_check"]["status"] == "unchecked"
+    assert "nutrition_source" not in unchecked
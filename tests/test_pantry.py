@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from pantry import PantryIndex, ingredient_key, parse_pantry
+
+VOCABULARY = ["chicken", "rice", "onion", "garlic", "carrot", "spinach", "feta", "egg", "tofu", "soy sauce",
+              "lemon juice", "parsley", "potato", "tomato", "basil", "mozzarella", "lentil", "cumin",
+              "coriander", "ginger", "mushroom", "butter", "cream", "pasta", "shallot", "leek", "bacon", "pea"]
+STAPLES = ["salt", "pepper", "olive oil"]
+
+
+def make_recipes(count, seed=1):
+    rng = random.Random(seed)
+    recipes = {}
+    for recipe_id in range(1, count + 1):
+        names = rng.sample(VOCABULARY, rng.randint(1, 8)) + rng.sample(STAPLES, rng.randint(0, 2))
+        recipes[recipe_id] = {"ingredients": [{"name": name, "amount": "1"} for name in names]}
+    return recipes
+
+
+def brute_force(recipes, order, pantry, min_coverage, limit):
+    """Rank recipes the slow way: coverage, then matched ingredients, then the most recently added"""
+    pantry_keys = {ingredient_key(name) for name in pantry}
+    staples = {ingredient_key(name) for name in STAPLES}
+    ranked = []
+    for position, recipe_id in enumerate(order):
+        keys = {ingredient_key(item["name"]) for item in recipes[recipe_id]["ingredients"]} - staples
+        matched = len(keys & pantry_keys)
+        if keys and matched and matched / len(keys) >= min_coverage:
+            ranked.append((matched / len(keys), matched, position, recipe_id, keys - pantry_keys))
+    ranked.sort(reverse=True)
+    return [(recipe_id, coverage, matched, missing) for coverage, matched, _, recipe_id, missing in ranked[:limit]]
+
+
+def as_tuples(matches):
+    return [(match.recipe_id, match.coverage, match.matched, set(match.missing)) for match in matches]
+
+
+@pytest.mark.parametrize("min_coverage", [0.0, 0.5, 0.75, 1.0])
+def test_search_matches_a_brute_force_ranking(min_coverage):
+    recipes = make_recipes(2000)
+    index = PantryIndex(STAPLES)
+    for recipe_id, recipe_data in recipes.items():
+        index.add(recipe_id, recipe_data)
+
+    # Removing and re-adding recipes must not disturb the ranking
+    order = list(recipes)
+    rng = random.Random(2)
+    for recipe_id in rng.sample(order, 200):
+        index.remove(recipe_id)
+        order.remove(recipe_id)
+    for recipe_id in rng.sample(order, 50):
+        recipes[recipe_id] = make_recipes(1, seed=recipe_id)[1]
+        index.add(recipe_id, recipes[recipe_id])
+        order.remove(recipe_id)
+        order.append(recipe_id)
+    assert len(index) == len(order)
+
+    for _ in range(25):
+        pantry = rng.sample(VOCABULARY, rng.randint(1, 12))
+        expected = brute_force(recipes, order, pantry, min_coverage, 20)
+        assert as_tuples(index.search(pantry, min_coverage=min_coverage, limit=20)) == expected
+
+
+def test_ingredient_names_are_normalized():
+    index = PantryIndex(STAPLES)
+    index.add(1, {"ingredients": [{"name": "2 boneless, skinless chicken thighs", "amount": "2"},
+                                  {"name": "Fresh baby spinach", "amount": "1 cup"},
+                                  {"name": "Salt", "amount": "to taste"}]})
+    [match] = index.search(parse_pantry("chicken thigh; spinach\nrice"))
+    assert (match.recipe_id, match.coverage, match.missing) == (1, 1.0, [])
+
+
+def test_unknown_pantry_items_match_nothing():
+    index = PantryIndex(STAPLES)
+    index.add(1, {"ingredients": [{"name": "rice", "amount": "1 cup"}]})
+    assert index.search(["unobtainium"]) == []
@@ -0,0 +1,79 @@
+import time
+
+import recipe_generator
+from prefetch import RecipePrefetcher
+
+FORM = {"cuisine": "Thai", "centerpiece": "tofu", "calories": 500, "servings": 2, "prep_time": 30,
+        "additional_info": ""}
+
+
+def make_generator(tmp_path, **config):
+    return recipe_generator.RecipeGenerator(dict({
+        "model": "gpt-3.5-turbo",
+        "stream": False,
+        "cache": {"enabled": False},
+        "nutrition": {"enabled": False},
+        "history": {"enabled": False},
+        "resilience": {"max_retries": 0}
+    }, **config))
+
+
+def wait_idle(prefetcher, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while prefetcher._in_flight and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_prefetched_recipes_are_served_for_the_same_form_only(tmp_path, fake_llm):
+    prefetcher = RecipePrefetcher(make_generator(tmp_path), count=2, budget=10)
+    prefetcher.start(FORM)
+    wait_idle(prefetcher)
+
+    assert prefetcher.take(dict(FORM, calories=600)) is None
+    first, second = prefetcher.take(FORM), prefetcher.take(FORM)
+    assert first["title"] != second["title"]
+    assert prefetcher.take(FORM) is None
+    prefetcher.shutdown()
+
+
+def test_budget_limits_prefetches_per_session(tmp_path, fake_llm):
+    prefetcher = RecipePrefetcher(make_generator(tmp_path), count=2, budget=3)
+    for _ in range(3):
+        prefetcher.start(FORM)
+        wait_idle(prefetcher)
+        while prefetcher.take(FORM) is not None:
+            pass
+    assert prefetcher.used == 3
+    assert fake_llm.calls == 3
+    prefetcher.shutdown()
+
+
+def test_cancel_discards_the_running_prefetch_and_skips_queued_ones(tmp_path, fake_llm):
+    fake_llm.latency = 0.2
+    prefetcher = RecipePrefetcher(make_generator(tmp_path), count=2, budget=10)
+    prefetcher.start(FORM)
+    time.sleep(0.05)
+    prefetcher.cancel()
+    time.sleep(0.3)
+
+    assert prefetcher.take(FORM) is None
+    assert fake_llm.calls == 1
+    assert prefetcher.used == 1  # the queued prefetch never ran, so it is not charged
+    prefetcher.shutdown()
+
+
+def test_prefetch_only_fills_missing_cache_entries(tmp_path, fake_llm):
+    generator = make_generator(tmp_path, cache={"directory": str(tmp_path / "cache")})
+    shown = generator.generate_recipe(**FORM)
+    prefetcher = RecipePrefetcher(generator, count=1, budget=10)
+    prefetcher.start(FORM)
+    wait_idle(prefetcher)
+    assert generator.generate_recipe(**FORM) == shown
+    assert prefetcher.take(FORM)["title"] != shown["title"]
+
+    other = dict(FORM, centerpiece="tempeh")
+    prefetcher.start(other)
+    wait_idle(prefetcher)
+    assert generator.generate_recipe(**other) == prefetcher.take(other)
+    assert fake_llm.calls == 3
+    prefetcher.shutdown()
@@ -0,0 +1,73 @@
+import pytest
+
+from quantities import METRIC, US, convert_quantity, format_quantity, parse_amount, scale_amount, split_amount
+from recipe_scaling import rescale_amount
+
+
+@pytest.mark.parametrize("amount, value, unit", [
+    ("1 1/2 cups", 1.5, "cup"),
+    ("1½ cups", 1.5, "cup"),
+    ("½ tsp", 0.5, "tsp"),
+    ("200g", 200, "g"),
+    ("about 3 oz", 3, "oz"),
+    ("2 fl oz", 2, "fl oz"),
+    ("a pinch", 1, "pinch"),
+    ("2-3 tbsp", 2.5, "tbsp"),
+    ("2 (14 oz) cans", 28, "oz"),
+])
+def test_parse_amount(amount, value, unit):
+    quantity = parse_amount(amount)
+    assert quantity.value == pytest.approx(value)
+    assert quantity.unit.name == unit
+
+
+def test_words_that_are_not_units_stay_in_the_remainder():
+    parsed = split_amount("2 eggs, beaten")
+    assert parsed.quantity.value == 2 and parsed.quantity.unit is None
+    assert parsed.remainder == " eggs, beaten"
+    assert parse_amount("to taste") is None
+
+
+@pytest.mark.parametrize("amount, factor, expected", [
+    ("1 1/2 cups", 2, "3 cups"),
+    ("2-3 tbsp", 2, "4-6 tbsp"),
+    ("200g", 1.5, "300g"),
+    ("to taste", 2, "to taste"),
+])
+def test_scale_amount(amount, factor, expected):
+    assert scale_amount(amount, factor) == expected
+
+
+@pytest.mark.parametrize("amount, system, expected", [
+    ("2 cups", METRIC, "475 ml"),
+    ("1200 ml", METRIC, "1.2 l"),
+    ("1 tbsp", METRIC, "1 tbsp"),
+    ("500 g", US, "1 lb"),
+    ("60 ml", US, "1/4 cup"),
+    ("a pinch", US, "1 pinch"),
+])
+def test_convert_quantity(amount, system, expected):
+    assert format_quantity(convert_quantity(parse_amount(amount), system)) == expected
+
+
+@pytest.mark.parametrize("amount, factor, units, expected", [
+    ("a pinch", 2, None, "2 pinches"),
+    ("1 (400g) can", 2, None, "2 (400g) cans"),
+    ("1 clove garlic", 3, None, "3 cloves garlic"),
+    ("3 cloves", 1 / 3, None, "1 clove"),
+    ("1 1/2 cups, packed", 0.5, None, "3/4 cup, packed"),
+    ("2 Tins", 0.5, None, "1 Tin"),
+    ("1 lb", 2, None, "2 lb"),
+    ("a dash", 3, METRIC, "3 dashes"),
+])
+def test_scaled_units_are_made_plural_or_singular(amount, factor, units, expected):
+    assert rescale_amount(amount, factor, units) == expected
+
+
+@pytest.mark.parametrize("amount, factor, units, expected", [
+    ("2 (14 oz) cans", 1, METRIC, "2 (395 g) cans"),
+    ("1 (400g) can", 2, US, "2 (14 oz) cans"),
+    ("2 (14 oz) cans", 2, US, "4 (14 oz) cans"),
+])
+def test_conversion_keeps_the_package(amount, factor, units, expected):
+    assert rescale_amount(amount, factor, units) == expected
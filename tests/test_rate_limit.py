@@ -0,0 +1,29 @@
+import pytest
+
+from rate_limit import TokenBucket
+
+
+def test_a_full_bucket_allows_a_burst_of_one_minute():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    assert bucket.time_until(60, now) == 0.0
+    bucket.take(60)
+    assert bucket.time_until(1, now) == pytest.approx(1.0)
+
+
+def test_the_bucket_refills_at_its_rate_up_to_capacity():
+    bucket = TokenBucket(120)
+    now = bucket.updated
+    bucket.take(120)
+    assert bucket.time_until(10, now + 2) == pytest.approx(3.0)
+    assert bucket.time_until(120, now + 3600) == 0.0
+    assert bucket.level == 120
+
+
+def test_requests_larger_than_the_bucket_wait_for_a_full_one():
+    bucket = TokenBucket(1000)
+    now = bucket.updated
+    assert bucket.time_until(5000, now) == 0.0
+    bucket.take(5000)
+    assert bucket.level == 0
+    assert bucket.time_until(5000, now) == pytest.approx(60.0)
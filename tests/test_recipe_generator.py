@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+import recipe_generator
+from fake_llm import FakeLiteLLM
+
+
+def make_generator(tmp_path, **config):
+    return recipe_generator.RecipeGenerator(dict({
+        "model": "gpt-3.5-turbo",
+        "stream": False,
+        "cache": {"enabled": False},
+        "nutrition": {"enabled": False},
+        "history": {"path": str(tmp_path / "history.db")},
+        "resilience": {"max_retries": 0}
+    }, **config))
+
+
+def test_similar_recipes_are_only_reused_when_asked_for(tmp_path, fake_llm):
+    generator = make_generator(tmp_path)
+    first = generator.generate_recipe("Thai", "chicken thighs", 500, 4, 30, "")
+    assert "from_history" not in first
+
+    again = generator.generate_recipe("Thai", "chicken thighs", 500, 4, 30, "")
+    assert fake_llm.calls == 2
+    assert "from_history" not in again
+
+    reused = generator.generate_recipe("Thai", "chicken thighs", 520, 4, 30, "", reuse_similar=True)
+    assert fake_llm.calls == 2
+    assert reused["title"] in (first["title"], again["title"])
+    assert reused["from_history"]["recipe_id"] in (1, 2)
+    assert 0 < reused["from_history"]["similarity"] <= 1
+
+    generator.generate_recipe("Thai", "chicken thighs", 500, 4, 30, "", reuse_similar=True, refresh=True)
+    assert fake_llm.calls == 3
+
+
+def test_cache_key_covers_output_settings(tmp_path, fake_llm):
+    cache = {"directory": str(tmp_path / "cache")}
+    first = make_generator(tmp_path, cache=cache).generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert make_generator(tmp_path, cache=cache).generate_recipe("Thai", "tofu", 500, 4, 30, "") == first
+    assert fake_llm.calls == 1
+
+    make_generator(tmp_path, cache=cache, structured_output=False).generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert fake_llm.calls == 2
+    make_generator(tmp_path, cache=cache, nutrition={"enabled": True}).generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert fake_llm.calls == 3
+
+
+def test_cache_key_ignores_config_edits_that_change_nothing(tmp_path, fake_llm):
+    def key(**config):
+        return make_generator(tmp_path, **config)._cache_key("prompt")
+
+    default = key(nutrition={})
+    assert key(nutrition={"enabled": True}) == default
+    assert key(nutrition={"calorie_tolerance": 0.15, "min_coverage": 0.75, "auto_scale": False}) == default
+    assert key(nutrition={"auto_scale": True}) != default
+    assert key(nutrition={"enabled": False}) == key(nutrition={"enabled": False, "calorie_tolerance": 0.3})
+    assert key(nutrition={"enabled": False}) != default
+    assert key(nutrition={}, max_tokens=None) == key(nutrition={}, max_tokens=recipe_generator.DEFAULT_MAX_TOKENS)
+
+
+def test_prefetch_only_fills_missing_cache_entries(tmp_path, fake_llm):
+    generator = make_generator(tmp_path, cache={"directory": str(tmp_path / "cache")})
+    shown = generator.generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    prefetched = generator.generate_recipe("Thai", "tofu", 500, 4, 30, "", refresh=True, replace_cached=False)
+    assert prefetched["title"] != shown["title"]
+    assert generator.generate_recipe("Thai", "tofu", 500, 4, 30, "") == shown
+
+    other = generator.generate_recipe("Thai", "tempeh", 500, 4, 30, "", refresh=True, replace_cached=False)
+    assert generator.generate_recipe("Thai", "tempeh", 500, 4, 30, "") == other
+    assert fake_llm.calls == 3
+
+
+def test_identical_request_is_reused_when_nutrition_changes_the_calories(tmp_path, fake_llm):
+    generator = make_generator(tmp_path, nutrition={"enabled": True})
+    first = generator.generate_recipe("Thai", "chicken breast", 500, 4, 30, "", reuse_similar=True)
+    assert first["nutrition_check"]["status"] != "unchecked"
+    assert first["calories_per_serving"] != 500
+
+    again = generator.generate_recipe("Thai", "chicken breast", 500, 4, 30, "", reuse_similar=True)
+    assert fake_llm.calls == 1
+    assert again["from_history"]["recipe_id"] == 1
+    assert again["calories_per_serving"] == first["calories_per_serving"]
+
+
+class FlakyBatchLLM(FakeLiteLLM):
+    """Fails any request for "durian" and answers the others after a delay set per centerpiece"""
+
+    delays = {"lamb": 0.15, "tofu": 0.0, "duck": 0.08}
+
+    async def acompletion(self, model, messages, n=1, **kwargs):
+        prompt = messages[-1]["content"]
+        if "durian" in prompt.lower():
+            raise RuntimeError("provider rejected the request")
+        await asyncio.sleep(next(delay for name, delay in self.delays.items() if name in prompt.lower()))
+        return await super().acompletion(model, messages, n=n, **kwargs)
+
+
+@pytest.mark.parametrize("synchronous", [False, True])
+def test_batch_failure_is_isolated_and_results_map_to_their_specs(tmp_path, synchronous):
+    recipe_generator.use_backend(FlakyBatchLLM())
+    try:
+        generator = make_generator(tmp_path, history={"enabled": False})
+        specs = [{"cuisine": "Thai", "centerpiece": name, "calories": 500, "servings": 2, "prep_time": 30,
+                  "additional_info": ""} for name in ("lamb", "durian", "tofu", "duck")]
+        if synchronous:
+            results = list(generator.generate_many(specs, concurrency=4))
+        else:
+            async def collect():
+                return [result async for result in generator.agenerate_many(specs, concurrency=4)]
+            results = asyncio.run(collect())
+    finally:
+        recipe_generator.use_backend(None)
+
+    assert [result.spec["centerpiece"] for result in results] == ["durian", "tofu", "duck", "lamb"]
+    by_index = sorted(results, key=lambda result: result.index)
+    assert [result.spec for result in by_index] == specs
+    failed = by_index[1]
+    assert failed.recipe is None and "provider rejected" in str(failed.error)
+    for result in by_index[:1] + by_index[2:]:
+        assert result.error is None
+        assert result.spec["centerpiece"] in result.recipe["ingredients"][0]["name"]
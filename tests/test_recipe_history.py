@@ -0,0 +1,82 @@
+import json
+import sqlite3
+
+from recipe_history import SCHEMA, RecipeHistory
+
+
+def test_history_created_before_requested_calories_still_matches(tmp_path):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA.replace("    requested_calories INTEGER,\n", ""))
+    conn.close()
+
+    history = RecipeHistory(path)
+    history.add({"title": "Pad Krapow", "calories_per_serving": 480, "prep_time_minutes": 20, "servings": 2},
+                {"cuisine": "Thai", "centerpiece": "chicken", "calories": 600})
+    assert history.find_similar("Thai", "chicken", 600, 2, 30).recipe["title"] == "Pad Krapow"
+    assert history.find_similar("Thai", "chicken", 480, 2, 30) is None
+    history.close()
+
+
+def make_recipe(title, cuisine, calories, ingredients, description=""):
+    return {"title": title, "description": description, "cuisine": cuisine, "servings": 2,
+            "calories_per_serving": calories, "prep_time_minutes": 20,
+            "ingredients": [{"name": name, "amount": "1"} for name in ingredients],
+            "instructions": ["Cook everything."]}
+
+
+def make_history(tmp_path):
+    history = RecipeHistory(str(tmp_path / "history.db"))
+    history.add(make_recipe("Lemon Chicken", "Greek", 450, ["chicken thighs", "lemon"], "Bright and zesty"),
+                {"cuisine": "Greek"}, created=1)
+    history.add(make_recipe("Chicken Souvlaki", "Greek", 650, ["chicken breast", "pita"]), {"cuisine": "Greek"},
+                created=2)
+    history.add(make_recipe("Lemongrass Tofu", "Thai (Northern)", 400, ["tofu", "lemongrass"]),
+                {"cuisine": "Thai (Northern)"}, created=3)
+    return history
+
+
+def titles(rows):
+    return [row["title"] for row in rows]
+
+
+def test_search_matches_words_as_prefixes_and_filters(tmp_path):
+    history = make_history(tmp_path)
+    assert titles(history.search()) == ["Lemongrass Tofu", "Chicken Souvlaki", "Lemon Chicken"]
+    assert sorted(titles(history.search("lemon"))) == ["Lemon Chicken", "Lemongrass Tofu"]
+    assert titles(history.search("zest chick")) == ["Lemon Chicken"]
+    assert titles(history.search("chicken", cuisine="greek", max_calories=500)) == ["Lemon Chicken"]
+    assert titles(history.search("chicken", min_calories=500)) == ["Chicken Souvlaki"]
+    assert titles(history.search(cuisine="Thai")) == ["Lemongrass Tofu"]
+    assert titles(history.search(cuisine="%")) == []
+    history.close()
+
+
+def test_search_text_with_punctuation_is_not_an_fts_syntax_error(tmp_path):
+    history = make_history(tmp_path)
+    assert titles(history.search('"lemon')) == titles(history.search("lemon"))
+    assert titles(history.search('chicken -souvlaki "')) == ["Chicken Souvlaki"]
+    assert titles(history.search("AND OR NOT * ( )")) == []
+    assert titles(history.search('"""')) == titles(history.search())
+    history.close()
+
+
+def test_import_debug_logs_reads_both_formats_and_skips_duplicates(tmp_path):
+    logs = tmp_path / "debug_logs"
+    logs.mkdir()
+    (logs / "recipe_data_20240102_030405.json").write_text(json.dumps(make_recipe("Old", "Thai", 500, ["rice"])))
+    (logs / "recipe_data_20240102_030406.json").write_text("{broken")
+    lines = [
+        json.dumps({"time": "2024-03-01T10:00:00", "type": "recipe", "data": make_recipe("New", "Thai", 500, ["egg"])}),
+        json.dumps({"time": "2024-03-01T10:00:01", "type": "error", "message": "timeout"}),
+        json.dumps({"time": "2024-03-01T10:00:02", "type": "recipe", "data": {"title": "No ingredients"}}),
+        "not json"
+    ]
+    (logs / "recipegenie.jsonl").write_text("\n".join(lines) + "\n")
+    (logs / "recipegenie.jsonl.1").write_text(lines[0] + "\n")
+
+    history = RecipeHistory(str(tmp_path / "history.db"))
+    assert history.import_debug_logs(str(logs)) == (2, 4)
+    assert titles(history.search()) == ["New", "Old"]
+    assert history.import_debug_logs(str(logs)) == (0, 6)
+    history.close()
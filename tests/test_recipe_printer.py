@@ -0,0 +1,89 @@
+import os
+import stat
+import sys
+import time
+
+import pytest
+
+import recipe_printer
+from fake_llm import synthetic_recipe
+from recipe_printer import PRINT_DONE, PRINT_FAILED, PRINT_PRINTING, PRINT_QUEUED, PrintQueue
+
+RECIPES = [synthetic_recipe("Thai tofu", 4, 3, 1), synthetic_recipe("Greek lamb", 4, 3, 2)]
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="the stub lpr is a shell script")
+
+
+@pytest.fixture
+def fake_lpr(tmp_path, monkeypatch):
+    """An lpr on PATH that saves its arguments and stdin, and fails if $LPR_FAIL is set"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    script = bin_dir / "lpr"
+    script.write_text(
+        "#!/bin/sh\n"
+        f'printf "%s\\n" "$@" > "{tmp_path}/args"\n'
+        f'cat > "{tmp_path}/stdin"\n'
+        'if [ -n "$LPR_FAIL" ]; then echo "no default destination" >&2; exit 1; fi\n'
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return tmp_path
+
+
+def wait_for_events(print_queue, count, timeout=5.0):
+    events = []
+    deadline = time.monotonic() + timeout
+    while len(events) < count and time.monotonic() < deadline:
+        events.extend(print_queue.poll())
+        time.sleep(0.01)
+    return events
+
+
+def test_recipes_are_piped_to_lpr_as_one_titled_job(fake_lpr):
+    print_queue = PrintQueue()
+    job = print_queue.submit(RECIPES, title="Week plan")
+    events = wait_for_events(print_queue, 3)
+    print_queue.shutdown(timeout=5)
+
+    assert [(event_job.job_id, status) for event_job, status in events] == [
+        (job.job_id, PRINT_QUEUED), (job.job_id, PRINT_PRINTING), (job.job_id, PRINT_DONE)]
+    assert (fake_lpr / "args").read_text().splitlines() == ["-T", "Week plan"]
+    printed = (fake_lpr / "stdin").read_text(encoding="utf-8")
+    assert printed.count("\f") == 1
+    assert RECIPES[0]["title"].upper() in printed and RECIPES[1]["title"].upper() in printed
+    assert print_queue.pending() == 0
+
+
+def test_a_failing_lpr_fails_the_job_with_its_message(fake_lpr, monkeypatch):
+    monkeypatch.setenv("LPR_FAIL", "1")
+    print_queue = PrintQueue(command="lpr -P kitchen")
+    job = print_queue.submit(RECIPES[:1])
+    events = wait_for_events(print_queue, 3)
+    print_queue.shutdown(timeout=5)
+
+    assert events[-1] == (job, PRINT_FAILED)
+    assert "no default destination" in job.error
+    assert (fake_lpr / "args").read_text().splitlines() == ["-P", "kitchen", "-T", RECIPES[0]["title"]]
+
+
+def test_a_missing_print_command_fails_the_job(monkeypatch):
+    print_queue = PrintQueue(command="no-such-print-command")
+    job = print_queue.submit(RECIPES[:1])
+    events = wait_for_events(print_queue, 3)
+    print_queue.shutdown(timeout=5)
+    assert events[-1] == (job, PRINT_FAILED)
+    assert "not found" in job.error
+
+
+def test_windows_print_files_are_removed_afterwards(monkeypatch):
+    printed = []
+    monkeypatch.setattr(os, "startfile", lambda path, verb: printed.append(path), raising=False)
+    monkeypatch.setattr(recipe_printer, "WINDOWS_PRINT_FILE_SECONDS", 0.05)
+    PrintQueue._print_windows("A recipe")
+
+    assert len(printed) == 1 and os.path.exists(printed[0])
+    deadline = time.monotonic() + 5
+    while os.path.exists(printed[0]) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not os.path.exists(printed[0])
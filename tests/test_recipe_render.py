@@ -0,0 +1,72 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from recipe_render import RENDERERS, RecipeExporter, export_recipes, get_renderer, renderer_for_path
+
+
+def make_recipe(title, check=None):
+    recipe = {"title": title, "description": "Quick & easy <weeknight> dinner.", "cuisine": "Thai", "servings": 2,
+              "calories_per_serving": 450, "prep_time_minutes": 15, "cook_time_minutes": 20,
+              "ingredients": [{"name": "rice noodles", "amount": "200 g"}, {"name": "egg", "amount": "2"}],
+              "instructions": ["Soak the noodles.", "Fry everything together."],
+              "nutrition": {"calories": 450, "protein_g": 18, "fat_g": 12, "carbohydrates_g": 60}}
+    if check:
+        recipe["nutrition_check"] = check
+    return recipe
+
+
+RECIPES = [make_recipe("Pad Thai"), make_recipe("Green Curry!", {"status": "ok", "coverage": 0.9}),
+           make_recipe("Pad Thai")]
+
+
+def test_zip_export_round_trips_one_file_per_recipe(tmp_path):
+    path = str(tmp_path / "recipes.zip")
+    assert export_recipes(iter(RECIPES), path, "json") == 3
+
+    with zipfile.ZipFile(path) as archive:
+        assert archive.namelist() == ["Pad_Thai.json", "Green_Curry.json", "0003-Pad_Thai.json"]
+        assert [json.loads(archive.read(name)) for name in archive.namelist()] == RECIPES
+
+
+@pytest.mark.parametrize("fmt", sorted(RENDERERS))
+def test_zip_export_in_every_format(tmp_path, fmt):
+    renderer = get_renderer(fmt)
+    path = str(tmp_path / "recipes.zip")
+    export_recipes(RECIPES[:2], path, fmt)
+
+    with zipfile.ZipFile(path) as archive:
+        names = archive.namelist()
+        assert names == ["Pad_Thai" + renderer.extension, "Green_Curry" + renderer.extension]
+        assert [archive.read(name).decode("utf-8") for name in names] == [renderer.render(r) for r in RECIPES[:2]]
+
+
+def test_combined_documents(tmp_path):
+    stream = io.StringIO()
+    export_recipes(RECIPES, stream, "json")
+    assert [json.loads(line) for line in stream.getvalue().splitlines()] == RECIPES
+
+    path = str(tmp_path / "week.html")
+    export_recipes(RECIPES, path, "html", title="Week <1>")
+    with open(path, encoding="utf-8") as f:
+        document = f.read()
+    assert document.count("<html") == 1 and document.count("<article") == 3
+    assert "<title>Week &lt;1&gt;</title>" in document
+    assert "Quick &amp; easy &lt;weeknight&gt; dinner." in document
+    assert document.endswith("</html>\n")
+
+    stream = io.StringIO()
+    with RecipeExporter(stream, "markdown") as exporter:
+        exporter.write_all(RECIPES)
+    assert stream.getvalue().count("\n---\n") == 2
+    assert "> Nutrition estimated from the ingredient list." in stream.getvalue()
+    assert not stream.closed
+
+
+def test_formats_are_chosen_by_name_or_extension():
+    assert renderer_for_path("plan.MD").name == "markdown"
+    assert renderer_for_path("plan.pdf").name == "text"
+    with pytest.raises(ValueError, match="Unknown format 'pdf'"):
+        get_renderer("pdf")
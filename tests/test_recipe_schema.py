@@ -0,0 +1,63 @@
+import copy
+import json
+
+import pytest
+
+from fake_llm import synthetic_recipe
+from recipe_schema import coerce_types, extract_json, validate
+
+RECIPE = synthetic_recipe("Thai tofu", 3, 2, 1)
+
+
+def test_numbers_written_as_text_are_accepted():
+    recipe = copy.deepcopy(RECIPE)
+    recipe.update(servings="4", calories_per_serving="450 kcal", prep_time_minutes="12.5",
+                  cook_time_minutes="20 minutes")
+    recipe["nutrition"]["protein_g"] = "30g"
+    recipe["ingredients"][0]["amount"] = 2
+
+    assert validate(coerce_types(recipe)) == []
+    assert recipe["servings"] == 4
+    assert recipe["calories_per_serving"] == 450
+    assert recipe["prep_time_minutes"] == 12.5
+    assert recipe["cook_time_minutes"] == 20
+    assert recipe["nutrition"]["protein_g"] == 30
+    assert recipe["ingredients"][0]["amount"] == "2"
+
+
+def test_text_that_is_not_a_number_is_still_rejected():
+    recipe = dict(copy.deepcopy(RECIPE), servings="four", calories_per_serving="2.5")
+    assert validate(coerce_types(recipe)) == ["servings must be an integer, not str"]
+    assert recipe["calories_per_serving"] == 2.5
+
+
+def test_fractional_servings_stay_invalid():
+    recipe = dict(copy.deepcopy(RECIPE), servings="2.5")
+    assert validate(coerce_types(recipe)) == ["servings must be an integer, not str"]
+
+
+def test_generator_accepts_numeric_strings_without_retrying(generator, fake_llm):
+    recipe = dict(copy.deepcopy(RECIPE), servings="4", calories_per_serving="450")
+    fake_llm.responses = [json.dumps(recipe)]
+    recipe_data = generator.generate_recipe("Thai", "tofu", 450, 4, 30, "")
+    assert fake_llm.calls == 1
+    assert recipe_data["servings"] == 4
+
+
+def test_extract_json_from_structured_output():
+    assert extract_json(json.dumps(RECIPE)) == RECIPE
+
+
+def test_extract_json_skips_commentary_and_fences():
+    text = "Sure! Here it is:\n```json\n" + json.dumps(RECIPE, indent=2) + "\n```\nEnjoy {your} meal."
+    assert extract_json(text) == RECIPE
+
+
+def test_extract_json_prefers_the_recipe_over_other_objects():
+    text = 'Format: {"example": true}\n' + json.dumps(RECIPE) + '\nNotes: {"salt": "to taste"}'
+    assert extract_json(text) == RECIPE
+
+
+def test_extract_json_without_an_object_raises():
+    with pytest.raises(ValueError):
+        extract_json("Sorry, I cannot help with that.")
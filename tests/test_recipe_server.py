@@ -0,0 +1,111 @@
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from recipe_server import RecipeService, make_server
+from recipegenie import make_spec
+
+SPEC = make_spec({"cuisine": "Thai", "centerpiece": "tofu"})
+
+
+def generate_concurrently(service, count):
+    results = [None] * count
+    errors = []
+
+    def call(i):
+        try:
+            results[i] = service.generate(SPEC)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_identical_requests_share_one_completion(generator, fake_llm):
+    fake_llm.latency = 0.3
+    service = RecipeService(generator, request_timeout=5)
+    results, errors = generate_concurrently(service, 5)
+    service.close()
+
+    assert not errors
+    assert fake_llm.calls == 1
+    assert len({json.dumps(recipe, sort_keys=True) for recipe, _ in results}) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True, True]
+    assert service.snapshot() == {"requests": 5, "coalesced": 4, "upstream": 1, "errors": 0, "timeouts": 0,
+                                  "in_flight": 0}
+
+
+def test_leader_times_out_and_later_callers_share_the_running_generation(generator, fake_llm):
+    fake_llm.latency = 1.0
+    service = RecipeService(generator, request_timeout=0.1)
+    started = time.perf_counter()
+    with pytest.raises(FutureTimeoutError):
+        service.generate(SPEC)
+    assert time.perf_counter() - started < 0.5
+
+    with pytest.raises(FutureTimeoutError):
+        service.generate(SPEC)
+    snapshot = service.snapshot()
+    service.close()
+    assert snapshot["timeouts"] == 2
+    assert snapshot["upstream"] == 1
+    assert snapshot["coalesced"] == 1
+    assert snapshot["in_flight"] == 1
+
+
+def test_errors_are_counted_and_not_coalesced_afterwards(generator, fake_llm):
+    fake_llm.responses = ["not a recipe"]
+    service = RecipeService(generator, request_timeout=5)
+    with pytest.raises(ValueError):
+        service.generate(SPEC)
+    with pytest.raises(ValueError):
+        service.generate(SPEC)
+    service.close()
+    assert service.snapshot()["errors"] == 2
+    assert service.snapshot()["upstream"] == 2
+
+
+@pytest.fixture
+def server(generator):
+    server = make_server(generator, port=0, request_timeout=0.2, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    server.service.close()
+
+
+def post_recipe(server, body):
+    host, port = server.server_address[:2]
+    request = urllib.request.Request(f"http://{host}:{port}/recipe", data=json.dumps(body).encode('utf-8'),
+                                     headers={"Content-Type": "application/json"})
+    return urllib.request.urlopen(request, timeout=5)
+
+
+def test_http_recipe_and_timeout(server, fake_llm):
+    with post_recipe(server, {"cuisine": "Thai", "centerpiece": "tofu"}) as response:
+        assert response.status == 200
+        assert response.headers["X-Recipe-Coalesced"] == "0"
+        assert json.loads(response.read())["ingredients"]
+
+    fake_llm.latency = 1.0
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post_recipe(server, {"cuisine": "Greek", "centerpiece": "lamb"})
+    assert error.value.code == 504
+
+
+def test_http_rejects_invalid_requests(server):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        post_recipe(server, {"cuisine": "Thai"})
+    assert error.value.code == 400
@@ -0,0 +1,123 @@
+import json
+import threading
+import time
+
+import pytest
+
+import recipe_generator
+from fake_llm import FakeLiteLLM
+from resilience import LLMCallError
+
+
+class RateLimitError(Exception):
+    """Named like LiteLLM's, so ResiliencePolicy treats it as transient"""
+
+
+class AuthenticationError(Exception):
+    """Not in TRANSIENT_ERRORS, so it is never retried"""
+
+
+class ScriptedLLM(FakeLiteLLM):
+    """Answers each model's calls in turn from a script: an exception to raise, or seconds to wait first
+
+    Recipes are titled after the model that wrote them. Once a model's script
+    runs out its calls succeed at once.
+    """
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = {model: list(steps) for model, steps in script.items()}
+        self.models = []
+        self.finished = []
+        self._script_lock = threading.Lock()
+
+    def completion(self, model, messages, stream=False, **kwargs):
+        with self._script_lock:
+            self.models.append(model)
+            steps = self.script.get(model)
+            step = steps.pop(0) if steps else 0
+        if isinstance(step, Exception):
+            raise step
+        time.sleep(step)
+        response = super().completion(model, messages, **kwargs)
+        text = response.choices[0].message.content
+        recipe = json.loads(text[text.index("{"):])
+        recipe["title"] = f"{model} recipe"
+        response.choices[0].message.content = json.dumps(recipe)
+        self.finished.append(model)
+        if stream:
+            return self._chunks(model, response.choices[0].message.content)
+        return response
+
+
+def install(script, tmp_path, **resilience):
+    llm = ScriptedLLM(script)
+    recipe_generator.use_backend(llm)
+    generator = recipe_generator.RecipeGenerator({
+        "model": "primary",
+        "stream": False,
+        "cache": {"enabled": False},
+        "nutrition": {"enabled": False},
+        "history": {"path": str(tmp_path / "history.db")},
+        "resilience": dict({"max_retries": 1, "backoff_seconds": 0.01}, **resilience)
+    })
+    return llm, generator
+
+
+@pytest.fixture(autouse=True)
+def restore_backend():
+    yield
+    recipe_generator.use_backend(None)
+
+
+def test_transient_error_is_retried(tmp_path):
+    llm, generator = install({"primary": [RateLimitError("slow down")]}, tmp_path)
+    recipe = generator.generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert recipe["title"] == "primary recipe"
+    assert llm.models == ["primary", "primary"]
+
+
+def test_running_out_of_retries_raises_llm_call_error(tmp_path):
+    llm, generator = install({"primary": [RateLimitError("slow down")] * 3}, tmp_path)
+    with pytest.raises(LLMCallError) as raised:
+        generator.generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert isinstance(raised.value.__cause__, RateLimitError)
+    assert llm.models == ["primary", "primary"]
+    assert generator.history.count() == 0
+
+
+def test_permanent_error_switches_to_the_fallback_model(tmp_path):
+    llm, generator = install({"primary": [AuthenticationError("bad key")]}, tmp_path, fallback_models=["backup"])
+    recipe = generator.generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert recipe["title"] == "backup recipe"
+    assert llm.models == ["primary", "backup"]
+
+
+def test_hedged_request_wins_and_the_slow_result_is_dropped(tmp_path):
+    llm, generator = install({"primary": [0.5]}, tmp_path, fallback_models=["backup"], hedge_after_seconds=0.05)
+    started = time.perf_counter()
+    recipe = generator.generate_recipe("Thai", "tofu", 500, 4, 30, "")
+    assert time.perf_counter() - started < 0.4
+    assert recipe["title"] == "backup recipe"
+    assert llm.models == ["primary", "backup"]
+
+    time.sleep(0.6)
+    assert llm.finished == ["backup", "primary"]
+    assert [row["title"] for row in generator.history.search()] == ["backup recipe"]
+
+
+def test_fast_primary_is_not_hedged(tmp_path):
+    llm, generator = install({}, tmp_path, fallback_models=["backup"], hedge_after_seconds=0.5)
+    assert generator.generate_recipe("Thai", "tofu", 500, 4, 30, "")["title"] == "primary recipe"
+    assert llm.models == ["primary"]
+
+
+def test_stream_that_fails_before_any_field_is_retried_without_streaming(tmp_path):
+    llm, generator = install({"primary": [RateLimitError("slow down")]}, tmp_path)
+    generator.stream = True
+    events = []
+    recipe = generator.generate_recipe("Thai", "tofu", 500, 4, 30, "",
+                                       on_event=lambda kind, key, value: events.append(key))
+    assert recipe["title"] == "primary recipe"
+    assert llm.models == ["primary", "primary"]
+    assert "title" in events
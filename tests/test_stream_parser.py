@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from fake_llm import synthetic_recipe
+from stream_parser import FIELD_EVENT, ITEM_EVENT, IncrementalRecipeParser
+
+RECIPE = synthetic_recipe("Thai tofu", 5, 4, 1)
+RECIPE["description"] = 'Braces { and } and "quotes" in a string, and a \\ backslash'
+RESPONSE = "Here is your recipe {as asked}:\n" + json.dumps(RECIPE, indent=2) + "\nEnjoy!"
+
+
+def feed_in_chunks(text, size):
+    parser = IncrementalRecipeParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return parser, events
+
+
+@pytest.mark.parametrize("size", [1, 3, 16, 1000, len(RESPONSE)])
+def test_chunking_does_not_change_the_events(size):
+    parser, events = feed_in_chunks(RESPONSE, size)
+
+    fields = {key: value for kind, key, value in events if kind == FIELD_EVENT}
+    assert fields == RECIPE
+    assert [value for kind, key, value in events if kind == ITEM_EVENT and key == "ingredients"] \
+        == RECIPE["ingredients"]
+    assert [value for kind, key, value in events if kind == ITEM_EVENT and key == "instructions"] \
+        == RECIPE["instructions"]
+    assert json.loads(parser.json_text()) == RECIPE
+
+
+def test_unfinished_object_has_no_json_text():
+    parser, events = feed_in_chunks(RESPONSE[:len(RESPONSE) // 2], 7)
+    assert parser.json_text() is None
+    assert events
+
+
+def test_text_after_the_object_is_ignored():
+    parser = IncrementalRecipeParser()
+    parser.feed(json.dumps({"title": "Soup"}))
+    assert parser.feed(' {"title": "Other"}') == []
+    assert json.loads(parser.json_text()) == {"title": "Soup"}